@@ -0,0 +1,48 @@
+"""
+Boots src.api under uvicorn with a SQL statement counter attached.
+
+Only used by benchmarks.api_load: every connection the app opens gets a
+sqlite3 trace callback, and the running total is served on /__bench/queries.
+"""
+
+from __future__ import annotations
+
+import itertools
+import sys
+from contextlib import contextmanager
+
+import uvicorn
+
+from src.storage import Storage
+
+_statements = itertools.count()
+_issued = 0
+
+
+def _count(_statement: str) -> None:
+    global _issued
+    _issued = next(_statements) + 1
+
+
+_original_conn = Storage._conn
+
+
+@contextmanager
+def _counting_conn(self):
+    with _original_conn(self) as conn:
+        conn.set_trace_callback(_count)
+        yield conn
+
+
+Storage._conn = _counting_conn
+
+import src.api as api  # noqa: E402  (import after patching so every connection is counted)
+
+
+@api.app.get("/__bench/queries", include_in_schema=False)
+def bench_queries() -> dict:
+    return {"queries": _issued}
+
+
+if __name__ == "__main__":
+    uvicorn.run(api.app, host="127.0.0.1", port=int(sys.argv[1]), log_level="warning")
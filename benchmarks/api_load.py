@@ -0,0 +1,339 @@
+"""
+Load and query-latency harness for the FastAPI app.
+
+Seeds a SQLite file at the requested scale (reused if it already exists),
+boots the API under uvicorn in a subprocess, then drives concurrent HTTP and
+WebSocket clients against it:
+
+    python -m benchmarks.api_load --logs 1000000 --alerts 100000 --clients 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import websockets
+
+from benchmarks.common import BENCH_START, summarize_latencies, write_results
+from src.generator import BatchLogGenerator
+from src.log_schema import INSERT_LOG_ROW, LogDictionary
+from src.storage import Storage
+
+ENDPOINTS = {
+    "alerts": "/alerts?limit=100",
+    "logs": "/logs?limit=200",
+    "summary": "/metrics/summary",
+}
+ALERT_TYPES = [
+    ("High CPU Utilization", "CRITICAL"),
+    ("High Memory Utilization", "WARNING"),
+    ("Potential Brute Force Attack", "CRITICAL"),
+    ("High Error Rate", "ERROR"),
+    ("ML Anomaly Detected", "WARNING"),
+]
+SLOW_ENDPOINT = "/logs?limit=2000"
+SEED_BATCH = 50_000
+
+
+def seed_database(db_path: Path, logs: int, alerts: int, seed: int = 42) -> None:
+    """Bulk-loads synthetic logs and alerts with the schema Storage creates."""
+    Storage(db_path=str(db_path))
+    generator = BatchLogGenerator(seed=seed, rate=50.0, start=BENCH_START)
+    conn = sqlite3.connect(db_path)
+    dictionary = LogDictionary()
+    try:
+        remaining = logs
+        while remaining > 0:
+            batch = min(SEED_BATCH, remaining)
+            c = generator.generate_columns(batch)
+            rows = zip(
+                c["timestamp"].tolist(), c["service"].tolist(), c["level"].tolist(),
+                c["event_type"].tolist(), c["message"].tolist(), c["trace_id"].tolist(),
+                c["source_ip"].tolist(), c["cpu_usage"].tolist(), c["memory_usage"].tolist(),
+                c["response_time_ms"].tolist(),
+            )
+            # Encoded up front: new dictionary entries are committed as they are created.
+            encoded = [
+                (row[0], *dictionary.encode(conn, *row[1:5]), *row[5:7], *(None if v != v else v for v in row[7:]), 1)
+                for row in rows
+            ]
+            conn.executemany(INSERT_LOG_ROW, encoded)
+            conn.commit()
+            remaining -= batch
+
+        step = timedelta(seconds=max(1.0, logs / 50.0 / max(alerts, 1)))
+        for offset in range(0, alerts, SEED_BATCH):
+            rows = []
+            for i in range(offset, min(offset + SEED_BATCH, alerts)):
+                alert_type, severity = ALERT_TYPES[i % len(ALERT_TYPES)]
+                ts = (BENCH_START + step * i).isoformat()
+                rows.append(
+                    (f"alert-seed-{i}", ts, ts, alert_type, severity, f"Seeded alert {i}",
+                     f"service-{i % 4}", f"trace-{i}")
+                )
+            conn.executemany(
+                """
+                INSERT INTO alerts (
+                    alert_id, timestamp, alert_generated_at, alert_type, severity,
+                    description, source_service, source_trace_id
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path: Path, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_PATH=str(db_path))
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks._api_server", str(port)], env=env)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("API server did not become healthy within 60s")
+
+
+async def _query_count(client: httpx.AsyncClient) -> int:
+    response = await client.get("/__bench/queries")
+    return response.json()["queries"]
+
+
+async def run_http_load(base_url: str, clients: int, duration: float) -> Dict[str, Any]:
+    latencies: Dict[str, List[int]] = {name: [] for name in ENDPOINTS}
+    errors = 0
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        queries_before = await _query_count(client)
+        deadline = time.perf_counter() + duration
+
+        async def worker(index: int) -> None:
+            nonlocal errors
+            names = list(ENDPOINTS)
+            i = index
+            while time.perf_counter() < deadline:
+                name = names[i % len(names)]
+                i += 1
+                t0 = time.perf_counter_ns()
+                try:
+                    response = await client.get(ENDPOINTS[name])
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies[name].append(time.perf_counter_ns() - t0)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(clients)))
+        elapsed = time.perf_counter() - started
+        queries = await _query_count(client) - queries_before
+
+    report: Dict[str, Any] = {
+        name: dict(summarize_latencies(samples, elapsed), p90_ms=_p90(samples))
+        for name, samples in latencies.items()
+    }
+    total = sum(len(samples) for samples in latencies.values())
+    report["total"] = {
+        "requests": total,
+        "requests_per_sec": round(total / elapsed, 2),
+        "errors": errors,
+        "db_queries_per_sec": round(queries / elapsed, 2),
+    }
+    for name in ENDPOINTS:
+        report[name]["requests_per_sec"] = report[name].pop("events_per_sec")
+        report[name]["requests"] = report[name].pop("events")
+    return report
+
+
+def _p90(samples: List[int]) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return round(ordered[int(0.9 * (len(ordered) - 1))] / 1e6, 4)
+
+
+async def run_ws_load(
+    base_url: str,
+    db_path: Path,
+    clients: int,
+    duration: float,
+    insert_rate: float,
+    slow_clients: int = 0,
+) -> Dict[str, Any]:
+    """
+    Connects `clients` WebSocket subscribers, inserts alerts stamped with the
+    wall-clock insert time, and measures how long each takes to arrive.
+    `slow_clients` concurrently hammer the most expensive read endpoint to show
+    whether slow queries hold up delta delivery.
+    """
+    ws_url = base_url.replace("http://", "ws://") + "/ws/alerts"
+    lags: List[int] = []
+    received = 0
+    stop = asyncio.Event()
+
+    async def subscriber() -> None:
+        nonlocal received
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            await ws.recv()  # snapshot
+            while not stop.is_set():
+                try:
+                    frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=0.5))
+                except asyncio.TimeoutError:
+                    continue
+                now = time.time()
+                for item in frame.get("items", []):
+                    sent_at = item.get("description", "")
+                    if sent_at.startswith("bench-sent:"):
+                        lags.append(int((now - float(sent_at.split(":", 1)[1])) * 1e9))
+                        received += 1
+
+    async def inserter() -> int:
+        storage = Storage(db_path=str(db_path))
+        inserted = 0
+        interval = 1.0 / insert_rate
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            ts = datetime.now().isoformat()
+            await asyncio.to_thread(
+                storage.insert_alert,
+                {
+                    "alert_id": f"alert-bench-{inserted}",
+                    "timestamp": ts,
+                    "alert_generated_at": ts,
+                    "alert_type": "High CPU Utilization",
+                    "severity": "CRITICAL",
+                    "description": f"bench-sent:{time.time()}",
+                    "source_service": "bench",
+                },
+            )
+            inserted += 1
+            await asyncio.sleep(interval)
+        return inserted
+
+    async def slow_reader(client: httpx.AsyncClient) -> None:
+        while not stop.is_set():
+            try:
+                await client.get(SLOW_ENDPOINT)
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        queries_before = await _query_count(client)
+        subscribers = [asyncio.create_task(subscriber()) for _ in range(clients)]
+        subscribers += [asyncio.create_task(slow_reader(client)) for _ in range(slow_clients)]
+        await asyncio.sleep(1.0)
+        started = time.perf_counter()
+        inserted = await inserter()
+        await asyncio.sleep(1.0)  # let the last deltas drain
+        stop.set()
+        await asyncio.gather(*subscribers, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        queries = await _query_count(client) - queries_before
+
+    lag_stats = summarize_latencies(lags, elapsed)
+    return {
+        "clients": clients,
+        "slow_query_clients": slow_clients,
+        "alerts_inserted": inserted,
+        "deliveries": received,
+        "expected_deliveries": inserted * clients,
+        "delivery_lag_p50_ms": lag_stats["p50_ms"],
+        "delivery_lag_p99_ms": lag_stats["p99_ms"],
+        "db_queries_per_sec": round(queries / elapsed, 2),
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="API load and query-latency benchmark")
+    parser.add_argument("--db-path", type=Path, default=Path("bench-results/api-load.db"))
+    parser.add_argument("--logs", type=int, default=1_000_000)
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--reseed", action="store_true", help="Recreate the database even if it exists")
+    parser.add_argument("--clients", type=int, default=200, help="Concurrent HTTP clients")
+    parser.add_argument("--ws-clients", type=int, default=100, help="Concurrent WebSocket subscribers")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds per phase")
+    parser.add_argument("--ws-insert-rate", type=float, default=20.0, help="Alerts/sec inserted during the WS phase")
+    parser.add_argument(
+        "--ws-slow-clients",
+        type=int,
+        default=0,
+        help=f"Clients repeatedly requesting {SLOW_ENDPOINT} during the WS phase",
+    )
+    parser.add_argument("--output", type=Path, default=Path("bench-results/api_load.json"))
+    args = parser.parse_args(argv)
+
+    if args.reseed and args.db_path.exists():
+        args.db_path.unlink()
+    if not args.db_path.exists():
+        print(f"Seeding {args.db_path} with {args.logs} logs and {args.alerts} alerts...")
+        started = time.perf_counter()
+        seed_database(args.db_path, args.logs, args.alerts)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(args.db_path, port)
+    try:
+        print(f"HTTP phase: {args.clients} clients for {args.duration}s")
+        http_report = asyncio.run(run_http_load(base_url, args.clients, args.duration))
+        print(json.dumps(http_report, indent=2))
+
+        print(f"WebSocket phase: {args.ws_clients} subscribers for {args.duration}s")
+        ws_report = asyncio.run(
+            run_ws_load(
+                base_url,
+                args.db_path,
+                args.ws_clients,
+                args.duration,
+                args.ws_insert_rate,
+                slow_clients=args.ws_slow_clients,
+            )
+        )
+        print(json.dumps(ws_report, indent=2))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            # Open WebSocket handlers can hold up uvicorn's graceful shutdown.
+            server.kill()
+            server.wait()
+
+    write_results(
+        args.output,
+        {
+            "scale": {"logs": args.logs, "alerts": args.alerts},
+            "http": http_report,
+            "websocket": ws_report,
+        },
+    )
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+"""Shared helpers for the benchmark suites: seeded streams, stats and baselines."""
+
+from __future__ import annotations
+
+import json
+import resource
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from src.generator import DEFAULT_EVENT_WEIGHTS, BatchLogGenerator, LoadProfile
+
+BENCH_START = datetime(2026, 1, 1, 0, 0, 0)
+# The first EventType entries (normal operation, auth success) are routine traffic.
+NORMAL_EVENT_COUNT = 2
+
+
+def profile_for(service_count: int, anomaly_rate: float) -> LoadProfile:
+    """Builds a load profile with `anomaly_rate` of events outside normal/auth-success."""
+    normal = DEFAULT_EVENT_WEIGHTS[:NORMAL_EVENT_COUNT]
+    anomalous = DEFAULT_EVENT_WEIGHTS[NORMAL_EVENT_COUNT:]
+    weights = [w / sum(normal) * (1 - anomaly_rate) for w in normal]
+    weights += [w / sum(anomalous) * anomaly_rate for w in anomalous]
+    return LoadProfile(
+        name=f"services={service_count},anomaly={anomaly_rate}",
+        event_weights=weights,
+        service_count=service_count,
+    )
+
+
+def synthetic_stream(
+    events: int, service_count: int, anomaly_rate: float, seed: int = 42
+) -> List[Dict[str, Any]]:
+    generator = BatchLogGenerator(
+        seed=seed,
+        profile=profile_for(service_count, anomaly_rate),
+        rate=100.0,
+        start=BENCH_START,
+    )
+    return generator.generate_batch(events)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize_latencies(latencies_ns: Sequence[int], elapsed_s: float) -> Dict[str, float]:
+    samples = np.asarray(latencies_ns, dtype=float) / 1e6
+    count = len(samples)
+    return {
+        "events": count,
+        "events_per_sec": round(count / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "p50_ms": round(float(np.percentile(samples, 50)), 4) if count else 0.0,
+        "p99_ms": round(float(np.percentile(samples, 99)), 4) if count else 0.0,
+    }
+
+
+def load_results(path: Path) -> Dict[str, Any]:
+    with open(path) as handle:
+        return json.load(handle)
+
+
+def write_results(path: Path, results: Dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as handle:
+        json.dump(results, handle, indent=2, sort_keys=True)
+        handle.write("\n")
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """
+    Returns a human-readable line per regression: throughput that dropped, or
+    p99 latency that grew, by more than `threshold` (a fraction) vs. baseline.
+    Cases missing from the baseline are ignored.
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        if "events_per_sec" in previous and current["events_per_sec"] < previous["events_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{key}: events/sec {current['events_per_sec']:.1f} < baseline {previous['events_per_sec']:.1f}"
+            )
+        if "p99_ms" in previous and current["p99_ms"] > previous["p99_ms"] * (1 + threshold):
+            regressions.append(f"{key}: p99 {current['p99_ms']:.3f}ms > baseline {previous['p99_ms']:.3f}ms")
+    return regressions
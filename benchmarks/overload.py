@@ -0,0 +1,124 @@
+"""
+Overload benchmark for the simulator's priority-aware load shedding.
+
+Measures how many events/sec the processor sustains with anomaly scoring on,
+then replays a stream at `--overload` times that rate in real time, once
+through the plain in-order loop and once per overload policy. Reports
+per-priority lag at pickup (event timestamp to processing), detection
+latency of high-severity alerts and the shed/merged/unscored counts:
+
+    python -m benchmarks.overload --overload 10 --seconds 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+from benchmarks.common import BENCH_START, write_results
+from src import telemetry
+from src.generator import BatchLogGenerator
+from src.main import RateLimitedStream
+from src.overload import POLICIES, PRIORITY_NAMES, OverloadController, priority
+from src.processor import LogProcessor
+
+HIGH_SEVERITIES = {"CRITICAL", "ERROR"}
+
+
+def _warm_processor(seed: int, events: int = 1000) -> LogProcessor:
+    processor = LogProcessor()
+    for log_entry in BatchLogGenerator(seed=seed, rate=100.0, start=BENCH_START).generate_batch(events):
+        processor.process_log(log_entry)
+    return processor
+
+
+def measure_capacity(seed: int, events: int = 1000) -> float:
+    """Events/sec a warmed processor handles with anomaly scoring on."""
+    processor = _warm_processor(seed)
+    records = BatchLogGenerator(seed=seed + 1, rate=100.0, start=datetime.now()).generate_batch(events)
+    started = time.perf_counter()
+    for log_entry in records:
+        processor.process_log(log_entry)
+    return events / (time.perf_counter() - started)
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0, "p50_s": 0.0, "p99_s": 0.0, "max_s": 0.0}
+    samples = np.asarray(values)
+    return {
+        "count": len(values),
+        "p50_s": round(float(np.percentile(samples, 50)), 3),
+        "p99_s": round(float(np.percentile(samples, 99)), 3),
+        "max_s": round(float(samples.max()), 3),
+    }
+
+
+def run_case(policy: str, rate: float, seconds: float, seed: int) -> Dict[str, Any]:
+    processor = _warm_processor(seed)
+    stream = RateLimitedStream(BatchLogGenerator(seed=seed, rate=rate, start=datetime.now()), 1000)
+    controller = OverloadController(policy=policy) if policy != "off" else None
+    lags: Dict[str, List[float]] = {name: [] for name in PRIORITY_NAMES}
+    detection: List[float] = []
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        if controller:
+            for log_entry in stream.due(wait=not controller.pending):
+                controller.offer(log_entry)
+            log_entry = controller.pop()
+            if log_entry is None:
+                continue
+        else:
+            log_entry = next(stream)
+        timestamp = datetime.fromisoformat(log_entry["timestamp"])
+        lags[PRIORITY_NAMES[priority(log_entry)]].append((datetime.now() - timestamp).total_seconds())
+        alert = processor.process_log(log_entry, score_anomalies=not (controller and controller.degraded))
+        if alert and alert["severity"] in HIGH_SEVERITIES:
+            detection.append((datetime.now() - timestamp).total_seconds())
+
+    result: Dict[str, Any] = {"scheduled": int(rate * seconds), "high_severity_detection": _summary(detection)}
+    result["lag"] = {name: _summary(values) for name, values in lags.items()}
+    if controller:
+        stats = controller.stats()
+        result["outcomes"] = {name: {k: v for k, v in stats[name].items() if k != "max_lag"} for name in PRIORITY_NAMES}
+    return result
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Overload control benchmark")
+    parser.add_argument("--overload", type=float, default=10.0, help="Arrival rate as a multiple of capacity")
+    parser.add_argument("--seconds", type=float, default=30.0, help="Wall-clock seconds per case")
+    parser.add_argument("--policies", nargs="+", choices=["off", *POLICIES], default=["off", *POLICIES])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=Path("bench-results/overload.json"))
+    args = parser.parse_args(argv)
+    telemetry.set_enabled(False)
+
+    capacity = measure_capacity(args.seed)
+    rate = capacity * args.overload
+    print(f"Processor capacity {capacity:.0f} events/s; replaying at {rate:.0f} events/s for {args.seconds:.0f}s")
+    results: Dict[str, Any] = {"capacity_events_per_sec": round(capacity, 1), "rate_events_per_sec": round(rate, 1)}
+    for policy in args.policies:
+        case = results[policy] = run_case(policy, rate, args.seconds, args.seed)
+        lag = case["lag"]
+        print(
+            f"{policy:>9}: high lag p99 {lag['high']['p99_s']:.2f}s max {lag['high']['max_s']:.2f}s, "
+            f"low lag p99 {lag['low']['p99_s']:.2f}s, "
+            f"high-severity detection p99 {case['high_severity_detection']['p99_s']:.2f}s, "
+            f"processed {sum(v['count'] for v in lag.values())} of {case['scheduled']}"
+        )
+
+    write_results(args.output, results)
+    print(f"\nResults written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Throughput/latency benchmark for the ingestion pipeline stages.
+
+Each (stage, service count, anomaly rate) case runs in a fresh spawned process
+so the reported peak RSS belongs to that case alone.
+
+    python -m benchmarks.pipeline --events 2000 --output bench-results/pipeline.json
+    python -m benchmarks.pipeline --update-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.common import (
+    compare_to_baseline,
+    load_results,
+    peak_rss_mb,
+    summarize_latencies,
+    synthetic_stream,
+    write_results,
+)
+from src import telemetry
+from src.actions import ActionAutomator
+from src.alerts import AlertEngine
+from src.processor import LogProcessor
+from src.storage import Storage
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline_pipeline.json")
+STAGES = ("process", "storage", "alert", "end_to_end")
+
+
+def _timed(items: List[Any], fn: Callable[[Any], Any]) -> Dict[str, float]:
+    latencies = []
+    clock = time.perf_counter_ns
+    started = clock()
+    for item in items:
+        t0 = clock()
+        fn(item)
+        latencies.append(clock() - t0)
+    return summarize_latencies(latencies, (clock() - started) / 1e9)
+
+
+def bench_process(records: List[Dict[str, Any]], workdir: Path) -> Dict[str, float]:
+    processor = LogProcessor()
+    return _timed(records, processor.process_log)
+
+
+def bench_storage(records: List[Dict[str, Any]], workdir: Path) -> Dict[str, float]:
+    storage = Storage(db_path=str(workdir / "bench.db"))
+    return _timed(records, storage.insert_log)
+
+
+def bench_alert(records: List[Dict[str, Any]], workdir: Path) -> Dict[str, float]:
+    processor = LogProcessor()
+    alerts = [alert for alert in map(processor.process_log, records) if alert]
+    engine = AlertEngine()
+    return _timed(alerts, engine.trigger_alert)
+
+
+def bench_end_to_end(records: List[Dict[str, Any]], workdir: Path) -> Dict[str, float]:
+    """Mirrors the body of the main() loop without the traffic sleeps."""
+    storage = Storage(db_path=str(workdir / "bench.db"))
+    processor = LogProcessor()
+    alert_engine = AlertEngine()
+    automator = ActionAutomator(delay_scale=0)
+
+    def handle(log_entry: Dict[str, Any]) -> None:
+        storage.insert_log(log_entry)
+        if log_entry["level"] in ["ERROR", "CRITICAL", "WARNING"]:
+            print(f"[{log_entry['timestamp']}] {log_entry['level']}: {log_entry['message']}")
+        alert = processor.process_log(log_entry)
+        if alert:
+            enriched_alert = alert_engine.trigger_alert(alert)
+            storage.insert_alert(enriched_alert)
+            automator.execute_action(enriched_alert)
+
+    return _timed(records, handle)
+
+
+BENCHMARKS = {
+    "process": bench_process,
+    "storage": bench_storage,
+    "alert": bench_alert,
+    "end_to_end": bench_end_to_end,
+}
+
+
+def run_case(
+    stage: str, events: int, services: int, anomaly_rate: float, seed: int, instrumented: bool = True
+) -> Dict[str, float]:
+    telemetry.set_enabled(instrumented)
+    records = synthetic_stream(events, services, anomaly_rate, seed=seed)
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        result = BENCHMARKS[stage](records, Path(tmp))
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+
+def case_key(stage: str, services: int, anomaly_rate: float) -> str:
+    return f"{stage}/services={services}/anomaly={anomaly_rate}"
+
+
+def run_suite(
+    stages: List[str],
+    events: int,
+    service_counts: List[int],
+    anomaly_rates: List[float],
+    seed: int = 42,
+    isolate: bool = True,
+    instrumented: bool = True,
+) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for stage in stages:
+        for services in service_counts:
+            for anomaly_rate in anomaly_rates:
+                args = (stage, events, services, anomaly_rate, seed, instrumented)
+                if isolate:
+                    context = multiprocessing.get_context("spawn")
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        result = pool.submit(run_case, *args).result()
+                else:
+                    result = run_case(*args)
+                key = case_key(stage, services, anomaly_rate)
+                results[key] = result
+                print(
+                    f"{key:45s} {result['events_per_sec']:>10.1f} ev/s  "
+                    f"p50={result['p50_ms']:.3f}ms  p99={result['p99_ms']:.3f}ms  "
+                    f"rss={result['peak_rss_mb']}MiB"
+                )
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Pipeline throughput and latency benchmarks")
+    parser.add_argument("--events", type=int, default=2000, help="Events per case")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--services", nargs="+", type=int, default=[4, 50], help="Service counts")
+    parser.add_argument("--anomaly-rates", nargs="+", type=float, default=[0.05, 0.3])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, default=Path("bench-results/pipeline.json"))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="Allowed fractional regression vs. baseline before failing",
+    )
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite the baseline with these results")
+    parser.add_argument("--no-isolate", action="store_true", help="Run cases in this process (RSS is cumulative)")
+    parser.add_argument(
+        "--no-internal-metrics",
+        action="store_true",
+        help="Disable src.telemetry instrumentation (to measure its overhead)",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_suite(
+        args.stages,
+        args.events,
+        args.services,
+        args.anomaly_rates,
+        args.seed,
+        isolate=not args.no_isolate,
+        instrumented=not args.no_internal_metrics,
+    )
+    write_results(args.output, results)
+    print(f"\nResults written to {args.output}")
+
+    if args.update_baseline:
+        write_results(args.baseline, results)
+        print(f"Baseline updated at {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; skipping comparison.")
+        return 0
+
+    regressions = compare_to_baseline(results, load_results(args.baseline), args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+Cold-start benchmark: module import time and simulator time-to-first-event.
+
+Every sample is a fresh interpreter, so results include interpreter start-up
+and whatever each module pulls in at import time.
+
+    python -m benchmarks.startup --runs 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmarks.common import compare_to_baseline, load_results, summarize_latencies, write_results
+
+ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_BASELINE = Path(__file__).with_name("baseline_startup.json")
+IMPORT_TARGETS = ("src.api", "src.processor", "src.main")
+
+
+def time_import(module: str) -> int:
+    started = time.perf_counter_ns()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, check=True)
+    return time.perf_counter_ns() - started
+
+
+def time_to_first_event(timeout: float = 60.0) -> int:
+    """Launches the simulator and waits for the first log row to be persisted."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "startup.db"
+        started = time.perf_counter_ns()
+        process = subprocess.Popen(
+            [sys.executable, "src/main.py", "--db-path", str(db_path), "--no-internal-metrics"],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.perf_counter() + timeout
+            while time.perf_counter() < deadline:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Simulator exited early with code {process.returncode}")
+                if db_path.exists():
+                    try:
+                        with sqlite3.connect(db_path, timeout=0.05) as conn:
+                            if conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0]:
+                                return time.perf_counter_ns() - started
+                    except sqlite3.OperationalError:
+                        pass  # schema not created yet, or writer holds the lock
+                time.sleep(0.005)
+            raise RuntimeError("Simulator produced no event before the timeout")
+        finally:
+            process.kill()
+            process.wait()
+
+
+def run_suite(runs: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for module in IMPORT_TARGETS:
+        samples = [time_import(module) for _ in range(runs)]
+        results[f"import/{module}"] = summarize_latencies(samples, sum(samples) / 1e9)
+    samples = [time_to_first_event() for _ in range(runs)]
+    results["simulator/time_to_first_event"] = summarize_latencies(samples, sum(samples) / 1e9)
+    for key, result in results.items():
+        result.pop("events_per_sec")
+        print(f"{key:40s} p50={result['p50_ms']:.1f}ms  p99={result['p99_ms']:.1f}ms")
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import time and simulator time-to-first-event")
+    parser.add_argument("--runs", type=int, default=10, help="Fresh interpreters per measurement")
+    parser.add_argument("--output", type=Path, default=Path("bench-results/startup.json"))
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.runs)
+    write_results(args.output, results)
+
+    if args.update_baseline:
+        write_results(args.baseline, results)
+        print(f"Baseline updated at {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"No baseline at {args.baseline}; skipping comparison.")
+        return 0
+
+    regressions = compare_to_baseline(results, load_results(args.baseline), args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
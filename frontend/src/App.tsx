@@ -5,12 +5,19 @@ import HealthBadge from './components/HealthBadge';
 import SummaryCards from './components/SummaryCards';
 import {
   acknowledgeAlert,
+  acknowledgeAlerts,
+  applySummaryDiff,
   fetchAlerts,
   fetchHealth,
   fetchSummary,
   getAlertsWsUrl,
   suppressAlert,
+  suppressAlerts,
   type Alert,
+  type AlertChange,
+  type AlertStreamFrame,
+  type AlertStreamPosition,
+  type BulkCriteria,
   type Summary
 } from './services/api';
 
@@ -36,14 +43,24 @@ function mergeAlerts(current: Alert[], incoming: Alert[]): Alert[] {
   return [...byId.values()].sort((a, b) => b.id - a.id).slice(0, MAX_ALERTS);
 }
 
+function applyAlertChanges(current: Alert[], changes: AlertChange[]): Alert[] {
+  const byId = new Map(changes.map((change) => [change.id, change]));
+  return current.map((alert) => {
+    const change = byId.get(alert.id);
+    return change && change.updated_at >= alert.updated_at ? { ...alert, ...change } : alert;
+  });
+}
+
 export default function App() {
   const [status, setStatus] = useState('unknown');
   const [alerts, setAlerts] = useState<Alert[]>([]);
   const [summary, setSummary] = useState<Summary>(EMPTY_SUMMARY);
   const [error, setError] = useState<string | null>(null);
   const [busyAlertId, setBusyAlertId] = useState<string | null>(null);
+  const [bulkBusy, setBulkBusy] = useState(false);
   const socketRef = useRef<WebSocket | null>(null);
   const reconnectRef = useRef<number | null>(null);
+  const streamPositionRef = useRef<AlertStreamPosition | null>(null);
 
   useEffect(() => {
     let active = true;
@@ -65,7 +82,7 @@ export default function App() {
     };
 
     const connectWs = () => {
-      const socket = new WebSocket(getAlertsWsUrl());
+      const socket = new WebSocket(getAlertsWsUrl(streamPositionRef.current));
       socketRef.current = socket;
 
       socket.onopen = () => {
@@ -76,15 +93,15 @@ export default function App() {
 
       socket.onmessage = (event) => {
         try {
-          const payload = JSON.parse(event.data) as {
-            type: 'snapshot' | 'delta';
-            items: Alert[];
-            summary?: Summary;
-          };
-          setAlerts((current) => mergeAlerts(current, payload.items));
-          if (payload.summary) {
-            setSummary(payload.summary);
+          const frame = JSON.parse(event.data) as AlertStreamFrame;
+          streamPositionRef.current = { epoch: frame.epoch, seq: frame.seq };
+          if (frame.type === 'snapshot') {
+            setAlerts((current) => mergeAlerts(current, frame.items));
+            setSummary(frame.summary);
+            return;
           }
+          setAlerts((current) => applyAlertChanges(mergeAlerts(current, frame.inserted), frame.updated));
+          setSummary((current) => applySummaryDiff(current, frame.summary_diff));
         } catch {
           // Ignore invalid frame.
         }
@@ -142,6 +159,31 @@ export default function App() {
     fetchSummary().then(setSummary).catch(() => undefined);
   };
 
+  const applyBulkUpdate = async (
+    verb: string,
+    targets: Alert[],
+    update: (criteria: BulkCriteria) => Promise<{ updated: number; items: Alert[] }>
+  ) => {
+    const alertIds = targets.flatMap((alert) => (alert.alert_id ? [alert.alert_id] : []));
+    if (alertIds.length === 0) {
+      return;
+    }
+    try {
+      setBulkBusy(true);
+      const result = await update({ alert_ids: alertIds });
+      setAlerts((current) => mergeAlerts(current, result.items));
+      fetchSummary().then(setSummary).catch(() => undefined);
+    } catch {
+      setError(`Failed to ${verb} ${alertIds.length} alerts`);
+    } finally {
+      setBulkBusy(false);
+    }
+  };
+
+  const onAcknowledgeOpen = (targets: Alert[]) => applyBulkUpdate('acknowledge', targets, acknowledgeAlerts);
+
+  const onSuppressAll = (targets: Alert[]) => applyBulkUpdate('suppress', targets, suppressAlerts);
+
   const onAcknowledge = async (alert: Alert) => {
     if (!alert.alert_id) {
       return;
@@ -198,7 +240,10 @@ export default function App() {
           alerts={alerts}
           onAcknowledge={onAcknowledge}
           onSuppress={onSuppress}
+          onAcknowledgeOpen={onAcknowledgeOpen}
+          onSuppressAll={onSuppressAll}
           busyAlertId={busyAlertId}
+          bulkBusy={bulkBusy}
         />
       </section>
     </main>
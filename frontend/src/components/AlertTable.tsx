@@ -4,17 +4,57 @@ type AlertTableProps = {
   alerts: Alert[];
   onAcknowledge: (alert: Alert) => void;
   onSuppress: (alert: Alert) => void;
+  onAcknowledgeOpen: (alerts: Alert[]) => void;
+  onSuppressAll: (alerts: Alert[]) => void;
   busyAlertId: string | null;
+  bulkBusy: boolean;
 };
 
 function formatTime(value: string): string {
   return new Date(value).toLocaleTimeString();
 }
 
-export default function AlertTable({ alerts, onAcknowledge, onSuppress, busyAlertId }: AlertTableProps) {
+function canAcknowledge(alert: Alert): boolean {
+  return alert.status === 'OPEN' && !!alert.alert_id;
+}
+
+function canSuppress(alert: Alert): boolean {
+  return alert.status !== 'SUPPRESSED' && !!alert.alert_id;
+}
+
+export default function AlertTable({
+  alerts,
+  onAcknowledge,
+  onSuppress,
+  onAcknowledgeOpen,
+  onSuppressAll,
+  busyAlertId,
+  bulkBusy
+}: AlertTableProps) {
+  const acknowledgeable = alerts.filter(canAcknowledge);
+  const suppressible = alerts.filter(canSuppress);
+
   return (
     <section className="panel reveal-4">
-      <h3>Alert Feed</h3>
+      <div className="panel-heading">
+        <h3>Alert Feed</h3>
+        <div className="actions-cell">
+          <button
+            className="action-button"
+            disabled={acknowledgeable.length === 0 || bulkBusy}
+            onClick={() => onAcknowledgeOpen(acknowledgeable)}
+          >
+            Ack all open ({acknowledgeable.length})
+          </button>
+          <button
+            className="action-button muted"
+            disabled={suppressible.length === 0 || bulkBusy}
+            onClick={() => onSuppressAll(suppressible)}
+          >
+            Suppress all ({suppressible.length})
+          </button>
+        </div>
+      </div>
       <div className="table-wrap">
         <table>
           <thead>
@@ -30,9 +70,7 @@ export default function AlertTable({ alerts, onAcknowledge, onSuppress, busyAler
           <tbody>
             {alerts.map((alert) => {
               const key = alert.alert_id ?? `${alert.id}`;
-              const isBusy = busyAlertId !== null && busyAlertId === alert.alert_id;
-              const canAcknowledge = alert.status === 'OPEN' && !!alert.alert_id;
-              const canSuppress = alert.status !== 'SUPPRESSED' && !!alert.alert_id;
+              const isBusy = bulkBusy || (busyAlertId !== null && busyAlertId === alert.alert_id);
 
               return (
                 <tr key={key}>
@@ -48,14 +86,14 @@ export default function AlertTable({ alerts, onAcknowledge, onSuppress, busyAler
                   <td className="actions-cell">
                     <button
                       className="action-button"
-                      disabled={!canAcknowledge || isBusy}
+                      disabled={!canAcknowledge(alert) || isBusy}
                       onClick={() => onAcknowledge(alert)}
                     >
                       Ack
                     </button>
                     <button
                       className="action-button muted"
-                      disabled={!canSuppress || isBusy}
+                      disabled={!canSuppress(alert) || isBusy}
                       onClick={() => onSuppress(alert)}
                     >
                       Suppress
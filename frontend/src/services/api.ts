@@ -13,6 +13,7 @@ export type Alert = {
   acknowledged_at: string | null;
   suppressed_at: string | null;
   updated_at: string;
+  details?: Record<string, unknown> | null;
 };
 
 export type Summary = {
@@ -31,6 +32,32 @@ export type Summary = {
   }>;
 };
 
+export type AlertChange = Pick<
+  Alert,
+  'id' | 'alert_id' | 'status' | 'acknowledged_at' | 'suppressed_at' | 'updated_at'
+>;
+
+export type AlertStreamFrame = { v: 2; epoch: string; seq: number } & (
+  | { type: 'snapshot'; items: Alert[]; summary: Summary }
+  | { type: 'events'; inserted: Alert[]; updated: AlertChange[]; summary_diff: Partial<Summary> }
+);
+
+export type AlertStreamPosition = { epoch: string; seq: number };
+
+export type AlertFilter = {
+  source_service?: string[];
+  alert_type?: string[];
+  severity?: string[];
+  status?: Alert['status'][];
+  since?: string;
+  until?: string;
+};
+
+export type BulkCriteria = {
+  alert_ids?: string[];
+  filter?: AlertFilter;
+};
+
 const API_BASE = import.meta.env.VITE_API_BASE_URL ?? 'http://localhost:8000';
 
 async function get<T>(path: string): Promise<T> {
@@ -41,9 +68,12 @@ async function get<T>(path: string): Promise<T> {
   return response.json() as Promise<T>;
 }
 
-async function post<T>(path: string): Promise<T> {
+async function post<T>(path: string, body?: unknown): Promise<T> {
   const response = await fetch(`${API_BASE}${path}`, {
-    method: 'POST'
+    method: 'POST',
+    ...(body === undefined
+      ? {}
+      : { headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(body) })
   });
   if (!response.ok) {
     throw new Error(`Request failed: ${response.status}`);
@@ -71,9 +101,37 @@ export function suppressAlert(alertId: string): Promise<{ item: Alert }> {
   return post<{ item: Alert }>(`/alerts/${alertId}/suppress`);
 }
 
-export function getAlertsWsUrl(): string {
+export function acknowledgeAlerts(criteria: BulkCriteria): Promise<{ updated: number; items: Alert[] }> {
+  return post<{ updated: number; items: Alert[] }>('/alerts/acknowledge', criteria);
+}
+
+export function suppressAlerts(criteria: BulkCriteria): Promise<{ updated: number; items: Alert[] }> {
+  return post<{ updated: number; items: Alert[] }>('/alerts/suppress', criteria);
+}
+
+export function getAlertsWsUrl(resumeFrom?: AlertStreamPosition | null): string {
   const parsed = new URL(API_BASE);
   parsed.protocol = parsed.protocol === 'https:' ? 'wss:' : 'ws:';
   parsed.pathname = '/ws/alerts';
+  parsed.searchParams.set('v', '2');
+  if (resumeFrom) {
+    parsed.searchParams.set('epoch', resumeFrom.epoch);
+    parsed.searchParams.set('since_seq', String(resumeFrom.seq));
+  }
   return parsed.toString();
 }
+
+export function applySummaryDiff(summary: Summary, diff: Partial<Summary>): Summary {
+  const { alerts_over_time: changedBuckets, ...changed } = diff;
+  const next = { ...summary, ...changed };
+  if (changedBuckets) {
+    const buckets = new Map(summary.alerts_over_time.map((bucket) => [bucket.timestamp, bucket]));
+    for (const bucket of changedBuckets) {
+      buckets.set(bucket.timestamp, bucket);
+    }
+    next.alerts_over_time = [...buckets.values()]
+      .sort((a, b) => a.timestamp.localeCompare(b.timestamp))
+      .slice(-20);
+  }
+  return next;
+}
@@ -1,10 +1,15 @@
 from typing import Dict, Any
-import time
+
+from src.clock import SYSTEM_CLOCK, Clock
+from src.telemetry import timed
 
 class ActionAutomator:
-    def __init__(self):
-        pass
+    def __init__(self, delay_scale: float = 1.0, clock: Clock = SYSTEM_CLOCK):
+        # Multiplier for the simulated remediation latency; 0 disables the sleeps.
+        self.delay_scale = delay_scale
+        self.clock = clock
 
+    @timed("action_automator.execute_action")
     def execute_action(self, alert: Dict[str, Any]):
         """
         Determines and executes the appropriate automated response based on the alert.
@@ -23,24 +28,28 @@ class ActionAutomator:
         else:
             self._notify_admin(alert)
 
+    def _wait(self, seconds: float):
+        if self.delay_scale > 0:
+            self.clock.sleep(seconds * self.delay_scale)
+
     def _scale_up_service(self, service: str):
         print(f">>> AUTO-REMEDIATION: Scaling up ASG for {service} to +1 instance...")
-        time.sleep(0.5)
+        self._wait(0.5)
         print(f">>> SUCCESS: {service} scaled up.")
 
     def _block_ip_address(self, ip: str):
         print(f">>> AUTO-REMEDIATION: Blocking malicious IP {ip} in WAF...")
-        time.sleep(0.5)
+        self._wait(0.5)
         print(f">>> SUCCESS: IP {ip} blocked.")
 
     def _restart_service(self, service: str):
         print(f">>> AUTO-REMEDIATION: Restarting {service} to clear transient errors...")
-        time.sleep(1.0)
+        self._wait(1.0)
         print(f">>> SUCCESS: {service} restarted.")
 
     def _dump_heap_and_restart(self, service: str):
         print(f">>> AUTO-REMEDIATION: Capturing heap dump for {service} and restarting...")
-        time.sleep(1.0)
+        self._wait(1.0)
         print(f">>> SUCCESS: Heap dump saved to S3. Service restarted.")
 
     def _notify_admin(self, alert: Dict[str, Any]):
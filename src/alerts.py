@@ -1,11 +1,14 @@
-from datetime import datetime
 from typing import Dict, Any
 from uuid import uuid4
 
+from src.clock import SYSTEM_CLOCK, Clock
+from src.telemetry import timed
+
 class AlertEngine:
-    def __init__(self):
-        pass
+    def __init__(self, clock: Clock = SYSTEM_CLOCK):
+        self.clock = clock
 
+    @timed("alert_engine.trigger_alert")
     def trigger_alert(self, alert_data: Dict[str, Any]):
         """
         Receives an alert and 'sends' it (prints to console/file).
@@ -13,7 +16,7 @@ class AlertEngine:
         # Copy input to avoid mutating caller-owned state.
         enriched_alert = dict(alert_data)
         enriched_alert["alert_id"] = f"alert-{uuid4().hex}"
-        enriched_alert["alert_generated_at"] = datetime.now().isoformat()
+        enriched_alert["alert_generated_at"] = self.clock.now().isoformat()
         
         # In a real system, this would push to PagerDuty/Slack
         self._log_alert(enriched_alert)
@@ -2,16 +2,189 @@ from __future__ import annotations
 
 import asyncio
 import os
-from typing import Any, Dict
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Union
 
-from fastapi import FastAPI, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-from src.storage import Storage
+from src import profiling, telemetry
+from src.export import MEDIA_TYPES, ChunkEncoder
+from src.hot_tier import HotTier, HotTierFeed
+from src.http_cache import (
+    JSON_MEDIA_TYPE,
+    CachedBody,
+    ResponseCache,
+    choose_encoding,
+    choose_media_type,
+    encode_body,
+    http_date,
+    is_not_modified,
+    msgpack,
+)
+from src.sharding import ShardedStorage, open_storage
+from src.sketches import parse_quantiles
+from src.storage import EXPORT_COLUMNS, AsyncStorage, Storage
+from src.ws_events import PROTOCOL_VERSION, AlertEventHub, WebSocketChannel, coalesce
+
+# Storage (and its schema migration) is created in the lifespan, or on first use
+# when handlers are called directly, so importing this module stays cheap.
+storage: Optional[Union[Storage, ShardedStorage]] = None
+async_storage: Optional[AsyncStorage] = None
+
+# Opt-in: PROFILING=1 samples stacks into PROFILE_OUTPUT and keeps per-request timings.
+profiling_enabled = os.getenv("PROFILING", "0").lower() in {"1", "true", "yes", "on"}
+
+# Serve recent /logs, /alerts and WebSocket reads from memory, kept current by the
+# simulator's hot-tier feed. Needs Unix sockets; HOT_TIER=0 reads SQLite only.
+hot_tier_enabled = HotTierFeed.supported() and os.getenv("HOT_TIER", "1").lower() in {"1", "true", "yes", "on"}
+
+# DB_SHARDS > 1 splits storage into per-service-hash files (src/sharding.py); the
+# simulator must be started with the same --shards.
+db_shards = max(1, int(os.getenv("DB_SHARDS", "1")))
+
+# Polled read endpoints: path -> (versioned table, msgpack allowed). Writes from the
+# simulator are picked up within API_CACHE_TTL seconds; writes made here invalidate.
+CACHED_ROUTES = {
+    "/alerts": ("alerts", True),
+    "/logs": ("logs", True),
+    "/metrics/summary": ("alerts", False),
+}
+response_cache = ResponseCache(ttl=float(os.getenv("API_CACHE_TTL", "1.0")))
+
+# One queue per connected v1 /ws/alerts client for frames pushed by this process.
+ws_subscribers: Set[asyncio.Queue] = set()
+# Change feed for v2 clients; one per event loop, started by the first subscriber.
+event_hub: Optional[AlertEventHub] = None
+
+
+class AlertFilter(BaseModel):
+    source_service: Optional[List[str]] = None
+    alert_type: Optional[List[str]] = None
+    severity: Optional[List[str]] = None
+    status: Optional[List[str]] = None
+    since: Optional[str] = None
+    until: Optional[str] = None
+
+
+class BulkStatusRequest(BaseModel):
+    alert_ids: Optional[List[str]] = None
+    filter: Optional[AlertFilter] = None
 
-app = FastAPI(title="Cloud Observability API", version="0.2.0")
-storage = Storage(db_path=os.getenv("DB_PATH", "data/observability.db"))
 
+def get_storage() -> Union[Storage, ShardedStorage]:
+    global storage
+    if storage is None:
+        storage = open_storage(
+            os.getenv("DB_PATH", "data/observability.db"),
+            shards=db_shards,
+            hot_tier=HotTier if hot_tier_enabled else None,
+            feed=hot_tier_enabled,
+        )
+    return storage
+
+
+def get_async_storage() -> AsyncStorage:
+    global async_storage
+    if async_storage is None:
+        async_storage = AsyncStorage(get_storage(), max_workers=int(os.getenv("DB_READERS", "4")))
+    return async_storage
+
+
+def get_event_hub() -> AlertEventHub:
+    global event_hub
+    if event_hub is None or event_hub.loop is not asyncio.get_running_loop():
+        event_hub = AlertEventHub(get_async_storage(), window=float(os.getenv("WS_BATCH_MS", "250")) / 1000)
+    return event_hub
+
+
+def _wake_event_hub() -> None:
+    if event_hub is not None:
+        event_hub.wake()
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    global async_storage
+    get_async_storage()
+    profiler = None
+    if profiling_enabled:
+        profiler = profiling.SamplingProfiler(
+            os.getenv("PROFILE_OUTPUT", "data/api-profile.collapsed"),
+            interval=float(os.getenv("PROFILE_INTERVAL", "0.005")),
+        ).start()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.stop()
+        if async_storage is not None:
+            async_storage.close()
+            async_storage = None
+        if storage is not None:
+            storage.close()
+
+
+app = FastAPI(title="Cloud Observability API", version="0.2.0", lifespan=lifespan)
+
+
+@app.middleware("http")
+async def serve_cached_reads(request: Request, call_next):
+    route = CACHED_ROUTES.get(request.url.path)
+    if request.method != "GET" or route is None:
+        return await call_next(request)
+    resource, allow_msgpack = route
+
+    versions = response_cache.cached_versions()
+    if versions is None:
+        versions = await get_async_storage().run(response_cache.versions, get_storage().get_data_version)
+    version = versions[resource]
+    media_type = choose_media_type(request.headers.get("accept", ""), allow_msgpack)
+    representation = "json" if media_type == JSON_MEDIA_TYPE else "msgpack"
+    etag = f'W/"{resource}-{version["tag"]}-{representation}"'
+    last_modified = http_date(version["modified"])
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    if is_not_modified(request.headers, etag, last_modified):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    key = (f"{request.url.path}?{request.url.query}", media_type)
+    entry = response_cache.get(key, version["tag"])
+    if entry is None:
+        response = await call_next(request)
+        if response.status_code != 200:
+            return response
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        entry = CachedBody(version["tag"], media_type, await run_in_threadpool(encode_body, body, media_type))
+        response_cache.put(key, entry)
+    coding = choose_encoding(request.headers.get("accept-encoding", ""))
+    content, coding = entry.encoded(coding) if entry.ready(coding) else await run_in_threadpool(entry.encoded, coding)
+    if coding:
+        headers["Content-Encoding"] = coding
+    return Response(content, media_type=media_type, headers=headers)
+
+
+# Registered after serve_cached_reads so it wraps it: cache hits and 304s are timed too.
+@app.middleware("http")
+async def record_request_timing(request: Request, call_next):
+    if not profiling_enabled:
+        return await call_next(request)
+    timer = profiling.StageTimer()
+    response = await call_next(request)
+    timer.lap("handle")
+    profiling.TRACES.record(
+        timer, method=request.method, path=request.url.path, status=response.status_code
+    )
+    return response
+
+
+# Added last so it wraps the middleware above: cached and 304 responses need CORS headers too.
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://127.0.0.1:5173"],
@@ -23,17 +196,25 @@ app.add_middleware(
 
 @app.get("/health")
 def health() -> dict:
-    return {"status": "healthy" if storage.healthcheck() else "unhealthy"}
+    return {"status": "healthy" if get_storage().healthcheck() else "unhealthy"}
 
 
-@app.get("/alerts")
-def get_alerts(limit: int = Query(default=100, ge=1, le=1000)) -> dict:
-    return {"items": storage.get_alerts(limit=limit)}
+def _items_response(items_json: bytes) -> Response:
+    return Response(b'{"items":' + items_json + b"}", media_type=JSON_MEDIA_TYPE)
+
+
+@app.get("/alerts", response_model=None)
+def get_alerts(limit: int = Query(default=100, ge=1, le=1000)) -> Any:
+    if get_storage().hot_tier is not None:
+        return _items_response(get_storage().recent_json("alert", limit))
+    return {"items": get_storage().get_alerts(limit=limit)}
 
 
 @app.post("/alerts/{alert_id}/acknowledge")
 def acknowledge_alert(alert_id: str) -> Dict[str, Any]:
-    updated = storage.update_alert_status(alert_id=alert_id, status="ACKNOWLEDGED")
+    updated = get_storage().update_alert_status(alert_id=alert_id, status="ACKNOWLEDGED")
+    response_cache.invalidate()
+    _wake_event_hub()
     if not updated:
         raise HTTPException(status_code=404, detail="Alert not found")
     return {"item": updated}
@@ -41,51 +222,317 @@ def acknowledge_alert(alert_id: str) -> Dict[str, Any]:
 
 @app.post("/alerts/{alert_id}/suppress")
 def suppress_alert(alert_id: str) -> Dict[str, Any]:
-    updated = storage.update_alert_status(alert_id=alert_id, status="SUPPRESSED")
+    updated = get_storage().update_alert_status(alert_id=alert_id, status="SUPPRESSED")
+    response_cache.invalidate()
+    _wake_event_hub()
     if not updated:
         raise HTTPException(status_code=404, detail="Alert not found")
     return {"item": updated}
 
 
-@app.get("/logs")
-def get_logs(limit: int = Query(default=200, ge=1, le=2000)) -> dict:
-    return {"items": storage.get_logs(limit=limit)}
+async def _bulk_update_status(request: BulkStatusRequest, status: str) -> Dict[str, Any]:
+    criteria: Dict[str, Any] = {"alert_ids": request.alert_ids}
+    if request.filter:
+        for bound in (request.filter.since, request.filter.until):
+            if bound:
+                try:
+                    datetime.fromisoformat(bound)
+                except ValueError:
+                    raise HTTPException(status_code=422, detail=f"Invalid ISO timestamp: {bound}")
+        criteria["since"] = request.filter.since
+        criteria["until"] = request.filter.until
+        criteria["filters"] = request.filter.model_dump(include={"source_service", "alert_type", "severity", "status"})
+    reader = get_async_storage()
+    try:
+        items = await reader.bulk_update_alert_status(status, **criteria)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    response_cache.invalidate()
+    _wake_event_hub()
+    if items and ws_subscribers:
+        frame = {"type": "delta", "items": items, "summary": await reader.get_metrics_summary()}
+        for queue in list(ws_subscribers):
+            queue.put_nowait(frame)
+    return {"updated": len(items), "items": items}
+
+
+@app.post("/alerts/acknowledge")
+async def bulk_acknowledge_alerts(request: BulkStatusRequest) -> Dict[str, Any]:
+    return await _bulk_update_status(request, "ACKNOWLEDGED")
+
+
+@app.post("/alerts/suppress")
+async def bulk_suppress_alerts(request: BulkStatusRequest) -> Dict[str, Any]:
+    return await _bulk_update_status(request, "SUPPRESSED")
+
+
+@app.get("/logs", response_model=None)
+def get_logs(limit: int = Query(default=200, ge=1, le=2000)) -> Any:
+    if get_storage().hot_tier is not None:
+        return _items_response(get_storage().recent_json("log", limit))
+    return {"items": get_storage().get_logs(limit=limit)}
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+
+def _export_response(
+    table: str,
+    fmt: str,
+    since: Optional[str],
+    until: Optional[str],
+    fields: Optional[str],
+    filters: Dict[str, Optional[str]],
+) -> StreamingResponse:
+    for bound in (since, until):
+        if bound:
+            try:
+                datetime.fromisoformat(bound)
+            except ValueError:
+                raise HTTPException(status_code=422, detail=f"Invalid ISO timestamp: {bound}")
+    columns = _split(fields) or list(EXPORT_COLUMNS[table])
+    try:
+        chunks = get_storage().iter_rows(
+            table,
+            columns=columns,
+            since=since,
+            until=until,
+            filters={name: _split(value) for name, value in filters.items()},
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    encoder = ChunkEncoder(chunks, columns, fmt)
+    reader = get_async_storage()
+
+    async def body():
+        # Each chunk is fetched and encoded in the reader pool; the next one is
+        # only read once the client has taken this one.
+        while True:
+            chunk = await reader.run(encoder.next_chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+    filename = f"{table}-export.{fmt}"
+    return StreamingResponse(
+        body(),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.get("/export/logs")
+async def export_logs(
+    fmt: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fields: Optional[str] = None,
+    service: Optional[str] = None,
+    level: Optional[str] = None,
+    event_type: Optional[str] = None,
+    trace_id: Optional[str] = None,
+    source_ip: Optional[str] = None,
+) -> StreamingResponse:
+    return _export_response(
+        "logs",
+        fmt,
+        since,
+        until,
+        fields,
+        {"service": service, "level": level, "event_type": event_type, "trace_id": trace_id, "source_ip": source_ip},
+    )
+
+
+@app.get("/export/alerts")
+async def export_alerts(
+    fmt: str = Query(default="ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    fields: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    severity: Optional[str] = None,
+    status: Optional[str] = None,
+    source_service: Optional[str] = None,
+    source_trace_id: Optional[str] = None,
+) -> StreamingResponse:
+    return _export_response(
+        "alerts",
+        fmt,
+        since,
+        until,
+        fields,
+        {
+            "alert_type": alert_type,
+            "severity": severity,
+            "status": status,
+            "source_service": source_service,
+            "source_trace_id": source_trace_id,
+        },
+    )
+
+
+@app.get("/traces/{trace_id}")
+def get_trace(trace_id: str, limit: int = Query(default=1000, ge=1, le=5000)) -> Dict[str, Any]:
+    items = get_storage().get_trace(trace_id=trace_id, limit=limit)
+    if not items:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return {"trace_id": trace_id, "items": items}
 
 
 @app.get("/metrics/summary")
 def get_metrics_summary() -> dict:
-    return storage.get_metrics_summary()
+    return get_storage().get_metrics_summary()
+
+
+@app.get("/metrics/latency")
+def get_latency_metrics(
+    service: Optional[str] = None,
+    quantiles: str = "0.5,0.9,0.99",
+    window_minutes: int = Query(default=60, ge=1, le=7 * 24 * 60),
+) -> Dict[str, Any]:
+    try:
+        requested = parse_quantiles(quantiles)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    since = (datetime.now() - timedelta(minutes=window_minutes)).replace(second=0, microsecond=0)
+    sketch = get_storage().get_latency_sketch(since=since.isoformat(), service=service)
+    return {
+        "service": service,
+        "window_minutes": window_minutes,
+        "count": sketch.count,
+        "mean_ms": sketch.sum / sketch.count if sketch.count else 0.0,
+        "quantiles_ms": {f"{q:g}": sketch.quantile(q) for q in requested},
+    }
+
+
+@app.get("/metrics/log-volume")
+def get_log_volume(
+    service: Optional[str] = None,
+    window_minutes: int = Query(default=60, ge=1, le=7 * 24 * 60),
+) -> Dict[str, Any]:
+    since = (datetime.now() - timedelta(minutes=window_minutes)).replace(second=0, microsecond=0)
+    payload = get_storage().get_log_volume(since=since.isoformat(), service=service)
+    payload.update(service=service, window_minutes=window_minutes)
+    return payload
+
+
+@app.get("/security/top-ips")
+def get_top_source_ips(
+    window_minutes: int = Query(default=15, ge=1, le=24 * 60),
+    limit: int = Query(default=10, ge=1, le=100),
+) -> Dict[str, Any]:
+    since = datetime.now() - timedelta(minutes=window_minutes)
+    payload = get_storage().get_top_source_ips(since=since.isoformat(), limit=limit)
+    payload["window_minutes"] = window_minutes
+    return payload
+
+
+@app.get("/metrics/internal", response_class=PlainTextResponse)
+def get_internal_metrics() -> PlainTextResponse:
+    if not telemetry.is_enabled():
+        raise HTTPException(status_code=404, detail="Internal metrics are disabled")
+    return PlainTextResponse(telemetry.render_latest(), media_type=telemetry.CONTENT_TYPE)
+
+
+@app.get("/debug/stage-traces")
+def get_stage_traces(
+    limit: int = Query(default=100, ge=1, le=1000),
+    min_ms: float = Query(default=0.0, ge=0.0),
+    slowest: bool = False,
+) -> dict:
+    if not profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return {"items": profiling.TRACES.snapshot(limit=limit, min_total_ms=min_ms, slowest=slowest)}
 
 
 @app.websocket("/ws/alerts")
-async def alerts_ws(websocket: WebSocket):
+async def alerts_ws(
+    websocket: WebSocket,
+    v: int = 1,
+    since_seq: Optional[int] = None,
+    epoch: Optional[str] = None,
+    format: str = "json",
+    batch_ms: int = 0,
+):
     await websocket.accept()
-    last_seen_id = storage.get_latest_alert_row_id()
+    if v >= PROTOCOL_VERSION:
+        if format == "msgpack" and msgpack is None:
+            format = "json"
+        await _serve_events(websocket, since_seq, epoch, format, max(0, min(batch_ms, 5000)) / 1000)
+    else:
+        await _serve_deltas(websocket)
 
-    # Send initial snapshot so UI has deterministic startup state.
-    await websocket.send_json(
-        {
-            "type": "snapshot",
-            "items": storage.get_alerts(limit=100),
-            "summary": storage.get_metrics_summary(),
-        }
-    )
+
+async def _serve_events(websocket: WebSocket, since_seq: Optional[int], epoch: Optional[str], fmt: str, batch: float) -> None:
+    """Protocol v2 (see src/ws_events.py)."""
+    hub = get_event_hub()
+    queue, first = await hub.subscribe(since_seq, epoch)
+    channel = WebSocketChannel(websocket, queue)
+
+    async def send(frame: Dict[str, Any]) -> None:
+        binary, payload = hub.encode(frame, fmt)
+        await (websocket.send_bytes(payload) if binary else websocket.send_text(payload))
+
+    try:
+        await send(first)
+        while True:
+            _, frame = await channel.next()
+            frames = [frame]
+            if batch > hub.window:
+                # Clients that asked for a wider window get one frame per window.
+                await asyncio.sleep(batch - hub.window)
+                frames.extend(channel.drain())
+            if None in frames:
+                # Fell behind the queue: resynchronise from a fresh snapshot.
+                await send(await hub.snapshot())
+                continue
+            await send(frames[0] if len(frames) == 1 else coalesce(frames, hub.snapshot_size))
+    except WebSocketDisconnect:
+        return
+    finally:
+        channel.close()
+        hub.unsubscribe(queue)
+
+
+async def _serve_deltas(websocket: WebSocket) -> None:
+    """Protocol v1: full alert rows for new ids, each with the full summary."""
+    reader = get_async_storage()
+    last_seen_id = await reader.get_latest_alert_row_id()
+    pushed: asyncio.Queue = asyncio.Queue()
+    ws_subscribers.add(pushed)
+    channel = WebSocketChannel(websocket, pushed)
 
     try:
+        # Send initial snapshot so UI has deterministic startup state.
+        await websocket.send_json(
+            {
+                "type": "snapshot",
+                "items": await reader.get_alerts(limit=100),
+                "summary": await reader.get_metrics_summary(),
+            }
+        )
         while True:
-            latest_id = storage.get_latest_alert_row_id()
+            latest_id = await reader.get_latest_alert_row_id()
             if latest_id > last_seen_id:
-                items = storage.get_alerts_since_id(after_id=last_seen_id, limit=200)
+                items = await reader.get_alerts_since_id(after_id=last_seen_id, limit=200)
                 if items:
                     await websocket.send_json(
                         {
                             "type": "delta",
                             "items": items,
-                            "summary": storage.get_metrics_summary(),
+                            "summary": await reader.get_metrics_summary(),
                         }
                     )
-                    last_seen_id = items[-1]["id"]
+                    last_seen_id = reader.storage.alert_position(items, last_seen_id)
 
-            await asyncio.sleep(0.25)
+            # Frames pushed by this process (bulk triage) go out as soon as they land.
+            received, frame = await channel.next(timeout=0.25)
+            if received:
+                await websocket.send_json(frame)
     except WebSocketDisconnect:
         return
+    finally:
+        channel.close()
+        ws_subscribers.discard(pushed)
@@ -0,0 +1,372 @@
+"""
+Replays stored logs through a LogProcessor with candidate settings and diffs
+the alerts it would have raised against the alerts that were actually stored.
+
+    python -m src.backtest --since 2026-02-09T00:00:00 --set auth_failure_threshold=8 \\
+        --set ml_contamination=0.05 --output bench-results/backtest.json
+
+Logs stream out of Storage in time-ordered chunks and run through a single
+LogProcessor in the coordinator, so every rule sees events in live order and
+each event raises at most the one alert the live processor would have. The
+IsolationForest detector dominates the cost, so a pool of worker processes, each
+owning a fixed subset of services, scores every chunk's samples ahead of the
+coordinator, which reads the results through per-service stand-ins. Memory stays
+bounded by the chunk size, the number of chunks in flight and the number of
+alerts, not the number of logs.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+import zlib
+from collections import Counter, deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.processor import DetectorPool, LogProcessor, MLAnomalyDetector
+from src.sharding import open_storage
+
+ML_ALERT_TYPE = "ML Anomaly Detected"
+TUNABLE_SETTINGS = (
+    "auth_failure_threshold",
+    "auth_failure_window_sec",
+    "error_rate_threshold",
+    "error_rate_window_sec",
+    "error_rate_min_samples",
+    "latency_slo_threshold_ms",
+    "latency_slo_objective",
+    "latency_slo_min_samples",
+    "ml_contamination",
+)
+SAMPLE_LIMIT = 20
+# Stored alerts carry the time the live processor raised them, which trails the
+# event by up to its processing lag; replayed alerts carry the event's time.
+MATCH_WINDOW_SEC = 300.0
+
+
+def parse_setting(assignment: str) -> Tuple[str, Any]:
+    """Parses a `name=value` override for one of TUNABLE_SETTINGS."""
+    name, sep, raw = assignment.partition("=")
+    name = name.strip()
+    if not sep or name not in TUNABLE_SETTINGS:
+        raise ValueError(f"Expected one of {', '.join(TUNABLE_SETTINGS)} as name=value, got {assignment!r}")
+    raw = raw.strip()
+    if name == "ml_contamination":
+        return name, raw if raw == "auto" else float(raw)
+    return name, type(getattr(LogProcessor(), name))(raw)
+
+
+def build_processor(settings: Dict[str, Any], ml_enabled: bool = True) -> LogProcessor:
+    """A LogProcessor with `settings` applied, reading ML results from stand-ins fed by the scoring workers."""
+    processor = LogProcessor()
+    for name, value in settings.items():
+        setattr(processor, name, value)
+    processor.ml_enabled = ml_enabled
+    # Stand-ins holding the workers' results (see _ReplayedDetector), never evicted.
+    processor.service_detectors = {}
+    return processor
+
+
+class _ReplayedDetector:
+    """Stands in for a service's MLAnomalyDetector, handing out results computed by MLAnomalyDetector.replay."""
+
+    def __init__(self):
+        self.results: Deque[Optional[str]] = deque()
+
+    def track_and_check(self, cpu: float, memory: float) -> Optional[str]:
+        return self.results.popleft()
+
+
+def _summarize_alert(alert: Dict[str, Any], timestamp: str) -> Dict[str, Any]:
+    return {
+        "timestamp": timestamp,
+        "alert_type": alert["alert_type"],
+        "severity": alert["severity"],
+        "source_service": alert.get("source_service"),
+        "source_trace_id": alert.get("source_trace_id"),
+        "description": alert["description"],
+    }
+
+
+def _drain(processor: LogProcessor) -> None:
+    # Nothing persists these increments during a replay; drop them so they don't accumulate.
+    processor.drain_latency_sketches()
+    processor.drain_security_windows()
+
+
+def ml_samples(chunk: List[Dict[str, Any]]) -> Dict[str, List[Tuple[float, float]]]:
+    """Groups a chunk's ML samples by service, in the order process_log would score them."""
+    samples: Dict[str, List[Tuple[float, float]]] = {}
+    for log_entry in chunk:
+        sample = LogProcessor.ml_sample(log_entry["metrics"])
+        if sample is not None:
+            samples.setdefault(log_entry["service"], []).append(sample)
+    return samples
+
+
+def score_samples(
+    detectors: DetectorPool,
+    contamination: Union[str, float],
+    samples: Dict[str, List[Tuple[float, float]]],
+) -> Dict[str, List[Optional[str]]]:
+    """Runs each service's samples through its detector in one batch (see MLAnomalyDetector.replay)."""
+    results = {}
+    for service, service_samples in samples.items():
+        detector = detectors.get(service)
+        if detector is None:
+            detector = detectors[service] = MLAnomalyDetector(window_size=100, contamination=contamination)
+        results[service] = detector.replay(service_samples)
+    return results
+
+
+def _score_worker(contamination: Union[str, float], inbox, outbox) -> None:
+    detectors = DetectorPool()
+    while True:
+        item = inbox.get()
+        if item is None:
+            break
+        seq, samples = item
+        outbox.put((seq, score_samples(detectors, contamination, samples)))
+
+
+class AlertDiff:
+    """
+    Matches each replayed alert to a stored one with the same type, service and
+    trace id, taking the nearest in time within MATCH_WINDOW_SEC.
+    """
+
+    def __init__(self, stored_alerts: Iterable[Dict[str, Any]]):
+        self.unmatched_stored: Dict[Tuple[str, Optional[str], Optional[str]], List[Dict[str, Any]]] = {}
+        self.by_type: Dict[str, Counter] = {}
+        self.by_service: Dict[str, Counter] = {}
+        self.only_replayed_samples: List[Dict[str, Any]] = []
+        for alert in stored_alerts:
+            self.unmatched_stored.setdefault(self._key(alert), []).append(
+                _summarize_alert(alert, alert["timestamp"])
+            )
+            self._count(alert, "stored")
+
+    @staticmethod
+    def _key(alert: Dict[str, Any]) -> Tuple[str, Optional[str], Optional[str]]:
+        return alert["alert_type"], alert.get("source_service"), alert.get("source_trace_id")
+
+    def _count(self, alert: Dict[str, Any], field: str) -> None:
+        self.by_type.setdefault(alert["alert_type"], Counter())[field] += 1
+        self.by_service.setdefault(alert.get("source_service") or "unknown", Counter())[field] += 1
+
+    def add_replayed(self, alert: Dict[str, Any]) -> None:
+        self._count(alert, "replayed")
+        candidates = self.unmatched_stored.get(self._key(alert), [])
+        timestamp = datetime.fromisoformat(alert["timestamp"])
+        best, best_gap = None, MATCH_WINDOW_SEC
+        for index, stored in enumerate(candidates):
+            gap = abs((datetime.fromisoformat(stored["timestamp"]) - timestamp).total_seconds())
+            if gap <= best_gap:
+                best, best_gap = index, gap
+        if best is not None:
+            candidates.pop(best)
+            self._count(alert, "matched")
+        elif len(self.only_replayed_samples) < SAMPLE_LIMIT:
+            self.only_replayed_samples.append(alert)
+
+    @staticmethod
+    def _rows(counters: Dict[str, Counter]) -> Dict[str, Dict[str, int]]:
+        rows = {}
+        for name, counts in sorted(counters.items()):
+            stored, replayed, matched = counts["stored"], counts["replayed"], counts["matched"]
+            rows[name] = {
+                "stored": stored,
+                "replayed": replayed,
+                "matched": matched,
+                "only_stored": stored - matched,
+                "only_replayed": replayed - matched,
+            }
+        return rows
+
+    def report(self) -> Dict[str, Any]:
+        only_stored = [alert for alerts in self.unmatched_stored.values() for alert in alerts][:SAMPLE_LIMIT]
+        return {
+            "by_type": self._rows(self.by_type),
+            "by_service": self._rows(self.by_service),
+            "samples": {"only_stored": only_stored, "only_replayed": self.only_replayed_samples},
+        }
+
+
+def run_backtest(
+    db_path: str,
+    settings: Optional[Dict[str, Any]] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 5000,
+    ml_enabled: bool = True,
+    queue_depth: int = 4,
+    shards: int = 1,
+) -> Dict[str, Any]:
+    settings = dict(settings or {})
+    workers = max(1, workers or os.cpu_count() or 1)
+    storage = open_storage(db_path, shards=shards)
+    started = time.perf_counter()
+
+    stored = (
+        alert
+        for chunk in storage.iter_alerts(since=since, until=until, chunk_size=chunk_size)
+        for alert in chunk
+        if ml_enabled or alert["alert_type"] != ML_ALERT_TYPE
+    )
+    diff = AlertDiff(stored)
+
+    processor = build_processor(settings, ml_enabled=ml_enabled)
+    ctx = multiprocessing.get_context("spawn")
+    outbox = ctx.Queue()
+    inboxes = [ctx.Queue(maxsize=queue_depth) for _ in range(workers if ml_enabled else 0)]
+    processes = [
+        ctx.Process(target=_score_worker, args=(processor.ml_contamination, inbox, outbox), daemon=True)
+        for inbox in inboxes
+    ]
+    for process in processes:
+        process.start()
+
+    # Chunks read but not yet replayed, and how many workers still owe scores for each.
+    in_flight: Deque[Tuple[int, List[Dict[str, Any]]]] = deque()
+    outstanding: Dict[int, int] = {}
+
+    def collect(block: bool) -> bool:
+        try:
+            seq, results = outbox.get(block=block, timeout=1 if block else None)
+        except queue.Empty:
+            if any(process.exitcode not in (None, 0) for process in processes):
+                raise RuntimeError("A backtest worker exited before finishing its partition")
+            return False
+        # A service's scores always come from the same worker, in chunk order.
+        for service, service_results in results.items():
+            processor.service_detectors.setdefault(service, _ReplayedDetector()).results.extend(service_results)
+        outstanding[seq] -= 1
+        return True
+
+    def replay_ready(keep: int) -> None:
+        """Replays in-flight chunks in order once scored, waiting while more than `keep` are in flight."""
+        while in_flight:
+            seq, chunk = in_flight[0]
+            while outstanding[seq]:
+                if not collect(block=len(in_flight) > keep) and len(in_flight) <= keep:
+                    return
+            in_flight.popleft()
+            del outstanding[seq]
+            for log_entry in chunk:
+                alert = processor.process_log(log_entry)
+                if alert:
+                    diff.add_replayed(_summarize_alert(alert, log_entry["timestamp"]))
+            _drain(processor)
+
+    logs_replayed = 0
+    try:
+        for seq, chunk in enumerate(storage.iter_logs(since=since, until=until, chunk_size=chunk_size)):
+            partitions: List[Dict[str, List[Tuple[float, float]]]] = [{} for _ in inboxes]
+            if inboxes:
+                for service, samples in ml_samples(chunk).items():
+                    partitions[zlib.crc32(service.encode()) % len(inboxes)][service] = samples
+            outstanding[seq] = 0
+            for inbox, partition in zip(inboxes, partitions):
+                if partition:
+                    inbox.put((seq, partition))
+                    outstanding[seq] += 1
+            in_flight.append((seq, chunk))
+            logs_replayed += len(chunk)
+            replay_ready(keep=queue_depth)
+        replay_ready(keep=0)
+        for inbox in inboxes:
+            inbox.put(None)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "db_path": db_path,
+        "since": since,
+        "until": until,
+        "settings": settings,
+        "ml_enabled": ml_enabled,
+        "workers": len(processes),
+        "logs_replayed": logs_replayed,
+        "elapsed_s": round(elapsed, 3),
+        "events_per_sec": round(logs_replayed / elapsed, 1) if elapsed else 0.0,
+        **diff.report(),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Replayed {report['logs_replayed']} logs in {report['elapsed_s']:.1f}s "
+        f"({report['events_per_sec']:.0f} ev/s, {report['workers']} workers)",
+        f"{'alert type':<32} {'stored':>8} {'replayed':>9} {'matched':>8} {'-stored':>8} {'+replayed':>10}",
+    ]
+    for alert_type, row in report["by_type"].items():
+        lines.append(
+            f"{alert_type:<32} {row['stored']:>8} {row['replayed']:>9} {row['matched']:>8} "
+            f"{row['only_stored']:>8} {row['only_replayed']:>10}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Backtest LogProcessor settings against stored logs")
+    parser.add_argument("--db-path", default=os.getenv("DB_PATH", "data/observability.db"))
+    parser.add_argument(
+        "--shards", type=int, default=int(os.getenv("DB_SHARDS", "1")), help="Shard count the simulator wrote with"
+    )
+    parser.add_argument("--since", help="Inclusive ISO timestamp lower bound")
+    parser.add_argument("--until", help="Exclusive ISO timestamp upper bound")
+    parser.add_argument(
+        "--set",
+        dest="settings",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help=f"Candidate setting (repeatable): {', '.join(TUNABLE_SETTINGS)}",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes scoring the ML rule")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="Logs read from storage per query")
+    parser.add_argument(
+        "--no-ml",
+        action="store_true",
+        help="Skip the IsolationForest rule (and stored ML alerts); by far the most expensive part of a replay",
+    )
+    parser.add_argument("--output", type=Path, help="Write the full JSON report here")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = dict(parse_setting(assignment) for assignment in args.settings)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    report = run_backtest(
+        args.db_path,
+        settings=settings,
+        since=args.since,
+        until=args.until,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        ml_enabled=not args.no_ml,
+        shards=args.shards,
+    )
+    print(format_report(report))
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nReport written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
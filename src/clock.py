@@ -0,0 +1,52 @@
+"""
+Time source for the simulator pipeline.
+
+Everything that stamps, paces or waits (generators, processor, alert engine,
+action automator, ingest sampler and the main loop) takes a Clock. The default
+SYSTEM_CLOCK reads and sleeps on wall-clock time. VirtualClock starts at a
+chosen instant and only moves when something sleeps on it, so `--fast-forward`
+runs simulated hours as fast as the pipeline can process them: every sleep
+returns at once with virtual time advanced by exactly the requested amount,
+and event timestamps, window rules and alert stamps all see that time.
+"""
+
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+class Clock:
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    def __init__(self, start: Optional[datetime] = None):
+        self.start = start or datetime.now()
+        self.elapsed = 0.0
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self.elapsed)
+
+    def time(self) -> float:
+        return self.start.timestamp() + self.elapsed
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self.elapsed += seconds
+
+
+SYSTEM_CLOCK = Clock()
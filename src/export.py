@@ -0,0 +1,58 @@
+"""Chunk encoders for the streaming `/export/*` endpoints."""
+
+import csv
+import io
+import json
+import sqlite3
+from typing import Iterator, List, Optional, Sequence
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Columns stored as JSON text, emitted as nested objects in NDJSON.
+JSON_COLUMNS = {"details"}
+
+
+def encode_ndjson(rows: List[sqlite3.Row], columns: Sequence[str]) -> bytes:
+    lines = []
+    for row in rows:
+        record = {column: row[column] for column in columns}
+        for column in JSON_COLUMNS.intersection(columns):
+            if record[column]:
+                record[column] = json.loads(record[column])
+        lines.append(json.dumps(record, separators=(",", ":")))
+    lines.append("")
+    return "\n".join(lines).encode()
+
+
+def encode_csv(rows: List[sqlite3.Row], columns: Sequence[str], header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if header:
+        writer.writerow(columns)
+    writer.writerows([row[column] for column in columns] for row in rows)
+    return buffer.getvalue().encode()
+
+
+class ChunkEncoder:
+    """
+    Pulls the next chunk of rows and encodes it in one call, so the API can run
+    both the query and the serialization off the event loop.
+    """
+
+    def __init__(self, chunks: Iterator[List[sqlite3.Row]], columns: Sequence[str], fmt: str):
+        self.chunks = chunks
+        self.columns = list(columns)
+        self.fmt = fmt
+        self._header_pending = fmt == "csv"
+
+    def next_chunk(self) -> Optional[bytes]:
+        rows = next(self.chunks, None)
+        if rows is None:
+            if self._header_pending:
+                self._header_pending = False
+                return encode_csv([], self.columns, header=True)
+            return None
+        if self.fmt == "csv":
+            header, self._header_pending = self._header_pending, False
+            return encode_csv(rows, self.columns, header=header)
+        return encode_ndjson(rows, self.columns)
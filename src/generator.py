@@ -1,10 +1,17 @@
-import time
+from __future__ import annotations
+
 import random
 import json
 import logging
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Union
+
+from src.clock import SYSTEM_CLOCK, Clock
+
+if TYPE_CHECKING:
+    import numpy as np
 
 class LogLevel(Enum):
     INFO = "INFO"
@@ -22,8 +29,9 @@ class EventType(Enum):
     MEMORY_SPIKE = "memory_utilization_spike"
 
 class LogGenerator:
-    def __init__(self, output_file: str = None):
+    def __init__(self, output_file: str = None, clock: Clock = SYSTEM_CLOCK):
         self.output_file = output_file
+        self.clock = clock
         # Setup basic logging to console, and optionally to file
         handlers = [logging.StreamHandler()]
         if output_file:
@@ -38,11 +46,10 @@ class LogGenerator:
 
     def generate_log(self) -> Dict[str, Any]:
         """Generates a single simulated log entry."""
-        weights = [0.7, 0.1, 0.05, 0.05, 0.05, 0.025, 0.025]
-        event_type = random.choices(list(EventType), weights=weights)[0]
+        event_type = random.choices(EVENT_TYPES, weights=DEFAULT_EVENT_WEIGHTS)[0]
         
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self.clock.now().isoformat(),
             "service": random.choice(["web-server", "auth-service", "database", "analytics-engine"]),
             "level": self._get_level_for_event(event_type),
             "event_type": event_type.value,
@@ -54,7 +61,8 @@ class LogGenerator:
         
         return log_entry
 
-    def _get_level_for_event(self, event_type: EventType) -> str:
+    @staticmethod
+    def _get_level_for_event(event_type: EventType) -> str:
         if event_type in [EventType.NORMAL, EventType.AUTH_SUCCESS]:
             return LogLevel.INFO.value
         elif event_type in [EventType.AUTH_FAILURE, EventType.CPU_SPIKE, EventType.MEMORY_SPIKE]:
@@ -63,7 +71,8 @@ class LogGenerator:
             return LogLevel.ERROR.value
         return LogLevel.INFO.value
 
-    def _get_message_for_event(self, event_type: EventType) -> str:
+    @staticmethod
+    def _get_message_for_event(event_type: EventType) -> str:
         messages = {
             EventType.NORMAL: "Processed request successfully",
             EventType.AUTH_SUCCESS: "User authentication successful",
@@ -100,10 +109,206 @@ class LogGenerator:
                 log_entry = self.generate_log()
                 # Simulate JSON structured logging
                 self.logger.info(json.dumps(log_entry))
-                time.sleep(interval)
+                self.clock.sleep(interval)
         except KeyboardInterrupt:
             print("\nLog generation stopped.")
 
+EVENT_TYPES = list(EventType)
+DEFAULT_EVENT_WEIGHTS = [0.7, 0.1, 0.05, 0.05, 0.05, 0.025, 0.025]
+DEFAULT_SERVICES = ["web-server", "auth-service", "database", "analytics-engine"]
+AUTH_EVENTS = {EventType.AUTH_SUCCESS, EventType.AUTH_FAILURE}
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """Declarative description of a synthetic traffic shape."""
+
+    name: str
+    event_weights: List[float] = field(default_factory=lambda: list(DEFAULT_EVENT_WEIGHTS))
+    service_count: int = len(DEFAULT_SERVICES)
+    # Peak-to-mean swing of the request rate over a 24h cycle (0 = flat).
+    diurnal_amplitude: float = 0.0
+    # When set, auth failures come from this many attacker IPs instead of the full /24.
+    attacker_ip_pool: Optional[int] = None
+    # When set, events drawn in the first `burst_duration_sec` of every
+    # `burst_every_sec` of the stream use these weights instead.
+    burst_event_weights: Optional[List[float]] = None
+    burst_every_sec: float = 300.0
+    burst_duration_sec: float = 60.0
+
+
+LOAD_PROFILES: Dict[str, LoadProfile] = {
+    "steady": LoadProfile(name="steady"),
+    "diurnal": LoadProfile(name="diurnal", diurnal_amplitude=0.6),
+    "incident": LoadProfile(
+        name="incident",
+        burst_event_weights=[0.35, 0.05, 0.05, 0.2, 0.2, 0.1, 0.05],
+    ),
+    "brute-force": LoadProfile(
+        name="brute-force",
+        event_weights=[0.3, 0.05, 0.6, 0.0125, 0.0125, 0.0125, 0.0125],
+        attacker_ip_pool=3,
+    ),
+    "many-services": LoadProfile(name="many-services", service_count=1000),
+}
+
+
+class BatchLogGenerator:
+    """
+    Vectorized counterpart of LogGenerator that produces N events per call.
+
+    Timestamps are laid out at `rate` events/sec (modulated by the profile's
+    diurnal curve) starting from `start`, and carry on across batches so a
+    stream of batches looks like one continuous feed.
+    """
+
+    def __init__(
+        self,
+        seed: Optional[int] = None,
+        profile: Union[str, LoadProfile] = "steady",
+        rate: float = 100.0,
+        start: Optional[datetime] = None,
+    ):
+        if isinstance(profile, str):
+            if profile not in LOAD_PROFILES:
+                raise ValueError(f"Unknown load profile: {profile}")
+            profile = LOAD_PROFILES[profile]
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        # Imported here so the single-event simulator path doesn't pay for NumPy.
+        import numpy as np
+
+        self.profile = profile
+        self.rate = rate
+        self.rng = np.random.default_rng(seed)
+        self.start = start or datetime.now()
+        self.elapsed = 0.0
+
+        self._event_probs = self._probabilities(self.profile.event_weights)
+        self._burst_probs = None
+        if self.profile.burst_event_weights:
+            self._burst_probs = self._probabilities(self.profile.burst_event_weights)
+        self._levels = np.array([LogGenerator._get_level_for_event(e) for e in EVENT_TYPES])
+        self._messages = np.array([LogGenerator._get_message_for_event(e) for e in EVENT_TYPES])
+        self._event_values = np.array([e.value for e in EVENT_TYPES])
+        if self.profile.service_count == len(DEFAULT_SERVICES):
+            self._services = np.array(DEFAULT_SERVICES)
+        else:
+            self._services = np.array([f"service-{i:04d}" for i in range(self.profile.service_count)])
+
+    @staticmethod
+    def _probabilities(weights: List[float]) -> np.ndarray:
+        import numpy as np
+
+        weights = np.asarray(weights, dtype=float)
+        return weights / weights.sum()
+
+    def _next_offsets(self, n: int) -> np.ndarray:
+        import numpy as np
+
+        gaps = np.full(n, 1.0 / self.rate)
+        amplitude = self.profile.diurnal_amplitude
+        if amplitude:
+            # Evaluate the curve on the unmodulated schedule; close enough for one batch.
+            seconds = self.start.hour * 3600 + self.start.minute * 60 + self.elapsed + np.arange(n) / self.rate
+            phase = 2 * np.pi * (seconds / 86400.0 - 0.25)
+            gaps /= np.maximum(1.0 + amplitude * np.sin(phase), 0.05)
+        offsets = self.elapsed + np.cumsum(gaps) - gaps[0]
+        self.elapsed = float(offsets[-1] + gaps[-1])
+        return offsets
+
+    def generate_columns(self, n: int) -> Dict[str, np.ndarray]:
+        """
+        Generates `n` events as a dict of equal-length arrays.
+
+        Missing metrics are NaN. `offset_s` is seconds since `start`, which
+        callers can use to pace delivery.
+        """
+        import numpy as np
+
+        rng = self.rng
+        offsets = self._next_offsets(n)
+        event_idx = rng.choice(len(EVENT_TYPES), size=n, p=self._event_probs)
+        if self._burst_probs is not None:
+            in_burst = offsets % self.profile.burst_every_sec < self.profile.burst_duration_sec
+            event_idx[in_burst] = rng.choice(len(EVENT_TYPES), size=int(in_burst.sum()), p=self._burst_probs)
+
+        base = np.datetime64(self.start, "us")
+        timestamps = np.datetime_as_string(base + (offsets * 1e6).astype("timedelta64[us]"), unit="us")
+
+        cpu_spike = event_idx == EVENT_TYPES.index(EventType.CPU_SPIKE)
+        mem_spike = event_idx == EVENT_TYPES.index(EventType.MEMORY_SPIKE)
+        timeout = event_idx == EVENT_TYPES.index(EventType.TIMEOUT)
+
+        cpu = np.where(cpu_spike, rng.uniform(85.0, 99.9, n), rng.uniform(10.0, 40.0, n))
+        cpu[mem_spike] = np.nan
+        memory = np.where(mem_spike, rng.uniform(85.0, 99.9, n), rng.uniform(20.0, 50.0, n))
+        memory[cpu_spike] = np.nan
+        response = np.where(timeout, rng.uniform(5000, 10000, n), rng.uniform(10, 200, n))
+
+        auth = np.isin(event_idx, [EVENT_TYPES.index(e) for e in AUTH_EVENTS])
+        host = rng.integers(1, 255, n)
+        if self.profile.attacker_ip_pool:
+            failure = event_idx == EVENT_TYPES.index(EventType.AUTH_FAILURE)
+            host = np.where(failure, rng.integers(1, self.profile.attacker_ip_pool + 1, n), host)
+        prefix = np.where(auth, "203.0.113.", "10.0.1.")
+
+        return {
+            "timestamp": timestamps,
+            "offset_s": offsets,
+            "service": self._services[rng.integers(0, len(self._services), n)],
+            "level": self._levels[event_idx],
+            "event_type": self._event_values[event_idx],
+            "message": self._messages[event_idx],
+            "cpu_usage": cpu,
+            "memory_usage": memory,
+            "response_time_ms": response,
+            "trace_id": np.char.add("trace-", rng.integers(10000, 100000, n).astype(str)),
+            "source_ip": np.char.add(prefix, host.astype(str)),
+        }
+
+    @staticmethod
+    def to_records(columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+        """Converts columnar output to the same dict shape as LogGenerator.generate_log."""
+        records = []
+        fields = zip(
+            columns["timestamp"].tolist(),
+            columns["service"].tolist(),
+            columns["level"].tolist(),
+            columns["event_type"].tolist(),
+            columns["message"].tolist(),
+            columns["cpu_usage"].tolist(),
+            columns["memory_usage"].tolist(),
+            columns["response_time_ms"].tolist(),
+            columns["trace_id"].tolist(),
+            columns["source_ip"].tolist(),
+        )
+        for ts, service, level, event_type, message, cpu, memory, response, trace_id, ip in fields:
+            metrics = {}
+            if cpu == cpu:
+                metrics["cpu_usage"] = cpu
+            if memory == memory:
+                metrics["memory_usage"] = memory
+            metrics["response_time_ms"] = response
+            records.append(
+                {
+                    "timestamp": ts,
+                    "service": service,
+                    "level": level,
+                    "event_type": event_type,
+                    "message": message,
+                    "metrics": metrics,
+                    "trace_id": trace_id,
+                    "source_ip": ip,
+                }
+            )
+        return records
+
+    def generate_batch(self, n: int) -> List[Dict[str, Any]]:
+        """Generates `n` events as log-entry dicts."""
+        return self.to_records(self.generate_columns(n))
+
+
 if __name__ == "__main__":
     generator = LogGenerator()
     generator.start_stream(interval=0.5)
@@ -0,0 +1,314 @@
+"""
+In-memory hot tier for the newest logs and alerts, kept current across
+processes by a Unix datagram feed.
+
+Every process that writes through a Storage publishes each committed row as
+one datagram to the peer sockets found in the feed directory (which lives
+next to the SQLite file, so containers sharing the data volume share the
+feed). Readers bind their own socket there and apply what they receive to
+fixed-size rings of pre-serialized JSON. Datagrams carry a per-sender sequence
+number; a gap (a full receive buffer drops datagrams) marks the tier stale and
+the next read re-primes it from SQLite.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+FEED_SUFFIX = ".sock"
+PEER_REFRESH_SECONDS = 1.0
+RECEIVE_BUFFER_BYTES = 4 * 1024 * 1024
+MAX_DATAGRAM_BYTES = 64 * 1024
+
+
+def dumps(row: Dict[str, Any]) -> bytes:
+    return json.dumps(row, separators=(",", ":")).encode()
+
+
+class HotRing:
+    """The newest `capacity` rows of one table, keyed and ordered by row id."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.complete = False  # Holds every row of the table, not just the newest.
+        self._rows: "OrderedDict[int, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, row_id: int) -> bool:
+        return row_id in self._rows
+
+    @property
+    def min_id(self) -> int:
+        return next(iter(self._rows), 0)
+
+    @property
+    def max_id(self) -> int:
+        return next(reversed(self._rows), 0)
+
+    def put(self, row_id: int, payload: bytes) -> None:
+        if row_id in self._rows:
+            self._rows[row_id] = payload
+            return
+        if len(self._rows) >= self.capacity and row_id < self.min_id:
+            return  # Older than anything kept.
+        out_of_order = bool(self._rows) and row_id < self.max_id
+        self._rows[row_id] = payload
+        if out_of_order:
+            self._rows = OrderedDict(sorted(self._rows.items()))
+        while len(self._rows) > self.capacity:
+            self._rows.popitem(last=False)
+            self.complete = False
+
+    def replace(self, row_id: int, payload: bytes) -> None:
+        """Updates a row only if it is still held."""
+        if row_id in self._rows:
+            self._rows[row_id] = payload
+
+    def newest(self, limit: int) -> List[bytes]:
+        rows = []
+        for row_id in reversed(self._rows):
+            if len(rows) >= limit:
+                break
+            rows.append(self._rows[row_id])
+        return rows
+
+    def after(self, after_id: int, limit: int) -> List[bytes]:
+        rows = []
+        for row_id, payload in self._rows.items():
+            if row_id > after_id:
+                rows.append(payload)
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    def load(self, rows: Iterable[Tuple[int, bytes]]) -> None:
+        self._rows.clear()
+        for row_id, payload in rows:
+            self.put(row_id, payload)
+        self.complete = len(self._rows) < self.capacity
+
+
+class HotTier:
+    """
+    Rings of the newest logs and alerts. `ready` is False until the first
+    prime and again whenever the feed reports missed rows; callers re-prime
+    before serving from it, and otherwise catch up on rows from writers that
+    don't publish to the feed, at most once per `catch_up_interval` seconds
+    for each ring.
+    """
+
+    def __init__(self, log_capacity: int = 2000, alert_capacity: int = 1000, catch_up_interval: float = 0.5):
+        self.rings = {"log": HotRing(log_capacity), "alert": HotRing(alert_capacity)}
+        self.catch_up_interval = catch_up_interval
+        self._last_catch_up = {kind: float("-inf") for kind in self.rings}
+        self.ready = False
+        self.primes = 0
+        self.catch_ups = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def prime(self, loader: Callable[[Dict[str, int]], Dict[str, List[Tuple[int, bytes]]]]) -> None:
+        """
+        Reloads both rings from `loader(capacities)`. The loader runs under the
+        lock, so feed messages for rows committed after its snapshot are
+        applied after it rather than wiped by it.
+        """
+        with self.lock:
+            if self.ready:
+                return
+            loaded = loader({kind: ring.capacity for kind, ring in self.rings.items()})
+            for kind, ring in self.rings.items():
+                ring.load(loaded[kind])
+            self.ready = True
+            self.primes += 1
+
+    def catch_up(self, kind: str, loader: Callable[[str, int, int], List[Tuple[int, bytes]]]) -> None:
+        """
+        Adds the `kind` rows newer than the ring's newest from
+        `loader(kind, after_id, limit)`: rows committed by a writer that doesn't
+        publish, or whose datagrams are still in flight (applying those twice
+        is harmless). The loader runs outside the lock; it is one indexed range
+        query that usually returns nothing, so it is skipped if the last one for
+        `kind` ran less than `catch_up_interval` seconds ago.
+        """
+        now = time.monotonic()
+        with self.lock:
+            if now - self._last_catch_up[kind] < self.catch_up_interval:
+                return
+            self._last_catch_up[kind] = now
+            ring = self.rings[kind]
+            after_id = ring.max_id
+        rows = loader(kind, after_id, ring.capacity)
+        if not rows:
+            return
+        with self.lock:
+            for row_id, payload in rows:
+                ring.put(row_id, payload)
+            if len(rows) >= ring.capacity:
+                ring.complete = False  # Older unpublished rows may not have been loaded.
+            self.catch_ups += 1
+
+    def mark_stale(self) -> None:
+        with self.lock:
+            self.ready = False
+
+    def apply(self, kind: str, op: str, row_id: int, payload: bytes) -> None:
+        with self.lock:
+            ring = self.rings[kind]
+            if op == "insert":
+                ring.put(row_id, payload)
+            else:
+                ring.replace(row_id, payload)
+
+    def newest(self, kind: str, limit: int) -> Optional[List[bytes]]:
+        """The newest `limit` rows newest first, or None if memory cannot answer."""
+        with self.lock:
+            ring = self.rings[kind]
+            if not self.ready or (limit > len(ring) and not ring.complete):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return ring.newest(limit)
+
+    def after(self, kind: str, after_id: int, limit: int) -> Optional[List[bytes]]:
+        """Rows with id > `after_id` oldest first, or None if some may have been evicted."""
+        with self.lock:
+            ring = self.rings[kind]
+            if not self.ready or (after_id < ring.min_id - 1 and not ring.complete):
+                self.misses += 1
+                return None
+            self.hits += 1
+            return ring.after(after_id, limit)
+
+    def max_id(self, kind: str) -> Optional[int]:
+        with self.lock:
+            return self.rings[kind].max_id if self.ready else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "ready": self.ready,
+                "primes": self.primes,
+                "catch_ups": self.catch_ups,
+                "hits": self.hits,
+                "misses": self.misses,
+                **{f"{kind}s": len(ring) for kind, ring in self.rings.items()},
+            }
+
+
+class HotTierFeed:
+    """
+    Publishes row changes to peer processes and, when `on_message` is given,
+    receives theirs on a socket bound in `directory`.
+    """
+
+    def __init__(self, directory: str, on_message: Optional[Callable[[Dict[str, Any], bytes], None]] = None,
+                 on_gap: Optional[Callable[[], None]] = None):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.source = uuid.uuid4().hex[:12]
+        self._seq = 0
+        self._send_lock = threading.Lock()
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._peers: List[str] = []
+        self._peers_at = 0.0
+        self._path: Optional[Path] = None
+        self._receiver: Optional[socket.socket] = None
+        self._on_message = on_message
+        self._on_gap = on_gap
+        self._last_seq: Dict[str, int] = {}
+        self._closed = threading.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.gaps = 0
+        if on_message is not None:
+            self._path = self.directory / f"{os.getpid()}-{self.source}{FEED_SUFFIX}"
+            self._receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_BYTES)
+            self._receiver.bind(str(self._path))
+            self._receiver.settimeout(0.5)
+            threading.Thread(target=self._receive_loop, name="hot-tier-feed", daemon=True).start()
+
+    @staticmethod
+    def supported() -> bool:
+        return hasattr(socket, "AF_UNIX")
+
+    def _peer_paths(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_at >= PEER_REFRESH_SECONDS:
+            own = str(self._path) if self._path else None
+            self._peers = [
+                str(path) for path in self.directory.glob(f"*{FEED_SUFFIX}") if str(path) != own
+            ]
+            self._peers_at = now
+        return self._peers
+
+    def publish(self, kind: str, op: str, rows: Iterable[Tuple[int, bytes]]) -> None:
+        with self._send_lock:
+            peers = self._peer_paths()
+            for row_id, payload in rows:
+                self._seq += 1
+                if not peers:
+                    continue
+                header = dumps({"src": self.source, "seq": self._seq, "kind": kind, "op": op, "id": row_id})
+                datagram = header + b"\n" + payload
+                for peer in list(peers):
+                    try:
+                        self._sender.sendto(datagram, peer)
+                        self.sent += 1
+                    except (ConnectionRefusedError, FileNotFoundError):
+                        # A process that exited without unlinking its socket.
+                        peers.remove(peer)
+                        try:
+                            os.unlink(peer)
+                        except OSError:
+                            pass
+                    except OSError:
+                        # Full receive buffer or oversized row: the peer sees a
+                        # sequence gap and re-primes from SQLite.
+                        self.dropped += 1
+
+    def _receive_loop(self) -> None:
+        while not self._closed.is_set():
+            try:
+                datagram = self._receiver.recv(MAX_DATAGRAM_BYTES)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            header, _, payload = datagram.partition(b"\n")
+            try:
+                message = json.loads(header)
+            except ValueError:
+                continue
+            source, seq = message["src"], message["seq"]
+            last = self._last_seq.get(source)
+            self._last_seq[source] = seq
+            # A new sender may have committed rows before it found our socket, so
+            # its first message counts as a gap too.
+            if last is None or seq != last + 1:
+                self.gaps += 1
+                if self._on_gap:
+                    self._on_gap()
+            self._on_message(message, payload)
+
+    def close(self) -> None:
+        self._closed.set()
+        self._sender.close()
+        if self._receiver is not None:
+            self._receiver.close()
+        if self._path is not None:
+            try:
+                self._path.unlink()
+            except OSError:
+                pass
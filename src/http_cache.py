@@ -0,0 +1,172 @@
+"""
+Conditional GET support, a short-TTL response cache and content negotiation
+(gzip/brotli, optional msgpack) for the API's polled read endpoints.
+
+brotli and msgpack are optional: without them responses fall back to gzip and
+JSON respectively.
+"""
+
+import gzip
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+MIN_COMPRESS_BYTES = 512
+
+
+def choose_media_type(accept: str, allow_msgpack: bool) -> str:
+    if allow_msgpack and msgpack is not None and any(media in accept for media in MSGPACK_MEDIA_TYPES):
+        return MSGPACK_MEDIA_TYPES[0]
+    return JSON_MEDIA_TYPE
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    offered = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in {"q=0", "q=0.0"}:
+            continue
+        offered.add(coding.strip().lower())
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+def http_date(sqlite_timestamp: Optional[str]) -> Optional[str]:
+    """Formats a UTC `CURRENT_TIMESTAMP` value as an HTTP date."""
+    if not sqlite_timestamp:
+        return None
+    parsed = datetime.fromisoformat(sqlite_timestamp).replace(tzinfo=timezone.utc)
+    return format_datetime(parsed, usegmt=True)
+
+
+def is_not_modified(headers: Any, etag: str, last_modified: Optional[str]) -> bool:
+    """RFC 9110 evaluation: If-None-Match wins; If-Modified-Since only applies without it."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class CachedBody:
+    """One rendered representation plus its compressed variants, built on demand."""
+
+    def __init__(self, version: str, media_type: str, body: bytes):
+        self.version = version
+        self.media_type = media_type
+        self._encoded: Dict[Optional[str], bytes] = {None: body}
+        self._lock = threading.Lock()
+
+    def ready(self, coding: Optional[str]) -> bool:
+        """True if `coding` needs no compression work (cached or not applicable)."""
+        return coding is None or coding in self._encoded or len(self._encoded[None]) < MIN_COMPRESS_BYTES
+
+    def encoded(self, coding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        identity = self._encoded[None]
+        if coding is None or len(identity) < MIN_COMPRESS_BYTES:
+            return identity, None
+        with self._lock:
+            if coding not in self._encoded:
+                if coding == "br":
+                    self._encoded[coding] = brotli.compress(identity, quality=5)
+                else:
+                    self._encoded[coding] = gzip.compress(identity, compresslevel=6, mtime=0)
+            return self._encoded[coding], coding
+
+
+class ResponseCache:
+    """
+    Data versions (re-read at most every `ttl` seconds) and the last rendered
+    body per URL and media type. Writes made through this process call
+    invalidate(); writes from other processes show up within `ttl`.
+    """
+
+    def __init__(self, ttl: float = 1.0, max_entries: int = 128):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._versions: Optional[Dict[str, Dict[str, Any]]] = None
+        self._versions_at = 0.0
+        self._entries: "OrderedDict[Tuple[str, str], CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def versions(self, loader: Callable[[], Dict[str, Dict[str, Any]]]) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            if self._versions is not None and now - self._versions_at < self.ttl:
+                return self._versions
+        versions = loader()
+        with self._lock:
+            self._versions, self._versions_at = versions, now
+        return versions
+
+    def cached_versions(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        """The versions if still fresh, without loading them."""
+        with self._lock:
+            if self._versions is not None and time.monotonic() - self._versions_at < self.ttl:
+                return self._versions
+        return None
+
+    def get(self, key: Tuple[str, str], version: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Tuple[str, str], entry: CachedBody) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._versions = None
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+            }
+
+
+def encode_body(json_body: bytes, media_type: str) -> bytes:
+    if media_type == JSON_MEDIA_TYPE:
+        return json_body
+    return msgpack.packb(json.loads(json_body), use_bin_type=True)
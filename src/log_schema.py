@@ -0,0 +1,269 @@
+"""
+Dictionary-encoded storage for logs.
+
+`service`, `level` and `event_type` are stored as integer references into small
+dimension tables, and each `message` as a template id plus its variable parts:
+runs of digits (counts, durations, IP octets) become `{}` placeholders and
+their values a JSON array in `message_params`, which is NULL for messages
+without any. The physical table is `log_rows`; a `logs` view joins it back to
+the original column set, so every reader keeps querying `logs` unchanged.
+
+Databases created before this layout keep a plain `logs` table until they are
+converted (stop the simulator first):
+
+    python -m src.log_schema --db-path data/observability.db --vacuum
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Dimension table per encoded logs column.
+DIMENSIONS = {"service": "log_services", "level": "log_levels", "event_type": "log_event_types"}
+PARAM_PATTERN = re.compile(r"\d+(?:[.:]\d+)*")
+PLACEHOLDER = "{}"
+MESSAGE_CACHE_SIZE = 10_000
+
+INSERT_LOG_ROW = """
+    INSERT INTO log_rows (
+        timestamp, service_id, level_id, event_type_id, template_id, message_params,
+        trace_id, source_ip, cpu_usage, memory_usage, response_time_ms, sample_weight
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# LEFT JOINs on primary keys let SQLite drop the joins a query doesn't use, so
+# e.g. MAX(id) or a trace_id lookup on the view only touches log_rows.
+LOGS_VIEW = """
+    CREATE VIEW IF NOT EXISTS logs AS
+    SELECT r.id AS id,
+           r.timestamp AS timestamp,
+           s.name AS service,
+           l.name AS level,
+           e.name AS event_type,
+           CASE WHEN r.message_params IS NULL THEN t.template
+                ELSE render_message(t.template, r.message_params) END AS message,
+           r.trace_id AS trace_id,
+           r.source_ip AS source_ip,
+           r.cpu_usage AS cpu_usage,
+           r.memory_usage AS memory_usage,
+           r.response_time_ms AS response_time_ms,
+           r.sample_weight AS sample_weight,
+           r.created_at AS created_at
+    FROM log_rows r
+    LEFT JOIN log_services s ON s.id = r.service_id
+    LEFT JOIN log_levels l ON l.id = r.level_id
+    LEFT JOIN log_event_types e ON e.id = r.event_type_id
+    LEFT JOIN log_templates t ON t.id = r.template_id
+"""
+
+
+def split_message(message: str) -> Tuple[str, Optional[str]]:
+    """(template, JSON params or None) for a log message; see render_message."""
+    params = PARAM_PATTERN.findall(message)
+    if not params or PLACEHOLDER in message:
+        return message, None
+    return PARAM_PATTERN.sub(PLACEHOLDER, message), json.dumps(params, separators=(",", ":"))
+
+
+def render_message(template: Optional[str], params: Optional[str]) -> Optional[str]:
+    """Inverse of split_message; registered on every Storage connection for the logs view."""
+    if params is None or template is None:
+        return template
+    parts = template.split(PLACEHOLDER)
+    values = json.loads(params)
+    return "".join(part + value for part, value in zip(parts, values)) + parts[-1]
+
+
+def logs_layout(conn: sqlite3.Connection) -> Optional[str]:
+    """'table' for the original one-table layout, 'view' for the encoded one, None for a new database."""
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = 'logs'").fetchone()
+    return row[0] if row else None
+
+
+def create_compact_logs(conn: sqlite3.Connection, view: bool = True) -> None:
+    for table in DIMENSIONS.values():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS log_templates (id INTEGER PRIMARY KEY, template TEXT NOT NULL UNIQUE)"
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS log_rows (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            service_id INTEGER NOT NULL,
+            level_id INTEGER NOT NULL,
+            event_type_id INTEGER NOT NULL,
+            template_id INTEGER NOT NULL,
+            message_params TEXT,
+            trace_id TEXT,
+            source_ip TEXT,
+            cpu_usage REAL,
+            memory_usage REAL,
+            response_time_ms REAL,
+            sample_weight INTEGER NOT NULL DEFAULT 1,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    if view:
+        conn.execute(LOGS_VIEW)
+
+
+class LogDictionary:
+    """
+    Maps log strings to dimension and template ids for one database, caching
+    them in memory. New entries are committed as soon as they are created, so
+    a cached id always refers to a committed row; encode a batch before
+    inserting any of its rows, or the commit would take those rows with it.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, Dict[str, int]] = {table: {} for table in (*DIMENSIONS.values(), "log_templates")}
+        self._messages: Dict[str, Tuple[int, Optional[str]]] = {}
+
+    def _id(self, conn: sqlite3.Connection, table: str, value: str) -> int:
+        cached = self._ids[table].get(value)
+        if cached is not None:
+            return cached
+        column = "template" if table == "log_templates" else "name"
+        conn.execute(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (value,))
+        conn.commit()
+        row_id = conn.execute(f"SELECT id FROM {table} WHERE {column} = ?", (value,)).fetchone()[0]
+        self._ids[table][value] = row_id
+        return row_id
+
+    def message(self, conn: sqlite3.Connection, message: str) -> Tuple[int, Optional[str]]:
+        """(template_id, message_params) for `message`."""
+        encoded = self._messages.get(message)
+        if encoded is None:
+            template, params = split_message(message)
+            encoded = (self._id(conn, "log_templates", template), params)
+            if len(self._messages) >= MESSAGE_CACHE_SIZE:
+                self._messages.clear()
+            self._messages[message] = encoded
+        return encoded
+
+    def encode(
+        self, conn: sqlite3.Connection, service: str, level: str, event_type: str, message: str
+    ) -> Tuple[int, int, int, int, Optional[str]]:
+        """(service_id, level_id, event_type_id, template_id, message_params)."""
+        return (
+            self._id(conn, "log_services", service),
+            self._id(conn, "log_levels", level),
+            self._id(conn, "log_event_types", event_type),
+            *self.message(conn, message),
+        )
+
+
+def convert_legacy_logs(conn: sqlite3.Connection) -> int:
+    """
+    Rewrites a one-table `logs` into log_rows plus dimensions, keeping row ids,
+    and replaces it with the view, in one transaction. `conn` must be in
+    autocommit mode (isolation_level=None). Returns the number of rows converted.
+    """
+    if logs_layout(conn) != "table":
+        return 0
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        create_compact_logs(conn, view=False)
+        for column, table in DIMENSIONS.items():
+            conn.execute(f"INSERT OR IGNORE INTO {table} (name) SELECT DISTINCT {column} FROM logs")
+
+        # Templates are derived once per distinct message rather than once per row.
+        conn.execute(
+            "CREATE TEMP TABLE message_map (message TEXT PRIMARY KEY, template_id INTEGER, params TEXT)"
+        )
+        messages = conn.execute("SELECT DISTINCT message FROM logs")
+        while True:
+            batch = messages.fetchmany(10_000)
+            if not batch:
+                break
+            rows = []
+            for (message,) in batch:
+                template, params = split_message(message)
+                conn.execute("INSERT OR IGNORE INTO log_templates (template) VALUES (?)", (template,))
+                rows.append((message, template, params))
+            conn.executemany(
+                "INSERT INTO message_map SELECT ?, (SELECT id FROM log_templates WHERE template = ?), ?", rows
+            )
+
+        converted = conn.execute(
+            """
+            INSERT INTO log_rows (
+                id, timestamp, service_id, level_id, event_type_id, template_id, message_params,
+                trace_id, source_ip, cpu_usage, memory_usage, response_time_ms, sample_weight, created_at
+            )
+            SELECT g.id, g.timestamp, s.id, l.id, e.id, m.template_id, m.params,
+                   g.trace_id, g.source_ip, g.cpu_usage, g.memory_usage, g.response_time_ms,
+                   g.sample_weight, g.created_at
+            FROM logs g
+            JOIN log_services s ON s.name = g.service
+            JOIN log_levels l ON l.name = g.level
+            JOIN log_event_types e ON e.name = g.event_type
+            JOIN temp.message_map m ON m.message = g.message
+            ORDER BY g.id
+            """
+        ).rowcount
+        # Ids are never reused, including those of rows deleted from the old table.
+        conn.execute(
+            """
+            UPDATE sqlite_sequence
+            SET seq = MAX(seq, COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'logs'), 0))
+            WHERE name = 'log_rows'
+            """
+        )
+        conn.execute("DROP TABLE temp.message_map")
+        conn.execute("DROP TABLE logs")
+        conn.execute(LOGS_VIEW)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return converted
+
+
+def main(argv: List[str] = None) -> int:
+    from src.storage import Storage
+
+    parser = argparse.ArgumentParser(description="Convert a logs table to the dictionary-encoded layout")
+    parser.add_argument("--db-path", default=os.getenv("DB_PATH", "data/observability.db"))
+    parser.add_argument("--vacuum", action="store_true", help="Rebuild the file afterwards to return freed pages")
+    args = parser.parse_args(argv)
+
+    db_path = Path(args.db_path)
+    if not db_path.exists():
+        parser.error(f"{db_path} does not exist")
+    size_before = db_path.stat().st_size
+    # Brings the old table up to the current columns (e.g. sample_weight) first.
+    Storage(db_path=str(db_path))
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.create_function("render_message", 2, render_message, deterministic=True)
+    try:
+        started = time.perf_counter()
+        converted = convert_legacy_logs(conn)
+        if not converted and logs_layout(conn) == "view":
+            print(f"{db_path} already uses the dictionary-encoded logs layout")
+        else:
+            print(f"Converted {converted} logs in {time.perf_counter() - started:.1f}s")
+        # Indexes on the new table, under their old names.
+        Storage(db_path=str(db_path))
+        if args.vacuum:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+    print(f"Database size: {size_before / 1e6:.1f} MB -> {db_path.stat().st_size / 1e6:.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,15 +3,75 @@ import sys
 import os
 import random
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
 
 # Add src to path if running from root
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
-from src.generator import LogGenerator
-from src.processor import LogProcessor
+from src.generator import LOAD_PROFILES, BatchLogGenerator, LogGenerator
+from src.processor import DetectorPool, LogProcessor
 from src.alerts import AlertEngine
 from src.actions import ActionAutomator
-from src.storage import Storage
+from src.clock import SYSTEM_CLOCK, Clock, VirtualClock
+from src.overload import POLICIES, PRIORITY_NAMES, OverloadController
+from src.sampling import IngestSampler
+from src.sharding import open_storage
+from src import profiling, telemetry
+
+
+class RateLimitedStream:
+    """
+    Iterates log entries from batched generation, paced so that each entry is
+    released no earlier than its scheduled offset. No random sleeps: when the
+    pipeline falls behind, entries are released back-to-back until it catches up.
+    `waited` holds the seconds slept before the most recent entry.
+    """
+
+    def __init__(self, generator: BatchLogGenerator, batch_size: int, clock: Clock = SYSTEM_CLOCK):
+        self.generator = generator
+        self.batch_size = batch_size
+        self.clock = clock
+        self.waited = 0.0
+        self._pending = iter(())
+        self._next: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._wall_start = clock.monotonic()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        offset, log_entry = self._peek()
+        self._next = None
+        delay = offset - (self.clock.monotonic() - self._wall_start)
+        self.waited = max(0.0, delay)
+        self.clock.sleep(delay)
+        return log_entry
+
+    def due(self, wait: bool = True) -> List[Dict[str, Any]]:
+        """
+        Returns every entry whose scheduled offset has passed. With `wait`, sleeps
+        for the next entry when none is due yet instead of returning nothing.
+        """
+        if wait:
+            entries = [next(self)]
+        else:
+            entries, self.waited = [], 0.0
+        elapsed = self.clock.monotonic() - self._wall_start
+        while self._peek()[0] <= elapsed:
+            entries.append(self._peek()[1])
+            self._next = None
+        return entries
+
+    def _peek(self) -> Tuple[float, Dict[str, Any]]:
+        if self._next is None:
+            self._next = next(self._pending, None)
+            if self._next is None:
+                columns = self.generator.generate_columns(self.batch_size)
+                self._pending = zip(columns["offset_s"].tolist(), self.generator.to_records(columns))
+                self._next = next(self._pending)
+        return self._next
 
 
 def main():
@@ -25,57 +85,286 @@ def main():
         help="SQLite database path for persistence",
         default="data/observability.db",
     )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="Split storage into this many per-service-hash SQLite files so parallel writers don't share a "
+        "write lock (the API needs the same DB_SHARDS)",
+        default=int(os.getenv("DB_SHARDS", "1")),
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="Target events/sec; replaces the random min/max interval sleeps with batched generation",
+        default=None,
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(LOAD_PROFILES),
+        help="Load profile used with --rate",
+        default="steady",
+    )
+    parser.add_argument("--seed", type=int, help="Seed for the --rate generator", default=None)
+    parser.add_argument("--batch-size", type=int, help="Events generated per batch with --rate", default=1000)
+    parser.add_argument(
+        "--fast-forward",
+        action="store_true",
+        help="Run on a virtual clock: sleeps advance simulated time instantly, so --duration is simulated "
+        "seconds and traffic is processed as fast as the pipeline allows",
+    )
+    parser.add_argument(
+        "--start",
+        type=datetime.fromisoformat,
+        help="Simulated start time (ISO 8601) for --fast-forward; default now",
+        default=None,
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve internal Prometheus metrics on this port (/metrics)",
+        default=None,
+    )
+    parser.add_argument(
+        "--no-internal-metrics",
+        action="store_true",
+        help="Disable hot-path instrumentation entirely",
+    )
+    parser.add_argument(
+        "--profiling",
+        action="store_true",
+        help="Run the sampling profiler and record per-event stage timings",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=str,
+        help="Collapsed-stack output file for --profiling (flamegraph.pl/speedscope format)",
+        default="data/profile.collapsed",
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        help="Seconds between profiler samples",
+        default=0.005,
+    )
+    parser.add_argument(
+        "--detector-memory-mb",
+        type=float,
+        help="Memory budget for per-service anomaly detectors; least recently used ones are evicted beyond it",
+        default=256.0,
+    )
+    parser.add_argument(
+        "--detector-spill-dir",
+        type=str,
+        help="Pickle evicted detectors here and reload them on next use instead of retraining",
+        default=None,
+    )
+    parser.add_argument(
+        "--sample-target-rate",
+        type=float,
+        help="Store about this many routine INFO logs per second, 1-in-k with k adapted to load "
+        "(WARNING/ERROR and auth events are always stored; default: store everything)",
+        default=None,
+    )
+    parser.add_argument(
+        "--sample-max-weight",
+        type=int,
+        help="Upper bound on k for --sample-target-rate",
+        default=100,
+    )
+    parser.add_argument(
+        "--overload-policy",
+        choices=["off", *POLICIES],
+        help="With --rate, queue events by priority and shed (or merge) stale low-priority ones when the "
+        "processor falls behind",
+        default="aggregate",
+    )
+    parser.add_argument(
+        "--overload-lag",
+        type=float,
+        help="Seconds behind its timestamp before a routine event is shed or merged and events skip anomaly "
+        "scoring",
+        default=2.0,
+    )
+    parser.add_argument(
+        "--no-hot-tier-feed",
+        action="store_true",
+        help="Don't publish written rows to the API's in-memory hot tier",
+    )
     args = parser.parse_args()
+    if args.start and not args.fast_forward:
+        parser.error("--start needs --fast-forward")
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.overload_lag <= 0:
+        parser.error("--overload-lag must be positive")
+    if args.sample_target_rate is not None and args.sample_target_rate <= 0:
+        parser.error("--sample-target-rate must be positive")
     min_interval = max(0.01, args.min_interval)
     max_interval = max(min_interval, args.max_interval)
 
+    if args.no_internal_metrics:
+        telemetry.set_enabled(False)
+
     print("Initializing Cloud Observability & Automated Response Platform Simulation...")
     if args.duration:
         print(f"Running for {args.duration} seconds...")
     print("Press Ctrl+C to stop.")
-    time.sleep(1)
 
     # Initialize components
-    generator = LogGenerator()
-    processor = LogProcessor()
-    alert_engine = AlertEngine()
-    automator = ActionAutomator()
-    storage = Storage(db_path=args.db_path)
+    clock = VirtualClock(args.start) if args.fast_forward else SYSTEM_CLOCK
+    generator = LogGenerator(clock=clock)
+    processor = LogProcessor(clock=clock)
+    processor.service_detectors = DetectorPool(
+        max_bytes=int(args.detector_memory_mb * 1024 * 1024), spill_dir=args.detector_spill_dir
+    )
+    alert_engine = AlertEngine(clock=clock)
+    automator = ActionAutomator(clock=clock)
+    storage = open_storage(args.db_path, shards=args.shards, feed=not args.no_hot_tier_feed)
+    sampler = IngestSampler(
+        target_rate=args.sample_target_rate, max_weight=max(1, args.sample_max_weight), clock=clock
+    )
+
+    profiler = None
+    if args.profiling:
+        profiler = profiling.SamplingProfiler(args.profile_output, interval=args.profile_interval).start()
+        print(f"Profiling enabled; collapsed stacks written to {args.profile_output}")
+
+    if args.metrics_port and (telemetry.is_enabled() or args.profiling):
+        telemetry.start_http_server(
+            args.metrics_port,
+            extra_routes={"/debug/stage-traces": profiling.render_traces} if args.profiling else None,
+        )
+        print(f"Internal metrics served on :{args.metrics_port}/metrics")
 
     print("Components initialized. Starting log stream...\n")
 
-    start_time = time.time()
+    if args.rate:
+        batch_generator = BatchLogGenerator(seed=args.seed, profile=args.profile, rate=args.rate, start=clock.now())
+        stream = RateLimitedStream(batch_generator, max(1, args.batch_size), clock=clock)
+    else:
+        stream = None
+    # A virtual clock only moves between events, so fast-forward runs never fall behind it.
+    controller = actions = None
+    if stream and args.overload_policy != "off" and not args.fast_forward:
+        controller = OverloadController(policy=args.overload_policy, lag_threshold=args.overload_lag, clock=clock)
+        # Remediation waits run on a worker so they don't stall detection.
+        actions = ThreadPoolExecutor(max_workers=1, thread_name_prefix="remediation")
+
+    def ingest(log_entries):
+        storage.insert_logs([row for row in map(sampler.sample, log_entries) if row is not None])
+        for log_entry in log_entries:
+            # Print log summary (simulating log ingestion)
+            if log_entry['level'] in ['ERROR', 'CRITICAL', 'WARNING']:
+                print(f"[{log_entry['timestamp']}] {log_entry['level']}: {log_entry['message']}")
+
+    start_time = clock.time()
+    wall_start = time.perf_counter()
+    next_sketch_flush = clock.monotonic() + 1.0
 
     try:
         while True:
             # Check duration
-            if args.duration and (time.time() - start_time > args.duration):
+            if args.duration and (clock.time() - start_time > args.duration):
                 print(f"\nTime limit of {args.duration}s reached.")
                 break
 
-            # 1. Generate Log
-            log_entry = generator.generate_log()
-            storage.insert_log(log_entry)
+            timer = profiling.StageTimer() if profiler else profiling.NullStageTimer()
 
-            # Print log summary (simulating log ingestion)
-            if log_entry['level'] in ['ERROR', 'CRITICAL', 'WARNING']:
-                print(f"[{log_entry['timestamp']}] {log_entry['level']}: {log_entry['message']}")
+            # 1. Generate Log
+            # Under the virtual clock the pacing sleep is virtual and takes no real time, so
+            # nothing is subtracted from the perf_counter lap.
+            if controller:
+                arrived = stream.due(wait=not controller.pending)
+                timer.lap("generate", idle_seconds=0.0 if args.fast_forward else stream.waited)
+                ingest(arrived)
+                for entry in arrived:
+                    controller.offer(entry)
+                timer.lap("persist")
+                log_entry = controller.pop()
+                if log_entry is None:
+                    continue
+            else:
+                log_entry = next(stream) if stream else generator.generate_log()
+                paced = stream.waited if stream and not args.fast_forward else 0.0
+                timer.lap("generate", idle_seconds=paced)
+                ingest([log_entry])
+                timer.lap("persist")
 
             # 2. Process Log
-            alert = processor.process_log(log_entry)
+            alert = processor.process_log(log_entry, score_anomalies=not (controller and controller.degraded))
+            timer.lap("detect")
 
             # 3. Handle Alert if triggered
             if alert:
                 enriched_alert = alert_engine.trigger_alert(alert)
                 storage.insert_alert(enriched_alert)
-                automator.execute_action(enriched_alert)
+                timer.lap("alert")
+                if actions:
+                    actions.submit(automator.execute_action, enriched_alert)
+                else:
+                    automator.execute_action(enriched_alert)
+                timer.lap("act")
+
+            if profiler:
+                profiling.TRACES.record(
+                    timer,
+                    trace_id=log_entry.get("trace_id"),
+                    timestamp=log_entry.get("timestamp"),
+                    event_type=log_entry.get("event_type"),
+                    service=log_entry.get("service"),
+                )
+
+            if clock.monotonic() >= next_sketch_flush:
+                storage.merge_latency_sketches(processor.drain_latency_sketches())
+                storage.upsert_security_windows(processor.drain_security_windows())
+                storage.merge_log_volume(sampler.drain_volume())
+                next_sketch_flush = clock.monotonic() + 1.0
 
             # Simulate variable traffic
-            time.sleep(random.uniform(min_interval, max_interval))
+            if not stream:
+                clock.sleep(random.uniform(min_interval, max_interval))
 
     except KeyboardInterrupt:
         print("\nStopping simulation...")
+    finally:
+        storage.merge_latency_sketches(processor.drain_latency_sketches())
+        storage.upsert_security_windows(processor.drain_security_windows())
+        storage.merge_log_volume(sampler.drain_volume())
+        if actions:
+            actions.shutdown(cancel_futures=True)
+        if profiler:
+            profiler.stop()
+        storage.close()
 
+    pool = processor.service_detectors.stats()
+    print(
+        f"Detector pool: {pool['resident']} resident ({pool['resident_bytes'] / 1e6:.1f} MB), "
+        f"{pool['spilled']} spilled, {pool['hits']} hits, {pool['misses']} misses, {pool['evictions']} evictions"
+    )
+    if args.sample_target_rate is not None:
+        sampled = sampler.stats()
+        print(
+            f"Ingest sampling: {sampled['kept']} of {sampled['seen']} logs stored, "
+            f"routine logs currently kept 1 in {sampled['weight']}"
+        )
+    if controller:
+        overload = controller.stats()
+        print(
+            f"Overload control ({overload['policy']}): "
+            + ", ".join(
+                f"{name} {overload[name]['shed']} shed, {overload[name]['aggregated']} merged, "
+                f"{overload[name]['degraded']} unscored, max lag {overload[name]['max_lag']:.1f}s"
+                for name in PRIORITY_NAMES
+            )
+        )
+    if args.fast_forward:
+        simulated, wall = clock.time() - start_time, time.perf_counter() - wall_start
+        print(
+            f"Fast-forward: {simulated:.0f}s of simulated traffic (until {clock.now().isoformat(timespec='seconds')}) "
+            f"in {wall:.1f}s, {simulated / max(wall, 1e-9):.0f}x real time"
+        )
     print("Simulation stopped.")
 
 
@@ -0,0 +1,175 @@
+"""
+Priority-aware overload control in front of LogProcessor.
+
+Arriving events are queued by priority: alert-relevant events (auth failures,
+resource spikes, timeouts, database errors, anything ERROR or above) are high,
+routine INFO `normal_operation` logs are low, everything else is medium.
+The highest non-empty queue is always served first; entries aggregated from
+a queue (see below) stay at that queue's priority.
+
+Lag is measured against event timestamps. A low-priority event still queued
+`lag_threshold` seconds after its timestamp is shed; medium waits
+`medium_lag_factor` times as long. High-priority events are never shed. Under
+the `aggregate` policy, each stale run of events is merged into one entry per
+(service, level, event type, minute) carrying `sample_weight = n`, so the
+error-rate window still counts every event, and a `latency_sketch` of the n
+response times, which the processor merges into its latency sketches. Any event popped later than the threshold
+skips anomaly scoring (`degraded`). Scoring is by far the costliest stage, and
+skipping it keeps the rule checks fast enough to catch up.
+
+Serving by priority hands the processor events out of timestamp order. Its
+sliding windows (error rate, brute force) are kept sorted by event time and
+expire relative to the newest timestamp seen, so they count exactly the events
+within the window of the newest one; an event that arrives later than a whole
+window is not counted. A late event still lands in its own minute's latency
+sketch and auth-failure IP window, but doesn't trigger an SLO evaluation.
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from src import telemetry
+from src.clock import SYSTEM_CLOCK, Clock
+from src.sampling import IngestSampler
+from src.sketches import LatencySketch
+
+HIGH, MEDIUM, LOW = 0, 1, 2
+PRIORITY_NAMES = ("high", "medium", "low")
+HIGH_PRIORITY_EVENT_TYPES = frozenset(
+    {"auth_failure", "cpu_utilization_spike", "memory_utilization_spike", "database_error", "connection_timeout"}
+)
+HIGH_PRIORITY_LEVELS = frozenset({"ERROR", "CRITICAL"})
+POLICIES = ("shed", "aggregate")
+OUTCOMES = ("processed", "degraded", "shed", "aggregated")
+
+_EVENTS = {
+    (priority, outcome): telemetry.REGISTRY.counter(
+        "observability_overload_events_total",
+        "Events through the overload controller, by priority and outcome.",
+        priority=priority,
+        outcome=outcome,
+    )
+    for priority in PRIORITY_NAMES
+    for outcome in OUTCOMES
+}
+_DEPTH = {
+    priority: telemetry.REGISTRY.gauge(
+        "observability_overload_queue_depth", "Events waiting in each priority queue.", priority=priority
+    )
+    for priority in PRIORITY_NAMES
+}
+_LAG = {
+    priority: telemetry.REGISTRY.histogram(
+        "observability_overload_lag_seconds",
+        "Seconds between an event's timestamp and the processor picking it up.",
+        priority=priority,
+    )
+    for priority in PRIORITY_NAMES
+}
+
+
+def priority(log_entry: Dict[str, Any]) -> int:
+    if log_entry.get("event_type") in HIGH_PRIORITY_EVENT_TYPES or log_entry.get("level") in HIGH_PRIORITY_LEVELS:
+        return HIGH
+    if IngestSampler.is_routine(log_entry):
+        return LOW
+    return MEDIUM
+
+
+class OverloadController:
+    def __init__(
+        self,
+        policy: str = "aggregate",
+        lag_threshold: float = 2.0,
+        medium_lag_factor: float = 4.0,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown overload policy: {policy}")
+        self.policy = policy
+        self.lag_threshold = lag_threshold
+        self.shed_after = {MEDIUM: lag_threshold * medium_lag_factor, LOW: lag_threshold}
+        self.clock = clock
+        # Whether the entry returned by the last pop() was past the lag threshold.
+        self.degraded = False
+        self._queues: Tuple[Deque[Tuple[datetime, Dict[str, Any]]], ...] = (deque(), deque(), deque())
+        # Aggregated entries, per priority level like the queues they were shed from.
+        self._merged: Tuple[Deque[Tuple[datetime, Dict[str, Any]]], ...] = (deque(), deque(), deque())
+        self._counts = [[0] * len(OUTCOMES) for _ in PRIORITY_NAMES]
+        self._max_lag = [0.0] * len(PRIORITY_NAMES)
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self._queues) + sum(len(merged) for merged in self._merged)
+
+    def offer(self, log_entry: Dict[str, Any]) -> None:
+        self._queues[priority(log_entry)].append((datetime.fromisoformat(log_entry["timestamp"]), log_entry))
+
+    def pop(self) -> Optional[Dict[str, Any]]:
+        """Returns the next entry to process, or None once every queue is empty."""
+        now = self.clock.now()
+        for level, after in self.shed_after.items():
+            self._shed_stale(level, now, after)
+
+        level = next((level for level, queue in enumerate(self._queues) if queue or self._merged[level]), None)
+        if level is None:
+            return None
+        # Within a level, aggregated entries are older than anything still queued.
+        timestamp, log_entry = (self._merged[level] or self._queues[level]).popleft()
+
+        lag = max(0.0, (now - timestamp).total_seconds())
+        self.degraded = lag > self.lag_threshold
+        self._max_lag[level] = max(self._max_lag[level], lag)
+        self._count(level, "degraded" if self.degraded else "processed")
+        if telemetry.is_enabled():
+            _LAG[PRIORITY_NAMES[level]].observe(lag)
+            for name, queue in zip(PRIORITY_NAMES, self._queues):
+                _DEPTH[name].set(len(queue))
+        return log_entry
+
+    def _shed_stale(self, level: int, now: datetime, after: float) -> None:
+        queue = self._queues[level]
+        stale: List[Dict[str, Any]] = []
+        while queue and (now - queue[0][0]).total_seconds() > after:
+            stale.append(queue.popleft()[1])
+        if not stale:
+            return
+        if self.policy == "shed":
+            self._count(level, "shed", len(stale))
+            return
+
+        groups: Dict[Tuple[str, str, str, str], List[Dict[str, Any]]] = {}
+        for log_entry in stale:
+            key = (
+                log_entry.get("service", "unknown"),
+                log_entry.get("level", "INFO"),
+                log_entry.get("event_type"),
+                log_entry["timestamp"][:16],  # The minute, as the processor's latency sketches bucket it.
+            )
+            groups.setdefault(key, []).append(log_entry)
+        for entries in groups.values():
+            # The newest event of each group stands in for the rest, with their
+            # response times carried as a sketch rather than its own times n.
+            merged = {**entries[-1], "sample_weight": sum(entry.get("sample_weight", 1) for entry in entries)}
+            latency = LatencySketch()
+            for entry in entries:
+                response_time = entry.get("metrics", {}).get("response_time_ms")
+                if response_time is not None:
+                    latency.add(response_time, entry.get("sample_weight", 1))
+            if latency.count:
+                merged["latency_sketch"] = latency
+            self._merged[level].append((datetime.fromisoformat(merged["timestamp"]), merged))
+        self._count(level, "aggregated", len(stale) - len(groups))
+
+    def _count(self, level: int, outcome: str, amount: int = 1) -> None:
+        self._counts[level][OUTCOMES.index(outcome)] += amount
+        if telemetry.is_enabled():
+            _EVENTS[(PRIORITY_NAMES[level], outcome)].inc(amount)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {"policy": self.policy, "pending": self.pending}
+        for level, name in enumerate(PRIORITY_NAMES):
+            stats[name] = dict(zip(OUTCOMES, self._counts[level]))
+            stats[name]["max_lag"] = self._max_lag[level]
+        return stats
@@ -1,16 +1,51 @@
-from datetime import datetime
-from typing import Dict, Any, Optional
-from collections import deque
-from sklearn.ensemble import IsolationForest
+import hashlib
+import pickle
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from itertools import repeat
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+from collections import OrderedDict, deque
+
+from src import telemetry
+from src.clock import SYSTEM_CLOCK, Clock
+from src.sketches import HyperLogLog, LatencySketch, SpaceSaving
+from src.telemetry import timed
+
+# Rough per-object costs behind MLAnomalyDetector.approx_memory_bytes, measured
+# with tracemalloc against a 100-sample window and the default 100 trees.
+_DETECTOR_BASE_BYTES = 1024
+_BUFFER_SAMPLE_BYTES = 120
+_TREE_BASE_BYTES = 2300
+_TREE_NODE_BYTES = 16
+
+_POOL_EVENTS = {
+    event: telemetry.REGISTRY.counter(
+        "observability_detector_pool_events_total", "Detector pool lookups and evictions.", event=event
+    )
+    for event in ("hit", "miss", "reload", "eviction")
+}
+_POOL_RESIDENT = telemetry.REGISTRY.gauge(
+    "observability_detector_pool_resident", "Anomaly detectors currently held in memory."
+)
+_POOL_BYTES = telemetry.REGISTRY.gauge(
+    "observability_detector_pool_bytes", "Approximate memory held by resident anomaly detectors."
+)
 
 class MLAnomalyDetector:
-    def __init__(self, window_size: int = 100):
+    def __init__(self, window_size: int = 100, contamination: Union[str, float] = "auto"):
         self.window_size = window_size
+        self.contamination = contamination
         self.data_buffer = deque(maxlen=window_size) # Store [cpu, memory] samples
-        self.model = IsolationForest(contamination="auto", random_state=42)
+        # Built on first fit so importing this module doesn't pull in scikit-learn/SciPy.
+        self.model = None
         self.is_fitted = False
         self.training_interval = 20
         self.sample_count = 0
+        self._model_bytes = 0
+
+    def approx_memory_bytes(self) -> int:
+        return _DETECTOR_BASE_BYTES + _BUFFER_SAMPLE_BYTES * len(self.data_buffer) + self._model_bytes
 
     def track_and_check(self, cpu: float, memory: float) -> Optional[str]:
         """
@@ -23,27 +58,184 @@ class MLAnomalyDetector:
 
         # Train model periodically once we have enough data
         if len(self.data_buffer) >= 50 and (self.sample_count % self.training_interval == 0 or not self.is_fitted):
-            self.model.fit(list(self.data_buffer))
-            self.is_fitted = True
+            self._fit()
 
         if not self.is_fitted:
             return None
 
         # Predict: -1 is anomaly, 1 is normal
-        prediction = self.model.predict([sample])[0]
+        prediction = self._predict(sample)
         
         if prediction == -1:
             # We can also get the anomaly score (lower is more anomalous)
             score = self.model.decision_function([sample])[0]
-            return f"ML Model detected anomaly (Score: {score:.2f}) [CPU: {cpu:.1f}%, Mem: {memory:.1f}%]"
+            return self._describe(score, cpu, memory)
             
         return None
 
+    def replay(self, samples: Sequence[Tuple[float, float]]) -> List[Optional[str]]:
+        """
+        Same results as calling track_and_check on each sample in turn, but scores
+        every sample seen between two refits with a single model call.
+        """
+        results: List[Optional[str]] = []
+        unscored: List[List[float]] = []
+
+        def score_unscored() -> None:
+            if not unscored:
+                return
+            # predict() is -1 exactly where decision_function() < 0.
+            for (cpu, memory), score in zip(unscored, self.model.decision_function(unscored)):
+                results.append(self._describe(score, cpu, memory) if score < 0 else None)
+            unscored.clear()
+
+        for cpu, memory in samples:
+            sample = [cpu, memory]
+            self.data_buffer.append(sample)
+            self.sample_count += 1
+            if len(self.data_buffer) >= 50 and (self.sample_count % self.training_interval == 0 or not self.is_fitted):
+                score_unscored()
+                self._fit()
+            if self.is_fitted:
+                unscored.append(sample)
+            else:
+                results.append(None)
+        score_unscored()
+        return results
+
+    @staticmethod
+    def _describe(score: float, cpu: float, memory: float) -> str:
+        return f"ML Model detected anomaly (Score: {score:.2f}) [CPU: {cpu:.1f}%, Mem: {memory:.1f}%]"
+
+    @timed("anomaly_detector.fit")
+    def _fit(self) -> None:
+        if self.model is None:
+            from sklearn.ensemble import IsolationForest
+
+            self.model = IsolationForest(contamination=self.contamination, random_state=42)
+        self.model.fit(list(self.data_buffer))
+        self.is_fitted = True
+        self._model_bytes = sum(
+            _TREE_BASE_BYTES + _TREE_NODE_BYTES * estimator.tree_.node_count for estimator in self.model.estimators_
+        )
+
+    @timed("anomaly_detector.predict")
+    def _predict(self, sample) -> int:
+        return self.model.predict([sample])[0]
+
+class DetectorPool:
+    """
+    Per-service anomaly detectors held within an approximate memory budget.
+
+    Least recently used detectors are evicted once the budget is exceeded. With
+    `spill_dir` set they are pickled there and reloaded on their next lookup
+    instead of relearning the service from scratch.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, spill_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        if self.spill_dir:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+        self._detectors: "OrderedDict[str, MLAnomalyDetector]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._spilled: set = set()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._detectors)
+
+    def __contains__(self, service: str) -> bool:
+        return service in self._detectors or service in self._spilled
+
+    def get(self, service: str) -> Optional[MLAnomalyDetector]:
+        """Returns the service's detector, reloading it if spilled, or None if it has none."""
+        detector = self._detectors.get(service)
+        if detector is not None:
+            self.hits += 1
+            self._count("hit")
+            self._detectors.move_to_end(service)
+            # Sizes change as detectors fit; picking that up here keeps the budget
+            # at most one lookup behind.
+            self._resize(service, detector)
+            return detector
+
+        self.misses += 1
+        self._count("miss")
+        if service not in self._spilled:
+            return None
+        path = self._spill_path(service)
+        with path.open("rb") as handle:
+            detector = pickle.load(handle)
+        path.unlink()
+        self._spilled.discard(service)
+        self.reloads += 1
+        self._count("reload")
+        self[service] = detector
+        return detector
+
+    def __setitem__(self, service: str, detector: MLAnomalyDetector) -> None:
+        self._detectors[service] = detector
+        self._detectors.move_to_end(service)
+        self._resize(service, detector)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident": len(self._detectors),
+            "spilled": len(self._spilled),
+            "resident_bytes": self.resident_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "evictions": self.evictions,
+        }
+
+    def _resize(self, service: str, detector: MLAnomalyDetector) -> None:
+        size = detector.approx_memory_bytes()
+        self.resident_bytes += size - self._sizes.get(service, 0)
+        self._sizes[service] = size
+        # Never evict the detector being used right now (the most recent entry).
+        while self.resident_bytes > self.max_bytes and len(self._detectors) > 1:
+            self._evict(next(iter(self._detectors)))
+        if telemetry.is_enabled():
+            _POOL_RESIDENT.set(len(self._detectors))
+            _POOL_BYTES.set(self.resident_bytes)
+
+    def _evict(self, service: str) -> None:
+        detector = self._detectors.pop(service)
+        self.resident_bytes -= self._sizes.pop(service)
+        self.evictions += 1
+        self._count("eviction")
+        if self.spill_dir:
+            with self._spill_path(service).open("wb") as handle:
+                pickle.dump(detector, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            self._spilled.add(service)
+
+    def _spill_path(self, service: str) -> Path:
+        return self.spill_dir / f"{hashlib.sha1(service.encode()).hexdigest()}.pkl"
+
+    @staticmethod
+    def _count(event: str) -> None:
+        if telemetry.is_enabled():
+            _POOL_EVENTS[event].inc()
+
+
 class LogProcessor:
-    def __init__(self):
+    def __init__(self, clock: Clock = SYSTEM_CLOCK):
+        # Windows run on log timestamps; the clock only stamps new alerts.
+        self.clock = clock
         self.auth_failures = deque()  # Store timestamps of failures
         self.error_window = deque()   # Store timestamps of errors
         self.total_window = deque()   # Store timestamps of all logs
+        # The windows above stay sorted and expire relative to the newest timestamp
+        # seen, so events handed over out of order (e.g. by the overload controller)
+        # count while they are within a window of it.
+        self.latest_timestamp: Optional[datetime] = None
         
         # Configuration
         self.auth_failure_threshold = 5
@@ -53,14 +245,45 @@ class LogProcessor:
         self.error_rate_min_samples = 10
         self.error_rate_alert_active = False
 
+        # Auth-failure source IPs per tumbling window of auth_failure_window_sec:
+        # top offenders (Space-Saving) and distinct count (HyperLogLog), in fixed
+        # memory however many unique IPs arrive. Only the current and previous
+        # windows are kept; increments since the last drain are kept separately
+        # and merged into the stored windows.
+        self.top_ip_capacity = 20
+        self.security_windows: Dict[datetime, Dict[str, Any]] = {}
+        self._pending_security_windows: Dict[datetime, Dict[str, Any]] = {}
+
+        # Latency SLO: `objective` of requests must finish under `threshold_ms`.
+        # Each burn-rate window is (long minutes, short minutes, burn rate, severity);
+        # both windows must burn the error budget faster than the rate to alert.
+        self.latency_slo_threshold_ms = 1000.0
+        self.latency_slo_objective = 0.99
+        self.latency_slo_min_samples = 20
+        self.latency_burn_rate_windows: List[Tuple[int, int, float, str]] = [
+            (60, 5, 14.4, "CRITICAL"),
+            (360, 30, 6.0, "WARNING"),
+        ]
+        self._latency_slo_active: Dict[Tuple[str, int], bool] = {}
+
+        # Per-service, per-minute latency sketches covering the longest SLO window,
+        # plus the increments not yet handed to storage (see drain_latency_sketches).
+        self.latency_sketches: Dict[str, Dict[datetime, LatencySketch]] = {}
+        self._pending_latency: Dict[Tuple[str, datetime], LatencySketch] = {}
+
         # Phase 3: Intelligence Layer (Scikit-Learn)
         # Store a separate detector for each service to learn its specific pattern
-        self.service_detectors: Dict[str, MLAnomalyDetector] = {}
+        self.ml_enabled = True
+        self.ml_contamination: Union[str, float] = "auto"
+        # Bounded by a memory budget so high-cardinality service names can't grow it forever.
+        self.service_detectors = DetectorPool()
 
-    def process_log(self, log_entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    @timed("processor.process_log")
+    def process_log(self, log_entry: Dict[str, Any], score_anomalies: bool = True) -> Optional[Dict[str, Any]]:
         """
         Analyzes a log entry and returns an Alert dictionary if a rule is triggered.
-        Returns None if no alert is triggered.
+        Returns None if no alert is triggered. `score_anomalies=False` skips the
+        IsolationForest detector and runs only the rule checks.
         """
         timestamp = datetime.fromisoformat(log_entry["timestamp"])
         event_type = log_entry.get("event_type")
@@ -69,12 +292,15 @@ class LogProcessor:
         error_events = {"connection_timeout", "database_error"}
         pending_alert = None
 
-        # Track events for a true sliding-window error-rate rule.
-        self.total_window.append(timestamp)
-        self._clean_window(self.total_window, self.error_rate_window_sec, timestamp)
+        # Track events for a true sliding-window error-rate rule. A stored row the
+        # ingest sampler kept 1-in-k (see src/sampling.py) stands for k events.
+        if self.latest_timestamp is None or timestamp > self.latest_timestamp:
+            self.latest_timestamp = timestamp
+        self._insert_window(self.total_window, timestamp, log_entry.get("sample_weight", 1))
+        self._clean_window(self.total_window, self.error_rate_window_sec, self.latest_timestamp)
         if event_type in error_events:
-            self.error_window.append(timestamp)
-        self._clean_window(self.error_window, self.error_rate_window_sec, timestamp)
+            self._insert_window(self.error_window, timestamp)
+        self._clean_window(self.error_window, self.error_rate_window_sec, self.latest_timestamp)
 
         # Rule 1: High Resource Utilization (Immediate Trigger)
         if event_type == "cpu_utilization_spike":
@@ -88,15 +314,17 @@ class LogProcessor:
                 pending_alert = self._create_alert("High Memory Utilization", "WARNING", f"Memory usage at {mem:.2f}%", log_entry)
 
         # Phase 3: Machine Learning Anomaly Detection (Isolation Forest)
-        # We need both CPU and Memory for the model. Fill defaults if missing.
-        if "cpu_usage" in metrics or "memory_usage" in metrics:
-            cpu_val = metrics.get("cpu_usage", 20.0)    # Default to nominal 20%
-            mem_val = metrics.get("memory_usage", 40.0) # Default to nominal 40%
+        ml_sample = self.ml_sample(metrics) if self.ml_enabled and score_anomalies else None
+        if ml_sample is not None:
+            cpu_val, mem_val = ml_sample
             
-            if service not in self.service_detectors:
-                self.service_detectors[service] = MLAnomalyDetector(window_size=100)
+            detector = self.service_detectors.get(service)
+            if detector is None:
+                detector = self.service_detectors[service] = MLAnomalyDetector(
+                    window_size=100, contamination=self.ml_contamination
+                )
             
-            anomaly_desc = self.service_detectors[service].track_and_check(cpu_val, mem_val)
+            anomaly_desc = detector.track_and_check(cpu_val, mem_val)
             
             if anomaly_desc:
                  if not pending_alert: 
@@ -109,21 +337,41 @@ class LogProcessor:
 
         # Rule 2: Brute Force Detection (Frequency based)
         if event_type == "auth_failure":
-            self._clean_window(self.auth_failures, self.auth_failure_window_sec, timestamp)
-            self.auth_failures.append(timestamp)
+            self._insert_window(self.auth_failures, timestamp)
+            self._clean_window(self.auth_failures, self.auth_failure_window_sec, self.latest_timestamp)
+            ip_window = self._track_source_ip(timestamp, log_entry.get("source_ip"))
             
             if len(self.auth_failures) >= self.auth_failure_threshold:
                 # Reset to avoid spamming alerts for the same burst
                 self.auth_failures.clear() 
+                top_offenders = ip_window["top_ips"].top(5)
+                distinct_ips = ip_window["distinct_ips"].estimate()
                 pending_alert = self._create_alert(
                     "Potential Brute Force Attack",
                     "CRITICAL",
-                    f"{self.auth_failure_threshold} failed login attempts in {self.auth_failure_window_sec}s",
+                    f"{self.auth_failure_threshold} failed login attempts in {self.auth_failure_window_sec}s "
+                    f"from {distinct_ips} distinct IP(s)",
                     log_entry,
-                    extra_fields={"offending_ip": log_entry.get("source_ip")},
+                    extra_fields={
+                        "offending_ip": top_offenders[0]["item"] if top_offenders else log_entry.get("source_ip"),
+                        "details": {
+                            "top_offenders": [
+                                {"ip": o["item"], "count": o["count"], "error": o["error"]} for o in top_offenders
+                            ],
+                            "distinct_ips": distinct_ips,
+                            "window_auth_failures": ip_window["auth_failures"],
+                        },
+                    },
                 )
 
-        # Rule 3: High Error Rate (actual percentage over sliding window)
+        # Rule 3: Latency SLO burn rate (evaluated on per-minute sketches)
+        response_time = metrics.get("response_time_ms")
+        if response_time is not None or "latency_sketch" in log_entry:
+            slo_alert = self._track_latency(service, timestamp, response_time, log_entry)
+            if slo_alert and pending_alert is None:
+                pending_alert = slo_alert
+
+        # Rule 4: High Error Rate (actual percentage over sliding window)
         total_count = len(self.total_window)
         error_count = len(self.error_window)
         if total_count >= self.error_rate_min_samples:
@@ -143,8 +391,146 @@ class LogProcessor:
 
         return pending_alert
 
+    @staticmethod
+    def ml_sample(metrics: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+        """The [cpu, memory] sample the anomaly detector sees for these metrics, if any."""
+        # We need both CPU and Memory for the model. Fill defaults if missing.
+        if "cpu_usage" in metrics or "memory_usage" in metrics:
+            return (
+                metrics.get("cpu_usage", 20.0),     # Default to nominal 20%
+                metrics.get("memory_usage", 40.0),  # Default to nominal 40%
+            )
+        return None
+
+    def _track_source_ip(self, timestamp: datetime, source_ip: Optional[str]) -> Dict[str, Any]:
+        seconds_into_day = timestamp.hour * 3600 + timestamp.minute * 60 + timestamp.second
+        window_start = timestamp.replace(microsecond=0) - timedelta(
+            seconds=seconds_into_day % self.auth_failure_window_sec
+        )
+        window = self.security_windows.get(window_start)
+        if window is None:
+            # A late event for a window already swept gets a window of its own,
+            # which the sweep drops again; its pending increment still gets stored.
+            window = self.security_windows[window_start] = self._new_ip_window()
+            for stale in sorted(self.security_windows)[:-2]:
+                del self.security_windows[stale]
+        pending = self._pending_security_windows.get(window_start)
+        if pending is None:
+            pending = self._pending_security_windows[window_start] = self._new_ip_window()
+        for counts in (window, pending):
+            if source_ip:
+                counts["top_ips"].add(source_ip)
+                counts["distinct_ips"].add(source_ip)
+            counts["auth_failures"] += 1
+        return window
+
+    def _new_ip_window(self) -> Dict[str, Any]:
+        return {"top_ips": SpaceSaving(capacity=self.top_ip_capacity), "distinct_ips": HyperLogLog(), "auth_failures": 0}
+
+    def drain_security_windows(self) -> List[Dict[str, Any]]:
+        """Returns and clears the per-window IP sketch increments since the last drain."""
+        drained = [
+            {
+                "window_start": window_start.isoformat(),
+                "window_sec": self.auth_failure_window_sec,
+                "auth_failures": window["auth_failures"],
+                "top_ips": window["top_ips"],
+                "distinct_ips": window["distinct_ips"],
+            }
+            for window_start, window in sorted(self._pending_security_windows.items())
+        ]
+        self._pending_security_windows = {}
+        return drained
+
+    def _track_latency(
+        self, service: str, timestamp: datetime, response_time: Optional[float], log_entry: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        bucket = timestamp.replace(second=0, microsecond=0)
+        buckets = self.latency_sketches.setdefault(service, {})
+        sketch = buckets.get(bucket)
+        rolled_over = False
+        if sketch is None:
+            # A late event's minute is filled in, but only a new newest minute is a rollover.
+            rolled_over = bool(buckets) and bucket > max(buckets)
+            sketch = buckets[bucket] = LatencySketch()
+            horizon = max(buckets) - timedelta(minutes=max(w[0] for w in self.latency_burn_rate_windows))
+            for stale in [b for b in buckets if b < horizon]:
+                del buckets[stale]
+        pending = self._pending_latency.get((service, bucket))
+        if pending is None:
+            pending = self._pending_latency[(service, bucket)] = LatencySketch()
+        # An entry aggregated by the overload controller carries its events' response times.
+        summary = log_entry.get("latency_sketch")
+        for target in (sketch, pending):
+            if summary is not None:
+                target.merge(summary)
+            else:
+                target.add(response_time, log_entry.get("sample_weight", 1))
+
+        # Windows only change when a minute closes, so evaluate once per rollover.
+        if rolled_over:
+            return self._evaluate_latency_slo(service, bucket, log_entry)
+        return None
+
+    def _burn_rate(self, buckets: Dict[datetime, LatencySketch], start: datetime, end: datetime) -> Tuple[float, int]:
+        bad = total = 0
+        for bucket, sketch in buckets.items():
+            if start <= bucket < end:
+                bad += sketch.count_above(self.latency_slo_threshold_ms)
+                total += sketch.count
+        if total == 0:
+            return 0.0, 0
+        return (bad / total) / (1 - self.latency_slo_objective), total
+
+    def _evaluate_latency_slo(
+        self, service: str, current_bucket: datetime, log_entry: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        buckets = self.latency_sketches[service]
+        alert = None
+        for long_min, short_min, burn_threshold, severity in self.latency_burn_rate_windows:
+            long_burn, _ = self._burn_rate(buckets, current_bucket - timedelta(minutes=long_min), current_bucket)
+            short_burn, short_total = self._burn_rate(
+                buckets, current_bucket - timedelta(minutes=short_min), current_bucket
+            )
+            firing = (
+                short_total >= self.latency_slo_min_samples
+                and long_burn >= burn_threshold
+                and short_burn >= burn_threshold
+            )
+            key = (service, long_min)
+            if firing and not self._latency_slo_active.get(key) and alert is None:
+                alert = self._create_alert(
+                    "Latency SLO Burn Rate",
+                    severity,
+                    f"p{self.latency_slo_objective * 100:g} < {self.latency_slo_threshold_ms:g}ms budget burning at "
+                    f"{long_burn:.1f}x over {long_min}m and {short_burn:.1f}x over {short_min}m for {service}",
+                    log_entry,
+                )
+            self._latency_slo_active[key] = firing
+        return alert
+
+    def drain_latency_sketches(self) -> List[Tuple[str, str, LatencySketch]]:
+        """Returns and clears (service, minute ISO timestamp, sketch) increments since the last drain."""
+        drained = [
+            (service, bucket.isoformat(), sketch)
+            for (service, bucket), sketch in self._pending_latency.items()
+        ]
+        self._pending_latency = {}
+        return drained
+
+    @staticmethod
+    def _insert_window(window: deque, timestamp: datetime, count: int = 1) -> None:
+        """Adds `count` copies of `timestamp`, keeping the window sorted when it arrives late."""
+        if not window or timestamp >= window[-1]:
+            window.extend(repeat(timestamp, count))
+            return
+        index = bisect_right(window, timestamp)
+        window.rotate(-index)
+        window.extendleft(repeat(timestamp, count))
+        window.rotate(index)
+
     def _clean_window(self, window: deque, max_age_seconds: int, current_time: datetime):
-        """Removes old timestamps from the window."""
+        """Removes old timestamps from the (sorted) window."""
         while window and (current_time - window[0]).total_seconds() > max_age_seconds:
             window.popleft()
 
@@ -157,7 +543,7 @@ class LogProcessor:
         extra_fields: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, Any]:
         alert = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": self.clock.now().isoformat(),
             "alert_type": title,
             "severity": severity,
             "description": description,
@@ -0,0 +1,157 @@
+"""
+Opt-in profiling support: a wall-clock sampling profiler that writes
+flamegraph-compatible collapsed stacks, and a ring buffer of per-event stage
+timings that can be inspected after the fact.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+from collections import Counter, deque
+from pathlib import Path
+from time import monotonic, perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PIPELINE_STAGES = ("generate", "persist", "detect", "alert", "act")
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of every other thread each `interval` seconds.
+
+    Output is one `frame;frame;frame count` line per distinct stack (root
+    first), the collapsed format consumed by flamegraph.pl and speedscope. The
+    file is rewritten every `flush_interval` seconds and on stop().
+    """
+
+    def __init__(self, output_path: str, interval: float = 0.005, flush_interval: float = 30.0):
+        self.output_path = Path(output_path)
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.samples: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.flush()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        next_flush = monotonic() + self.flush_interval
+        while not self._stop.wait(self.interval):
+            self.sample(exclude={own_id})
+            if monotonic() >= next_flush:
+                self.flush()
+                next_flush = monotonic() + self.flush_interval
+
+    def sample(self, exclude: Iterable[int] = ()) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id in exclude:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                qualname = getattr(code, "co_qualname", code.co_name)
+                stack.append(f"{Path(code.co_filename).stem}:{qualname}")
+                frame = frame.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            key = ";".join(reversed(stack))
+            with self._lock:
+                self.samples[key] += 1
+
+    def flush(self) -> None:
+        with self._lock:
+            lines = [f"{stack} {count}\n" for stack, count in self.samples.most_common()]
+        self.output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.output_path.with_name(self.output_path.name + ".tmp")
+        with open(tmp_path, "w") as handle:
+            handle.writelines(lines)
+        os.replace(tmp_path, self.output_path)
+
+
+class StageTimer:
+    """Measures consecutive stages of one event: call lap(stage) as each finishes."""
+
+    __slots__ = ("started", "_last", "stages")
+
+    def __init__(self):
+        self.started = self._last = perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def lap(self, stage: str, idle_seconds: float = 0.0) -> None:
+        """Closes `stage`; `idle_seconds` (e.g. pacing sleeps) is left out of the stage and total."""
+        now = perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last - idle_seconds) * 1000.0
+        self.started += idle_seconds
+        self._last = now
+
+    @property
+    def total_ms(self) -> float:
+        return (self._last - self.started) * 1000.0
+
+
+class NullStageTimer:
+    """Stand-in used when profiling is off so call sites need no branches."""
+
+    __slots__ = ()
+
+    def lap(self, stage: str, idle_seconds: float = 0.0) -> None:
+        pass
+
+
+class TraceRingBuffer:
+    """Fixed-capacity buffer of the most recent stage traces."""
+
+    def __init__(self, capacity: int = 1000):
+        self._items: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        return self._items.maxlen
+
+    def record(self, timer: StageTimer, **context: Any) -> None:
+        entry = dict(context)
+        entry["stages_ms"] = {stage: round(ms, 4) for stage, ms in timer.stages.items()}
+        entry["total_ms"] = round(timer.total_ms, 4)
+        with self._lock:
+            self._items.append(entry)
+
+    def snapshot(self, limit: int = 100, min_total_ms: float = 0.0, slowest: bool = False) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [item for item in self._items if item["total_ms"] >= min_total_ms]
+        if slowest:
+            items.sort(key=lambda item: item["total_ms"], reverse=True)
+        else:
+            items.reverse()
+        return items[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+TRACES = TraceRingBuffer(capacity=int(os.getenv("TRACE_BUFFER_SIZE", "1000")))
+
+
+def render_traces(query: Dict[str, str]) -> Tuple[str, bytes]:
+    """HTTP helper for telemetry.start_http_server: ?limit=&min_ms=&slowest=1."""
+    items = TRACES.snapshot(
+        limit=int(query.get("limit", 100)),
+        min_total_ms=float(query.get("min_ms", 0.0)),
+        slowest=query.get("slowest", "0") in {"1", "true"},
+    )
+    return "application/json", json.dumps({"items": items}).encode()
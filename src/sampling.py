@@ -0,0 +1,117 @@
+"""
+Ingest sampling in front of Storage.insert_log.
+
+Routine events (INFO/DEBUG `normal_operation` logs) are stored 1-in-k, with k
+adapted each second so that roughly `target_rate` of them per second reach
+SQLite. Every other event (WARNING and above, auth, errors, spikes) is always
+stored. Kept routine rows carry `sample_weight = k`, so weighted counts over
+stored rows estimate the true volume. Exact per-minute counts of every event
+seen, kept or not, are accumulated for the `log_volume` rollup. The processor
+still sees every event, without the weight (it is set on a copy of the row),
+so detectors and latency sketches are unaffected.
+"""
+
+import math
+import zlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src import telemetry
+from src.clock import SYSTEM_CLOCK, Clock
+
+ROUTINE_EVENT_TYPES = frozenset({"normal_operation"})
+ROUTINE_LEVELS = frozenset({"DEBUG", "INFO"})
+
+_DECISIONS = {
+    decision: telemetry.REGISTRY.counter(
+        "observability_ingest_events_total", "Logs seen by the ingest sampler, by decision.", decision=decision
+    )
+    for decision in ("kept", "sampled_out")
+}
+_WEIGHT = telemetry.REGISTRY.gauge(
+    "observability_ingest_sample_weight", "Current 1-in-k sampling factor for routine logs."
+)
+
+
+class IngestSampler:
+    def __init__(
+        self,
+        target_rate: Optional[float] = None,
+        max_weight: int = 100,
+        adjust_interval: float = 1.0,
+        clock: Clock = SYSTEM_CLOCK,
+    ):
+        self.target_rate = target_rate
+        self.max_weight = max_weight
+        self.adjust_interval = adjust_interval
+        self.weight = 1
+        self.seen = 0
+        self.kept = 0
+        self._routine_rate: Optional[float] = None
+        self.clock = clock
+        self._interval_start = clock.monotonic()
+        self._interval_routine = 0
+        self._untraced = 0
+        self._volume: Counter = Counter()
+
+    @staticmethod
+    def is_routine(log_entry: Dict[str, Any]) -> bool:
+        return log_entry.get("event_type") in ROUTINE_EVENT_TYPES and log_entry.get("level") in ROUTINE_LEVELS
+
+    def sample(self, log_entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Counts the event and returns the row to store, or None when it is
+        sampled out. Kept routine rows are copies carrying `sample_weight`;
+        `log_entry` itself is never modified, since the processor sees it too.
+        """
+        self.seen += 1
+        minute = datetime.fromisoformat(log_entry["timestamp"]).replace(second=0, microsecond=0)
+        self._volume[
+            (minute.isoformat(), log_entry.get("service", "unknown"), log_entry.get("level", "INFO"),
+             log_entry.get("event_type", "unknown"))
+        ] += 1
+
+        row: Optional[Dict[str, Any]] = log_entry
+        if self.target_rate is not None and self.is_routine(log_entry):
+            self._interval_routine += 1
+            self._adjust()
+            if not self._selected(log_entry.get("trace_id")):
+                row = None
+            elif self.weight > 1:
+                row = {**log_entry, "sample_weight": self.weight}
+        if row is not None:
+            self.kept += 1
+        if telemetry.is_enabled():
+            _DECISIONS["sampled_out" if row is None else "kept"].inc()
+        return row
+
+    def _selected(self, trace_id: Optional[str]) -> bool:
+        if self.weight == 1:
+            return True
+        if trace_id:
+            # Hashing the trace id keeps or drops a trace's routine events together.
+            return zlib.crc32(trace_id.encode()) % self.weight == 0
+        self._untraced += 1
+        return self._untraced % self.weight == 0
+
+    def _adjust(self) -> None:
+        now = self.clock.monotonic()
+        elapsed = now - self._interval_start
+        if elapsed < self.adjust_interval:
+            return
+        rate = self._interval_routine / elapsed
+        self._routine_rate = rate if self._routine_rate is None else 0.5 * self._routine_rate + 0.5 * rate
+        self.weight = max(1, min(self.max_weight, math.ceil(self._routine_rate / self.target_rate)))
+        self._interval_start, self._interval_routine = now, 0
+        if telemetry.is_enabled():
+            _WEIGHT.set(self.weight)
+
+    def drain_volume(self) -> List[Tuple[str, str, str, str, int]]:
+        """Returns and clears (minute, service, level, event_type, count) since the last drain."""
+        volume = [(*key, count) for key, count in self._volume.items()]
+        self._volume.clear()
+        return volume
+
+    def stats(self) -> Dict[str, Any]:
+        return {"seen": self.seen, "kept": self.kept, "sampled_out": self.seen - self.kept, "weight": self.weight}
@@ -0,0 +1,342 @@
+"""
+Storage split across N SQLite files, routed by service hash.
+
+SQLite takes one write lock per file, so writers sharing observability.db
+queue behind each other. With `DB_SHARDS` / `--shards` above 1, every service's
+logs, alerts and rollups live in the shard `crc32(service) % N`, each a full
+Storage in its own directory next to the configured path:
+
+    data/observability.db  ->  data/observability.shard0/observability.db, ...
+
+Reads fan out to all shards on a small thread pool and k-way merge the
+per-shard results. Row ids stay per shard; rows handed out carry the global id
+`local_id * N + shard`, and id cursors over alerts are ShardPositions (one
+local id per shard) instead of a single high-water mark, because shards commit
+independently and a single number could skip a shard that lags.
+
+`get_alerts`, `get_logs` and `get_alerts_since_id` order by global id, the key
+a single Storage orders by, so both backends page the same way. Global ids keep
+each shard's insertion order but interleave shards by row count rather than by
+commit time: a shard that writes less often ranks its newest rows below a busy
+shard's. Exports and backtest streams merge by (timestamp, id) as before.
+
+Process-wide tables (security IP windows) live in shard 0 only: they carry no
+service to route by, and upsert_security_windows merges into the stored
+window, so every simulator writing them through any ShardedStorage adds to the
+same rows. Their writes take shard 0's lock alongside its services' writes.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from src.hot_tier import HotTier
+from src.sketches import LatencySketch
+from src.storage import Storage
+
+T = TypeVar("T")
+
+
+def shard_index(service: str, shards: int) -> int:
+    return zlib.crc32(service.encode()) % shards
+
+
+def shard_paths(db_path: str, shards: int) -> List[Path]:
+    path = Path(db_path)
+    return [path.with_name(f"{path.stem}.shard{index}") / path.name for index in range(shards)]
+
+
+def open_storage(
+    db_path: str, shards: int = 1, hot_tier: Optional[Callable[[], HotTier]] = None, feed: bool = False
+) -> Union[Storage, "ShardedStorage"]:
+    """A plain Storage for one shard (the original single-file layout), else a ShardedStorage."""
+    if shards > 1:
+        return ShardedStorage(db_path, shards, hot_tier=hot_tier, feed=feed)
+    return Storage(db_path=db_path, hot_tier=hot_tier() if hot_tier else None, feed=feed)
+
+
+class ShardPosition(tuple):
+    """
+    Per-shard alert row ids, compared like vector clocks: `a >= b` when every
+    shard in `a` is at or past `b`, and `a - b` counts the rows in between.
+    """
+
+    def __ge__(self, other: "ShardPosition") -> bool:
+        return all(mine >= theirs for mine, theirs in zip(self, other))
+
+    def __gt__(self, other: "ShardPosition") -> bool:
+        return self >= other and tuple(self) != tuple(other)
+
+    def __le__(self, other: "ShardPosition") -> bool:
+        return ShardPosition(other) >= self
+
+    def __lt__(self, other: "ShardPosition") -> bool:
+        return ShardPosition(other) > self
+
+    def __sub__(self, other: "ShardPosition") -> int:
+        return sum(mine - theirs for mine, theirs in zip(self, other))
+
+
+def _merge(lists: Iterable[Iterable[T]], key: Callable[[T], Any], reverse: bool = False) -> Iterator[T]:
+    # Each input keeps its own order, so a truncated merge is a prefix of every shard.
+    return heapq.merge(*lists, key=key, reverse=reverse)
+
+
+class ShardedStorage:
+    """
+    Same read and write interface as Storage over `shards` files. `hot_tier`
+    is a factory (e.g. HotTier) so that each shard gets its own tier.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        shards: int,
+        hot_tier: Optional[Callable[[], HotTier]] = None,
+        feed: bool = False,
+    ):
+        if shards < 1:
+            raise ValueError("shards must be at least 1")
+        self.db_path = Path(db_path)
+        self.shards = [
+            Storage(db_path=str(path), hot_tier=hot_tier() if hot_tier else None, feed=feed)
+            for path in shard_paths(db_path, shards)
+        ]
+        # One reader per shard, each holding a connection to every shard.
+        self._executor = ThreadPoolExecutor(
+            max_workers=shards, thread_name_prefix="storage-shard", initializer=self.open_thread_connection
+        )
+
+    @property
+    def hot_tier(self) -> Optional[HotTier]:
+        return self.shards[0].hot_tier
+
+    def open_thread_connection(self) -> None:
+        for shard in self.shards:
+            shard.open_thread_connection()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        for shard in self.shards:
+            shard.close()
+
+    def shard_for(self, service: str) -> Storage:
+        return self.shards[shard_index(service, len(self.shards))]
+
+    def _gather(self, fn: Callable[..., T], *lanes: Sequence[Any]) -> List[T]:
+        """fn(shard, *lane values) for every shard concurrently, in shard order."""
+        return list(self._executor.map(fn, self.shards, *lanes))
+
+    def _global(self, row: Dict[str, Any], index: int) -> Dict[str, Any]:
+        row["id"] = row["id"] * len(self.shards) + index
+        return row
+
+    def _globals(self, results: List[List[Dict[str, Any]]]) -> List[List[Dict[str, Any]]]:
+        return [[self._global(row, index) for row in rows] for index, rows in enumerate(results)]
+
+    def _by_service(self, items: Iterable[T], service: Callable[[T], str]) -> Dict[int, List[T]]:
+        grouped: Dict[int, List[T]] = {}
+        for item in items:
+            grouped.setdefault(shard_index(service(item), len(self.shards)), []).append(item)
+        return grouped
+
+    # Writes: each goes to the shard of its service, and only takes that file's lock.
+
+    def insert_log(self, log_entry: Dict[str, Any]) -> None:
+        self.shard_for(log_entry.get("service", "unknown")).insert_log(log_entry)
+
+    def insert_logs(self, log_entries: Sequence[Dict[str, Any]]) -> None:
+        for index, group in self._by_service(log_entries, lambda entry: entry.get("service", "unknown")).items():
+            self.shards[index].insert_logs(group)
+
+    def insert_alert(self, alert: Dict[str, Any]) -> None:
+        self.shard_for(alert.get("source_service", "unknown")).insert_alert(alert)
+
+    def merge_latency_sketches(self, items: List[Tuple[str, str, LatencySketch]]) -> None:
+        for index, group in self._by_service(items, lambda item: item[0]).items():
+            self.shards[index].merge_latency_sketches(group)
+
+    def merge_log_volume(self, counts: List[Tuple[str, str, str, str, int]]) -> None:
+        for index, group in self._by_service(counts, lambda count: count[1]).items():
+            self.shards[index].merge_log_volume(group)
+
+    def upsert_security_windows(self, windows: List[Dict[str, Any]]) -> None:
+        self.shards[0].upsert_security_windows(windows)
+
+    def update_alert_status(self, alert_id: str, status: str) -> Optional[Dict[str, Any]]:
+        for index, shard in enumerate(self.shards):
+            updated = shard.update_alert_status(alert_id=alert_id, status=status)
+            if updated is not None:
+                return self._global(updated, index)
+        return None
+
+    def bulk_update_alert_status(self, status: str, **criteria: Any) -> List[Dict[str, Any]]:
+        results = self._gather(lambda shard: shard.bulk_update_alert_status(status, **criteria))
+        return sorted((row for rows in self._globals(results) for row in rows), key=lambda alert: alert["id"])
+
+    # Reads: scatter to every shard, then merge.
+
+    def get_alerts(self, limit: int = 100) -> List[Dict[str, Any]]:
+        results = self._globals(self._gather(lambda shard: shard.get_alerts(limit=limit)))
+        return list(islice(_merge(results, key=lambda alert: alert["id"], reverse=True), limit))
+
+    def get_logs(self, limit: int = 200) -> List[Dict[str, Any]]:
+        results = self._globals(self._gather(lambda shard: shard.get_logs(limit=limit)))
+        return list(islice(_merge(results, key=lambda log: log["id"], reverse=True), limit))
+
+    def recent_json(self, kind: str, limit: int) -> bytes:
+        items = self.get_logs(limit) if kind == "log" else self.get_alerts(limit)
+        return json.dumps(items, separators=(",", ":")).encode()
+
+    def get_latest_alert_row_id(self) -> ShardPosition:
+        return ShardPosition(self._gather(lambda shard: shard.get_latest_alert_row_id()))
+
+    def alert_position(self, rows: Iterable[Dict[str, Any]], start: Optional[ShardPosition] = None) -> ShardPosition:
+        """The cursor after `rows` (global ids), starting from `start`."""
+        lanes = list(start or [0] * len(self.shards))
+        for row in rows:
+            local_id, index = divmod(row["id"], len(self.shards))
+            lanes[index] = max(lanes[index], local_id)
+        return ShardPosition(lanes)
+
+    def get_alerts_since_id(self, after_id: ShardPosition, limit: int = 200) -> List[Dict[str, Any]]:
+        results = self._globals(
+            self._gather(lambda shard, after: shard.get_alerts_since_id(after, limit=limit), after_id)
+        )
+        return list(islice(_merge(results, key=lambda alert: alert["id"]), limit))
+
+    def get_alert_updates(self, since: str, max_id: ShardPosition, limit: int = 1000) -> List[Dict[str, Any]]:
+        results = self._globals(
+            self._gather(lambda shard, lane_max: shard.get_alert_updates(since, lane_max, limit=limit), max_id)
+        )
+        return list(islice(_merge(results, key=lambda change: (change["updated_at"], change["id"])), limit))
+
+    def get_alert_update_watermark(self) -> Tuple[str, Dict[int, str]]:
+        results = self._gather(lambda shard: shard.get_alert_update_watermark())
+        watermark = max(mark for mark, _ in results)
+        seen: Dict[int, str] = {}
+        for index, (mark, statuses) in enumerate(results):
+            if mark == watermark:
+                seen.update({row_id * len(self.shards) + index: status for row_id, status in statuses.items()})
+        return watermark, seen
+
+    def get_data_version(self) -> Dict[str, Dict[str, Any]]:
+        versions = self._gather(lambda shard: shard.get_data_version())
+
+        def combined(table: str) -> Dict[str, Any]:
+            modified = [version[table]["modified"] for version in versions if version[table]["modified"]]
+            return {
+                "tag": "-".join(version[table]["tag"] for version in versions),
+                "modified": max(modified) if modified else None,
+            }
+
+        alerts = combined("alerts")
+        alerts["max_id"] = ShardPosition(version["alerts"]["max_id"] for version in versions)
+        return {"alerts": alerts, "logs": combined("logs")}
+
+    def get_metrics_summary(self) -> Dict[str, Any]:
+        summaries = self._gather(lambda shard: shard.get_metrics_summary())
+        counts = ("total_alerts", "critical_alerts", "open_alerts", "acknowledged_alerts", "suppressed_alerts")
+        summary: Dict[str, Any] = {name: sum(part[name] for part in summaries) for name in counts}
+        # A service lives in exactly one shard, so the busiest one is some shard's busiest.
+        summary["top_service_by_alerts"] = max(
+            (part["top_service_by_alerts"] for part in summaries), key=lambda top: top["count"]
+        )
+        buckets: Dict[str, int] = {}
+        for part in summaries:
+            for bucket in part["alerts_over_time"]:
+                buckets[bucket["timestamp"]] = buckets.get(bucket["timestamp"], 0) + bucket["count"]
+        summary["alerts_over_time"] = [
+            {"timestamp": minute, "count": buckets[minute]} for minute in sorted(buckets)[-20:]
+        ]
+        return summary
+
+    def get_trace(self, trace_id: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        results = self._globals(self._gather(lambda shard: shard.get_trace(trace_id, limit=limit)))
+        key = lambda item: (item["timestamp"], item["kind"] != "log", item["id"])  # noqa: E731
+        return sorted((item for items in results for item in items), key=key)[: max(1, min(limit, 5000))]
+
+    def get_latency_sketch(self, since: str, service: Optional[str] = None) -> LatencySketch:
+        if service:
+            return self.shard_for(service).get_latency_sketch(since, service)
+        return LatencySketch.merged(self._gather(lambda shard: shard.get_latency_sketch(since)))
+
+    def get_log_volume(self, since: str, service: Optional[str] = None) -> Dict[str, Any]:
+        if service:
+            return self.shard_for(service).get_log_volume(since, service)
+        parts = self._gather(lambda shard: shard.get_log_volume(since))
+        volume: Dict[str, Any] = {"total": sum(part["total"] for part in parts)}
+        for field in ("by_level", "by_event_type"):
+            volume[field] = {}
+            for part in parts:
+                for name, count in part[field].items():
+                    volume[field][name] = volume[field].get(name, 0) + count
+        per_minute: Dict[str, int] = {}
+        for part in parts:
+            for point in part["series"]:
+                per_minute[point["timestamp"]] = per_minute.get(point["timestamp"], 0) + point["count"]
+        volume["series"] = [{"timestamp": minute, "count": per_minute[minute]} for minute in sorted(per_minute)]
+        return volume
+
+    def get_top_source_ips(self, since: str, limit: int = 10) -> Dict[str, Any]:
+        return self.shards[0].get_top_source_ips(since, limit)
+
+    def iter_rows(
+        self,
+        table: str,
+        columns: Optional[Sequence[str]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        filters: Optional[Dict[str, Sequence[str]]] = None,
+        chunk_size: int = 5000,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Storage.iter_rows over all shards, merged by (timestamp, id); rows are dicts."""
+        # Built eagerly so bad arguments raise here, as with Storage.
+        per_shard = [
+            shard.iter_rows(table, columns, since=since, until=until, filters=filters, chunk_size=chunk_size)
+            for shard in self.shards
+        ]
+        streams = [
+            (self._global(dict(row), index) for chunk in chunks for row in chunk)
+            for index, chunks in enumerate(per_shard)
+        ]
+        return self._chunked(_merge(streams, key=lambda row: (row["timestamp"], row["id"])), chunk_size)
+
+    def iter_logs(
+        self, since: Optional[str] = None, until: Optional[str] = None, chunk_size: int = 5000
+    ) -> Iterator[List[Dict[str, Any]]]:
+        streams = [
+            (log for chunk in shard.iter_logs(since=since, until=until, chunk_size=chunk_size) for log in chunk)
+            for shard in self.shards
+        ]
+        return self._chunked(_merge(streams, key=lambda log: log["timestamp"]), chunk_size)
+
+    def iter_alerts(
+        self, since: Optional[str] = None, until: Optional[str] = None, chunk_size: int = 5000
+    ) -> Iterator[List[Dict[str, Any]]]:
+        streams = [
+            (
+                self._global(alert, index)
+                for chunk in shard.iter_alerts(since=since, until=until, chunk_size=chunk_size)
+                for alert in chunk
+            )
+            for index, shard in enumerate(self.shards)
+        ]
+        return self._chunked(_merge(streams, key=lambda alert: (alert["timestamp"], alert["id"])), chunk_size)
+
+    @staticmethod
+    def _chunked(rows: Iterator[T], chunk_size: int) -> Iterator[List[T]]:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    def healthcheck(self) -> bool:
+        return all(self._gather(lambda shard: shard.healthcheck()))
@@ -0,0 +1,222 @@
+"""
+Small fixed-memory streaming sketches used by the processor.
+
+LatencySketch is a log-bucketed (HDR/DDSketch-style) histogram: every value
+lands in bucket ceil(log_gamma(value)), so quantiles carry a bounded relative
+error and two sketches merge by adding bucket counts. The number of buckets is
+bounded by the value range (~1,400 for 1us..1h at 1% error), not by the number
+of samples.
+
+SpaceSaving keeps the top-k heavy hitters of a stream in k counters, and
+HyperLogLog estimates the number of distinct items in 2^precision bytes.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import math
+from typing import Any, Dict, Iterable, List
+
+
+class LatencySketch:
+    __slots__ = ("relative_accuracy", "_gamma_log", "bins", "zero_count", "count", "sum")
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.relative_accuracy = relative_accuracy
+        gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._gamma_log = math.log(gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float, weight: int = 1) -> None:
+        if value <= 0:
+            self.zero_count += weight
+        else:
+            index = math.ceil(math.log(value) / self._gamma_log)
+            self.bins[index] = self.bins.get(index, 0) + weight
+        self.count += weight
+        self.sum += value * weight
+
+    def merge(self, other: "LatencySketch") -> "LatencySketch":
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, bin_count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + bin_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        return self
+
+    def _bin_value(self, index: int) -> float:
+        # Midpoint (in relative terms) of (gamma^(i-1), gamma^i].
+        return 2 * math.exp(index * self._gamma_log) / (1 + math.exp(self._gamma_log))
+
+    def quantile(self, q: float) -> float:
+        if not 0 <= q <= 1:
+            raise ValueError("quantile must be between 0 and 1")
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return self._bin_value(index)
+        return self._bin_value(max(self.bins))
+
+    def count_above(self, threshold: float) -> int:
+        """Samples whose bucket lies entirely above `threshold` (within the sketch's accuracy)."""
+        if threshold <= 0:
+            return self.count - self.zero_count
+        cutoff = math.ceil(math.log(threshold) / self._gamma_log)
+        return sum(bin_count for index, bin_count in self.bins.items() if index > cutoff)
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "a": self.relative_accuracy,
+                "b": [[index, bin_count] for index, bin_count in self.bins.items()],
+                "z": self.zero_count,
+                "n": self.count,
+                "s": self.sum,
+            },
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> "LatencySketch":
+        data = json.loads(payload)
+        sketch = cls(relative_accuracy=data["a"])
+        sketch.bins = {int(index): int(bin_count) for index, bin_count in data["b"]}
+        sketch.zero_count = data["z"]
+        sketch.count = data["n"]
+        sketch.sum = data["s"]
+        return sketch
+
+    @classmethod
+    def merged(cls, sketches: Iterable["LatencySketch"], relative_accuracy: float = 0.01) -> "LatencySketch":
+        result = cls(relative_accuracy=relative_accuracy)
+        for sketch in sketches:
+            result.merge(sketch)
+        return result
+
+
+class SpaceSaving:
+    """
+    Space-Saving top-k: when a new item arrives and all k slots are taken, it
+    replaces the current minimum and inherits its count as overestimation
+    error. Any item with true frequency above n/k is guaranteed to be tracked.
+    """
+
+    __slots__ = ("capacity", "counters")
+
+    def __init__(self, capacity: int = 20):
+        self.capacity = capacity
+        self.counters: Dict[str, List[int]] = {}  # item -> [count, error]
+
+    def add(self, item: str, weight: int = 1) -> None:
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, 0]
+        else:
+            victim = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[item] = [floor + weight, floor]
+
+    def top(self, limit: int = 10) -> List[Dict[str, Any]]:
+        ranked = sorted(self.counters.items(), key=lambda entry: entry[1][0], reverse=True)
+        return [{"item": item, "count": count, "error": error} for item, (count, error) in ranked[:limit]]
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        for item, (count, error) in other.counters.items():
+            counter = self.counters.setdefault(item, [0, 0])
+            counter[0] += count
+            counter[1] += error
+        if len(self.counters) > self.capacity:
+            kept = sorted(self.counters.items(), key=lambda entry: entry[1][0], reverse=True)
+            self.counters = dict(kept[: self.capacity])
+        return self
+
+    def to_json(self) -> str:
+        return json.dumps({"k": self.capacity, "c": self.counters}, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, payload: str) -> "SpaceSaving":
+        data = json.loads(payload)
+        sketch = cls(capacity=data["k"])
+        sketch.counters = {item: list(counter) for item, counter in data["c"].items()}
+        return sketch
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter (~1.6% standard error at precision 12)."""
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, item: str) -> None:
+        hashed = int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        remainder = (hashed << self.precision) & 0xFFFFFFFFFFFFFFFF
+        rank = 64 - remainder.bit_length() + 1 if remainder else 64 - self.precision + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+        return self
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {"p": self.precision, "r": base64.b64encode(bytes(self.registers)).decode()},
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def from_json(cls, payload: str) -> "HyperLogLog":
+        data = json.loads(payload)
+        sketch = cls(precision=data["p"])
+        sketch.registers = bytearray(base64.b64decode(data["r"]))
+        return sketch
+
+
+def parse_quantiles(raw: str) -> List[float]:
+    """Parses '0.5,0.99' (or percent-style '50,99') into sorted fractions."""
+    values = []
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        value = float(part)
+        if value > 1:
+            value /= 100.0
+        if not 0 <= value <= 1:
+            raise ValueError(f"Invalid quantile: {part}")
+        values.append(value)
+    if not values:
+        raise ValueError("No quantiles given")
+    return sorted(set(values))
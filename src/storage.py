@@ -1,53 +1,114 @@
 from __future__ import annotations
 
+import asyncio
+import json
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 from threading import Lock
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src.hot_tier import HotTier, HotTierFeed, dumps
+from src.log_schema import INSERT_LOG_ROW, LogDictionary, create_compact_logs, logs_layout, render_message
+from src.sketches import HyperLogLog, LatencySketch, SpaceSaving
+from src.telemetry import timed
 
 
 VALID_STATUSES = {"OPEN", "ACKNOWLEDGED", "SUPPRESSED"}
 
+# Columns iter_rows can return, and the ones it can filter on, per table.
+EXPORT_COLUMNS = {
+    "logs": (
+        "id", "timestamp", "service", "level", "event_type", "message", "trace_id", "source_ip",
+        "cpu_usage", "memory_usage", "response_time_ms", "sample_weight",
+    ),
+    "alerts": (
+        "id", "alert_id", "timestamp", "alert_generated_at", "alert_type", "severity", "description",
+        "source_service", "source_trace_id", "offending_ip", "status", "acknowledged_at", "suppressed_at",
+        "updated_at", "details",
+    ),
+}
+EXPORT_FILTERS = {
+    "logs": ("service", "level", "event_type", "trace_id", "source_ip"),
+    "alerts": ("alert_type", "severity", "status", "source_service", "source_trace_id"),
+}
+LOG_COLUMNS = ", ".join(EXPORT_COLUMNS["logs"])
+ALERT_COLUMNS = ", ".join(EXPORT_COLUMNS["alerts"])
+
 
 class Storage:
-    """SQLite persistence for simulation logs and alerts."""
+    """
+    SQLite persistence for simulation logs and alerts.
+
+    New databases store logs dictionary-encoded (see src/log_schema.py) behind
+    a `logs` view; older ones keep their one-table layout until converted.
 
-    def __init__(self, db_path: str = "data/observability.db"):
+    With `hot_tier`, the newest logs and alerts are also kept in memory and
+    recent-window reads are served from there. With `feed`, every committed
+    row is published to the other processes sharing the database directory,
+    and (when this instance has a hot tier) theirs are applied to it.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/observability.db",
+        hot_tier: Optional[HotTier] = None,
+        feed: bool = False,
+    ):
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self._lock = Lock()
+        self._local = threading.local()
+        self._log_dictionary = LogDictionary()
         self._init_db()
+        self.hot_tier = hot_tier
+        self.feed: Optional[HotTierFeed] = None
+        if feed and HotTierFeed.supported():
+            self.feed = HotTierFeed(
+                str(self.db_path.parent / "hot-tier"),
+                on_message=self._apply_feed_message if hot_tier else None,
+                on_gap=hot_tier.mark_stale if hot_tier else None,
+            )
 
-    @contextmanager
-    def _conn(self):
+    def _connect(self) -> sqlite3.Connection:
         conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
+        conn.create_function("render_message", 2, render_message, deterministic=True)
+        return conn
+
+    @contextmanager
+    def _conn(self):
+        # Threads that called open_thread_connection() reuse their own connection.
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            try:
+                yield conn
+            except BaseException:
+                # The connection outlives this call: don't leave a half-done write open on it.
+                conn.rollback()
+                raise
+            return
+        conn = self._connect()
         try:
             yield conn
         finally:
             conn.close()
 
+    def open_thread_connection(self) -> None:
+        """Pins a long-lived connection to the calling thread (e.g. a reader pool worker)."""
+        if getattr(self._local, "conn", None) is None:
+            self._local.conn = self._connect()
+
     def _init_db(self) -> None:
         with self._conn() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS logs (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT NOT NULL,
-                    service TEXT NOT NULL,
-                    level TEXT NOT NULL,
-                    event_type TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    trace_id TEXT,
-                    source_ip TEXT,
-                    cpu_usage REAL,
-                    memory_usage REAL,
-                    response_time_ms REAL,
-                    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
-                )
-                """
-            )
+            # WAL lets API readers run concurrently with the simulator's writes.
+            conn.execute("PRAGMA journal_mode=WAL")
+            self.compact_logs = logs_layout(conn) != "table"
+            if self.compact_logs:
+                create_compact_logs(conn)
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS alerts (
@@ -65,13 +126,90 @@ class Storage:
                     acknowledged_at TEXT,
                     suppressed_at TEXT,
                     updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    details TEXT,
                     created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
                 )
                 """
             )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS security_ip_windows (
+                    window_start TEXT PRIMARY KEY,
+                    window_sec INTEGER NOT NULL,
+                    auth_failures INTEGER NOT NULL,
+                    distinct_ips INTEGER NOT NULL,
+                    top_ips TEXT NOT NULL,
+                    hll TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS latency_sketches (
+                    service TEXT NOT NULL,
+                    bucket_start TEXT NOT NULL,
+                    sketch TEXT NOT NULL,
+                    PRIMARY KEY (service, bucket_start)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_latency_sketches_bucket ON latency_sketches (bucket_start)"
+            )
             self._migrate_alerts_table(conn)
+            if not self.compact_logs:
+                self._migrate_logs_table(conn)
+            # Exact per-minute event counts, including logs the ingest sampler did not store.
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS log_volume (
+                    bucket_start TEXT NOT NULL,
+                    service TEXT NOT NULL,
+                    level TEXT NOT NULL,
+                    event_type TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (bucket_start, service, level, event_type)
+                )
+                """
+            )
+            # Log indexes keep their names whichever table holds the rows.
+            log_table = "log_rows" if self.compact_logs else "logs"
+            # Trace pivots (see get_trace) must not scan either table.
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_logs_trace_id ON {log_table} (trace_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_source_trace_id ON alerts (source_trace_id)")
+            # Time-ordered scans (iter_rows) walk these indexes instead of sorting the table.
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON {log_table} (timestamp)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_timestamp ON alerts (timestamp)")
+            # Triage looks alerts up by their public alert_id.
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_alert_id ON alerts (alert_id)")
+            # updated_at only has one-second resolution, so alert updates also bump a
+            # counter; with MAX(id) it versions the alert table for HTTP validators.
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_alerts_updated_at ON alerts (updated_at)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS change_counters (
+                    name TEXT PRIMARY KEY,
+                    changes INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute("INSERT OR IGNORE INTO change_counters (name, changes) VALUES ('alerts', 0)")
+            conn.execute(
+                """
+                CREATE TRIGGER IF NOT EXISTS alerts_count_updates AFTER UPDATE ON alerts
+                BEGIN
+                    UPDATE change_counters SET changes = changes + 1 WHERE name = 'alerts';
+                END
+                """
+            )
             conn.commit()
 
+    def _migrate_logs_table(self, conn: sqlite3.Connection) -> None:
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(logs)").fetchall()}
+        if "sample_weight" not in columns:
+            # How many generated events a stored row stands for (see src/sampling.py).
+            conn.execute("ALTER TABLE logs ADD COLUMN sample_weight INTEGER NOT NULL DEFAULT 1")
+
     def _migrate_alerts_table(self, conn: sqlite3.Connection) -> None:
         columns = {
             row["name"]
@@ -87,44 +225,164 @@ class Storage:
         if "updated_at" not in columns:
             conn.execute("ALTER TABLE alerts ADD COLUMN updated_at TEXT")
             conn.execute("UPDATE alerts SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+        if "details" not in columns:
+            conn.execute("ALTER TABLE alerts ADD COLUMN details TEXT")
+
+    @staticmethod
+    def _alert_row(row: sqlite3.Row) -> Dict[str, Any]:
+        alert = dict(row)
+        if alert.get("details"):
+            alert["details"] = json.loads(alert["details"])
+        return alert
+
+    @staticmethod
+    def _log_row(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "id": row["id"],
+            "timestamp": row["timestamp"],
+            "service": row["service"],
+            "level": row["level"],
+            "event_type": row["event_type"],
+            "message": row["message"],
+            "trace_id": row["trace_id"],
+            "source_ip": row["source_ip"],
+            "metrics": {
+                "cpu_usage": row["cpu_usage"],
+                "memory_usage": row["memory_usage"],
+                "response_time_ms": row["response_time_ms"],
+            },
+            "sample_weight": row["sample_weight"],
+        }
+
+    @property
+    def _publishing(self) -> bool:
+        return self.hot_tier is not None or self.feed is not None
+
+    def _publish(self, kind: str, op: str, rows: List[Tuple[int, Dict[str, Any]]]) -> None:
+        """Hands committed rows, in their read-API shape, to the hot tier and the feed."""
+        encoded = [(row_id, dumps(row)) for row_id, row in rows]
+        if self.hot_tier is not None:
+            for row_id, payload in encoded:
+                self.hot_tier.apply(kind, op, row_id, payload)
+        if self.feed is not None:
+            self.feed.publish(kind, op, encoded)
 
+    def _apply_feed_message(self, message: Dict[str, Any], payload: bytes) -> None:
+        self.hot_tier.apply(message["kind"], message["op"], message["id"], payload)
+
+    def _hot(self, kind: str) -> Optional[HotTier]:
+        """
+        The hot tier, re-primed from SQLite first if it has fallen out of step,
+        and caught up on `kind` rows that writers committed without publishing
+        them (e.g. a simulator run with --no-hot-tier-feed).
+        """
+        if self.hot_tier is not None:
+            if not self.hot_tier.ready:
+                self.hot_tier.prime(self._load_hot_rows)
+            else:
+                self.hot_tier.catch_up(kind, self._load_rows_after)
+        return self.hot_tier
+
+    def _load_hot_rows(self, capacities: Dict[str, int]) -> Dict[str, List[Tuple[int, bytes]]]:
+        return {kind: self._load_rows_after(kind, 0, capacity) for kind, capacity in capacities.items()}
+
+    def _load_rows_after(self, kind: str, after_id: int, limit: int) -> List[Tuple[int, bytes]]:
+        """The newest `limit` rows with id > `after_id`, oldest first, in their hot-tier encoding."""
+        table, columns, to_row = (
+            ("logs", LOG_COLUMNS, self._log_row) if kind == "log" else ("alerts", ALERT_COLUMNS, self._alert_row)
+        )
+        with self._conn() as conn:
+            rows = conn.execute(
+                f"SELECT {columns} FROM {table} WHERE id > ? ORDER BY id DESC LIMIT ?", (after_id, limit)
+            ).fetchall()
+        return [(row["id"], dumps(to_row(row))) for row in reversed(rows)]
+
+    def close(self) -> None:
+        """Stops the feed. A hot tier fed by other processes is dropped with it."""
+        if self.feed is not None:
+            receiving = self.hot_tier is not None
+            self.feed.close()
+            self.feed = None
+            if receiving:
+                self.hot_tier = None
+
+    @timed("storage.insert_log")
     def insert_log(self, log_entry: Dict[str, Any]) -> None:
-        metrics = log_entry.get("metrics", {})
+        self._insert_logs([log_entry])
+
+    @timed("storage.insert_logs")
+    def insert_logs(self, log_entries: Sequence[Dict[str, Any]]) -> None:
+        """Inserts several logs in one transaction (one commit instead of one per row)."""
+        if log_entries:
+            self._insert_logs(log_entries)
+
+    def _insert_logs(self, log_entries: Sequence[Dict[str, Any]]) -> None:
+        published = []
+        rows = []
+        for log_entry in log_entries:
+            metrics = log_entry.get("metrics", {})
+            strings = (
+                log_entry.get("service", "unknown"),
+                log_entry.get("level", "INFO"),
+                log_entry.get("event_type", "unknown"),
+                log_entry.get("message", ""),
+            )
+            values = (
+                log_entry.get("trace_id"),
+                log_entry.get("source_ip"),
+                metrics.get("cpu_usage"),
+                metrics.get("memory_usage"),
+                metrics.get("response_time_ms"),
+                log_entry.get("sample_weight", 1),
+            )
+            rows.append((log_entry.get("timestamp"), strings, values))
         with self._lock:
             with self._conn() as conn:
-                conn.execute(
-                    """
-                    INSERT INTO logs (
-                        timestamp, service, level, event_type, message,
-                        trace_id, source_ip, cpu_usage, memory_usage, response_time_ms
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        log_entry.get("timestamp"),
-                        log_entry.get("service", "unknown"),
-                        log_entry.get("level", "INFO"),
-                        log_entry.get("event_type", "unknown"),
-                        log_entry.get("message", ""),
-                        log_entry.get("trace_id"),
-                        log_entry.get("source_ip"),
-                        metrics.get("cpu_usage"),
-                        metrics.get("memory_usage"),
-                        metrics.get("response_time_ms"),
-                    ),
-                )
+                # Encoded up front: new dictionary entries are committed as they are
+                # created, which must not commit part of the batch with them.
+                if self.compact_logs:
+                    encoded = [self._log_dictionary.encode(conn, *strings) for _, strings, _ in rows]
+                else:
+                    encoded = [None] * len(rows)
+                for (timestamp, strings, values), codes in zip(rows, encoded):
+                    if codes is not None:
+                        cursor = conn.execute(INSERT_LOG_ROW, (timestamp, *codes, *values))
+                        row = None
+                        if self._publishing:
+                            row = conn.execute(
+                                f"SELECT {LOG_COLUMNS} FROM logs WHERE id = ?", (cursor.lastrowid,)
+                            ).fetchone()
+                    else:
+                        returning = f" RETURNING {LOG_COLUMNS}" if self._publishing else ""
+                        cursor = conn.execute(
+                            """
+                            INSERT INTO logs (
+                                timestamp, service, level, event_type, message,
+                                trace_id, source_ip, cpu_usage, memory_usage, response_time_ms, sample_weight
+                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                            """ + returning,
+                            (timestamp, *strings, *values),
+                        )
+                        row = cursor.fetchone() if returning else None
+                    if row is not None:
+                        published.append((row["id"], self._log_row(row)))
                 conn.commit()
+                if published:
+                    self._publish("log", "insert", published)
 
+    @timed("storage.insert_alert")
     def insert_alert(self, alert: Dict[str, Any]) -> None:
+        returning = f" RETURNING {ALERT_COLUMNS}" if self._publishing else ""
         with self._lock:
             with self._conn() as conn:
-                conn.execute(
+                cursor = conn.execute(
                     """
                     INSERT INTO alerts (
                         alert_id, timestamp, alert_generated_at, alert_type,
                         severity, description, source_service, source_trace_id,
-                        offending_ip, status, acknowledged_at, suppressed_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
+                        offending_ip, status, acknowledged_at, suppressed_at, details
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """ + returning,
                     (
                         alert.get("alert_id"),
                         alert.get("timestamp"),
@@ -138,34 +396,47 @@ class Storage:
                         "OPEN",
                         None,
                         None,
+                        json.dumps(alert["details"]) if alert.get("details") else None,
                     ),
                 )
+                row = cursor.fetchone() if returning else None
                 conn.commit()
+                if row is not None:
+                    self._publish("alert", "insert", [(row["id"], self._alert_row(row))])
 
+    @timed("storage.get_alerts")
     def get_alerts(self, limit: int = 100) -> List[Dict[str, Any]]:
         limit = max(1, min(limit, 1000))
+        hot = self._hot_rows("alert", limit)
+        if hot is not None:
+            return [json.loads(row) for row in hot]
         with self._conn() as conn:
             rows = conn.execute(
                 """
                 SELECT id, alert_id, timestamp, alert_generated_at, alert_type, severity,
                        description, source_service, source_trace_id, offending_ip,
-                       status, acknowledged_at, suppressed_at, updated_at
+                       status, acknowledged_at, suppressed_at, updated_at, details
                 FROM alerts
                 ORDER BY id DESC
                 LIMIT ?
                 """,
                 (limit,),
             ).fetchall()
-        return [dict(row) for row in rows]
+        return [self._alert_row(row) for row in rows]
 
+    @timed("storage.get_alerts_since_id")
     def get_alerts_since_id(self, after_id: int, limit: int = 200) -> List[Dict[str, Any]]:
         limit = max(1, min(limit, 1000))
+        hot = self._hot("alert")
+        rows = hot.after("alert", after_id, limit) if hot is not None else None
+        if rows is not None:
+            return [json.loads(row) for row in rows]
         with self._conn() as conn:
             rows = conn.execute(
                 """
                 SELECT id, alert_id, timestamp, alert_generated_at, alert_type, severity,
                        description, source_service, source_trace_id, offending_ip,
-                       status, acknowledged_at, suppressed_at, updated_at
+                       status, acknowledged_at, suppressed_at, updated_at, details
                 FROM alerts
                 WHERE id > ?
                 ORDER BY id ASC
@@ -173,13 +444,50 @@ class Storage:
                 """,
                 (after_id, limit),
             ).fetchall()
+        return [self._alert_row(row) for row in rows]
+
+    @timed("storage.get_alert_updates")
+    def get_alert_updates(self, since: str, max_id: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Alerts up to row `max_id` with `updated_at >= since`, oldest change first."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, alert_id, status, acknowledged_at, suppressed_at, updated_at
+                FROM alerts
+                WHERE updated_at >= ? AND id <= ?
+                ORDER BY updated_at ASC, id ASC
+                LIMIT ?
+                """,
+                (since, max_id, limit),
+            ).fetchall()
         return [dict(row) for row in rows]
 
+    @timed("storage.get_alert_update_watermark")
+    def get_alert_update_watermark(self) -> Tuple[str, Dict[int, str]]:
+        """The latest `updated_at`, and the status of each alert that carries it."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT id, status, updated_at FROM alerts WHERE updated_at = (SELECT MAX(updated_at) FROM alerts)"
+            ).fetchall()
+        if not rows:
+            return "", {}
+        return rows[0]["updated_at"], {row["id"]: row["status"] for row in rows}
+
+    @timed("storage.get_latest_alert_row_id")
     def get_latest_alert_row_id(self) -> int:
+        hot = self._hot("alert")
+        max_id = hot.max_id("alert") if hot is not None else None
+        if max_id is not None:
+            return max_id
         with self._conn() as conn:
             row = conn.execute("SELECT COALESCE(MAX(id), 0) AS max_id FROM alerts").fetchone()
         return int(row["max_id"])
 
+    def alert_position(self, rows: Iterable[Dict[str, Any]], start: int = 0) -> int:
+        """The get_alerts_since_id cursor once `rows` have been seen."""
+        return max([start, *(row["id"] for row in rows)])
+
+    @timed("storage.update_alert_status")
     def update_alert_status(self, alert_id: str, status: str) -> Optional[Dict[str, Any]]:
         status = status.upper()
         if status not in VALID_STATUSES:
@@ -215,48 +523,419 @@ class Storage:
                     """
                     SELECT id, alert_id, timestamp, alert_generated_at, alert_type, severity,
                            description, source_service, source_trace_id, offending_ip,
-                           status, acknowledged_at, suppressed_at, updated_at
+                           status, acknowledged_at, suppressed_at, updated_at, details
                     FROM alerts
                     WHERE id = ?
                     """,
                     (db_id,),
                 ).fetchone()
+                if updated and self._publishing:
+                    self._publish("alert", "update", [(db_id, self._alert_row(updated))])
+
+        return self._alert_row(updated) if updated else None
 
-        return dict(updated) if updated else None
+    @timed("storage.bulk_update_alert_status")
+    def bulk_update_alert_status(
+        self,
+        status: str,
+        alert_ids: Optional[Sequence[str]] = None,
+        filters: Optional[Dict[str, Sequence[str]]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Moves every alert matching `alert_ids` and/or the filters (EXPORT_FILTERS
+        columns plus a [since, until) time range) to `status` with one
+        UPDATE ... RETURNING, and returns the changed rows ordered by id. Alerts
+        already in `status` are left untouched.
+        """
+        status = status.upper()
+        if status not in VALID_STATUSES:
+            raise ValueError(f"Unsupported status: {status}")
+        conditions, params = self._filter_conditions("alerts", filters)
+        if alert_ids is not None:
+            # One JSON parameter instead of one per id keeps clear of SQLite's variable limit.
+            conditions += " AND alert_id IN (SELECT value FROM json_each(?))"
+            params.append(json.dumps(list(alert_ids)))
+        if since:
+            conditions += " AND timestamp >= ?"
+            params.append(since)
+        if until:
+            conditions += " AND timestamp < ?"
+            params.append(until)
+        if not conditions:
+            raise ValueError("Bulk status updates need alert ids or at least one filter")
+
+        acknowledged_at = "CURRENT_TIMESTAMP" if status == "ACKNOWLEDGED" else "acknowledged_at"
+        suppressed_at = "CURRENT_TIMESTAMP" if status == "SUPPRESSED" else "suppressed_at"
+        with self._lock:
+            with self._conn() as conn:
+                rows = conn.execute(
+                    f"""
+                    UPDATE alerts
+                    SET status = ?,
+                        acknowledged_at = {acknowledged_at},
+                        suppressed_at = {suppressed_at},
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE status != ?{conditions}
+                    RETURNING id, alert_id, timestamp, alert_generated_at, alert_type, severity,
+                              description, source_service, source_trace_id, offending_ip,
+                              status, acknowledged_at, suppressed_at, updated_at, details
+                    """,
+                    (status, status, *params),
+                ).fetchall()
+                conn.commit()
+                updated = sorted((self._alert_row(row) for row in rows), key=lambda alert: alert["id"])
+                if updated and self._publishing:
+                    self._publish("alert", "update", [(alert["id"], alert) for alert in updated])
+        return updated
+
+    @timed("storage.upsert_security_windows")
+    def upsert_security_windows(self, windows: List[Dict[str, Any]]) -> None:
+        """Merges per-window auth-failure IP sketch increments into the stored windows in one transaction."""
+        if not windows:
+            return
+        with self._lock:
+            with self._conn() as conn:
+                # Several simulators may flush into the same window; hold the write
+                # lock from the first read so none of their increments is lost.
+                conn.execute("BEGIN IMMEDIATE")
+                for window in windows:
+                    top_ips, distinct_ips = window["top_ips"], window["distinct_ips"]
+                    auth_failures = window["auth_failures"]
+                    row = conn.execute(
+                        "SELECT auth_failures, top_ips, hll FROM security_ip_windows WHERE window_start = ?",
+                        (window["window_start"],),
+                    ).fetchone()
+                    if row:
+                        top_ips = SpaceSaving.from_json(row["top_ips"]).merge(top_ips)
+                        distinct_ips = HyperLogLog.from_json(row["hll"]).merge(distinct_ips)
+                        auth_failures += row["auth_failures"]
+                    conn.execute(
+                        """
+                        INSERT OR REPLACE INTO security_ip_windows (
+                            window_start, window_sec, auth_failures, distinct_ips, top_ips, hll
+                        ) VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            window["window_start"],
+                            window["window_sec"],
+                            auth_failures,
+                            distinct_ips.estimate(),
+                            top_ips.to_json(),
+                            distinct_ips.to_json(),
+                        ),
+                    )
+                conn.commit()
+
+    @timed("storage.get_top_source_ips")
+    def get_top_source_ips(self, since: str, limit: int = 10) -> Dict[str, Any]:
+        """Merges the stored IP windows from `since` onward into one top-k / distinct view."""
+        with self._conn() as conn:
+            rows = conn.execute(
+                """
+                SELECT window_start, auth_failures, top_ips, hll
+                FROM security_ip_windows
+                WHERE window_start >= ?
+                ORDER BY window_start
+                """,
+                (since,),
+            ).fetchall()
+
+        top_ips = None
+        distinct = None
+        for row in rows:
+            window_top = SpaceSaving.from_json(row["top_ips"])
+            window_hll = HyperLogLog.from_json(row["hll"])
+            top_ips = window_top if top_ips is None else top_ips.merge(window_top)
+            distinct = window_hll if distinct is None else distinct.merge(window_hll)
+
+        return {
+            "windows": len(rows),
+            "first_window_start": rows[0]["window_start"] if rows else None,
+            "auth_failures": sum(row["auth_failures"] for row in rows),
+            "distinct_ips": distinct.estimate() if distinct else 0,
+            "top_ips": [
+                {"ip": entry["item"], "count": entry["count"], "error": entry["error"]}
+                for entry in (top_ips.top(limit) if top_ips else [])
+            ],
+        }
+
+    @timed("storage.merge_latency_sketches")
+    def merge_latency_sketches(self, items: List[Tuple[str, str, LatencySketch]]) -> None:
+        """Adds per-minute sketch increments into the stored sketches in one transaction."""
+        if not items:
+            return
+        with self._lock:
+            with self._conn() as conn:
+                # Take the write lock before reading, so another process can't
+                # merge into the same rows between our SELECT and our write.
+                conn.execute("BEGIN IMMEDIATE")
+                for service, bucket_start, sketch in items:
+                    row = conn.execute(
+                        "SELECT sketch FROM latency_sketches WHERE service = ? AND bucket_start = ?",
+                        (service, bucket_start),
+                    ).fetchone()
+                    if row:
+                        sketch = LatencySketch.from_json(row["sketch"]).merge(sketch)
+                    conn.execute(
+                        """
+                        INSERT OR REPLACE INTO latency_sketches (service, bucket_start, sketch)
+                        VALUES (?, ?, ?)
+                        """,
+                        (service, bucket_start, sketch.to_json()),
+                    )
+                conn.commit()
+
+    @timed("storage.get_latency_sketch")
+    def get_latency_sketch(self, since: str, service: Optional[str] = None) -> LatencySketch:
+        """Merges the stored per-minute sketches from `since` onward (optionally one service)."""
+        query = "SELECT sketch FROM latency_sketches WHERE bucket_start >= ?"
+        params: List[Any] = [since]
+        if service:
+            query += " AND service = ?"
+            params.append(service)
+        with self._conn() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return LatencySketch.merged(LatencySketch.from_json(row["sketch"]) for row in rows)
+
+    @timed("storage.merge_log_volume")
+    def merge_log_volume(self, counts: List[Tuple[str, str, str, str, int]]) -> None:
+        """Adds (minute, service, level, event_type, count) increments to the log_volume rollup."""
+        if not counts:
+            return
+        with self._lock:
+            with self._conn() as conn:
+                conn.executemany(
+                    """
+                    INSERT INTO log_volume (bucket_start, service, level, event_type, count)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (bucket_start, service, level, event_type)
+                    DO UPDATE SET count = count + excluded.count
+                    """,
+                    counts,
+                )
+                conn.commit()
+
+    @timed("storage.get_log_volume")
+    def get_log_volume(self, since: str, service: Optional[str] = None) -> Dict[str, Any]:
+        """Exact event counts from `since` onward: total, by level, by event type and per minute."""
+        query = "SELECT bucket_start, level, event_type, count FROM log_volume WHERE bucket_start >= ?"
+        params: List[Any] = [since]
+        if service:
+            query += " AND service = ?"
+            params.append(service)
+        with self._conn() as conn:
+            rows = conn.execute(query, params).fetchall()
+        by_level: Dict[str, int] = {}
+        by_event_type: Dict[str, int] = {}
+        per_minute: Dict[str, int] = {}
+        for row in rows:
+            by_level[row["level"]] = by_level.get(row["level"], 0) + row["count"]
+            by_event_type[row["event_type"]] = by_event_type.get(row["event_type"], 0) + row["count"]
+            per_minute[row["bucket_start"]] = per_minute.get(row["bucket_start"], 0) + row["count"]
+        return {
+            "total": sum(by_level.values()),
+            "by_level": by_level,
+            "by_event_type": by_event_type,
+            "series": [{"timestamp": minute, "count": per_minute[minute]} for minute in sorted(per_minute)],
+        }
 
+    @timed("storage.get_data_version")
+    def get_data_version(self) -> Dict[str, Dict[str, Any]]:
+        """Cheap change markers for the alerts and logs tables (all index or PK lookups)."""
+        with self._conn() as conn:
+            row = conn.execute(
+                """
+                SELECT (SELECT MAX(id) FROM alerts) AS alert_max_id,
+                       (SELECT changes FROM change_counters WHERE name = 'alerts') AS alert_changes,
+                       (SELECT MAX(updated_at) FROM alerts) AS alert_updated_at,
+                       (SELECT MAX(id) FROM logs) AS log_max_id,
+                       (SELECT created_at FROM logs ORDER BY id DESC LIMIT 1) AS log_created_at
+                """
+            ).fetchone()
+        return {
+            "alerts": {
+                "tag": f"{row['alert_max_id'] or 0}.{row['alert_changes'] or 0}",
+                "modified": row["alert_updated_at"],
+                "max_id": row["alert_max_id"] or 0,
+            },
+            "logs": {"tag": str(row["log_max_id"] or 0), "modified": row["log_created_at"]},
+        }
+
+    @timed("storage.get_trace")
+    def get_trace(self, trace_id: str, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Logs and alerts sharing `trace_id`, oldest first, from one indexed query."""
+        limit = max(1, min(limit, 5000))
+        with self._conn() as conn:
+            rows = conn.execute(
+                """
+                SELECT 'log' AS kind, id, timestamp,
+                       json_object(
+                           'service', service, 'level', level, 'event_type', event_type,
+                           'message', message, 'source_ip', source_ip,
+                           'metrics', json_object(
+                               'cpu_usage', cpu_usage, 'memory_usage', memory_usage,
+                               'response_time_ms', response_time_ms
+                           )
+                       ) AS payload
+                FROM logs
+                WHERE trace_id = ?
+                UNION ALL
+                SELECT 'alert' AS kind, id, timestamp,
+                       json_object(
+                           'alert_id', alert_id, 'alert_type', alert_type, 'severity', severity,
+                           'description', description, 'source_service', source_service,
+                           'offending_ip', offending_ip, 'status', status, 'updated_at', updated_at
+                       ) AS payload
+                FROM alerts
+                WHERE source_trace_id = ?
+                ORDER BY timestamp, kind DESC, id
+                LIMIT ?
+                """,
+                (trace_id, trace_id, limit),
+            ).fetchall()
+        return [
+            {"kind": row["kind"], "id": row["id"], "timestamp": row["timestamp"], **json.loads(row["payload"])}
+            for row in rows
+        ]
+
+    def iter_rows(
+        self,
+        table: str,
+        columns: Optional[Sequence[str]] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        filters: Optional[Dict[str, Sequence[str]]] = None,
+        chunk_size: int = 5000,
+    ) -> Iterator[List[sqlite3.Row]]:
+        """
+        Yields rows of `table` with timestamps in [since, until) as time-ordered
+        chunks, optionally restricted to rows whose `filters` columns take one of
+        the given values.
+
+        Each chunk is a separate keyset query, so a long scan never holds a read
+        transaction open or more than one chunk in memory. Arguments are checked
+        here (ValueError), before the first query runs.
+        """
+        if table not in EXPORT_COLUMNS:
+            raise ValueError(f"Unsupported table: {table}")
+        columns = list(columns or EXPORT_COLUMNS[table])
+        unknown = set(columns) - set(EXPORT_COLUMNS[table])
+        if unknown:
+            raise ValueError(f"Unknown {table} fields: {', '.join(sorted(unknown))}")
+        conditions, filter_params = self._filter_conditions(table, filters)
+
+        # id and timestamp drive the keyset even when the caller doesn't want them.
+        select = ", ".join(dict.fromkeys(["id", "timestamp", *columns]))
+        query = f"""
+            SELECT {select}
+            FROM {table}
+            WHERE timestamp >= ? AND (timestamp > ? OR id > ?) AND timestamp < ?{conditions}
+            ORDER BY timestamp, id
+            LIMIT ?
+        """
+        return self._iter_keyset(query, since or "", until or "\uffff", filter_params, chunk_size)
+
+    @staticmethod
+    def _filter_conditions(table: str, filters: Optional[Dict[str, Sequence[str]]]) -> Tuple[str, List[str]]:
+        """` AND column IN (...)` clauses (and their parameters) for EXPORT_FILTERS columns."""
+        filters = {name: list(values) for name, values in (filters or {}).items() if values}
+        unknown = set(filters) - set(EXPORT_FILTERS[table])
+        if unknown:
+            raise ValueError(f"Unsupported {table} filters: {', '.join(sorted(unknown))}")
+        conditions = "".join(
+            f" AND {name} IN ({', '.join('?' * len(values))})" for name, values in filters.items()
+        )
+        return conditions, [value for values in filters.values() for value in values]
+
+    def _iter_keyset(
+        self, query: str, since: str, until: str, filter_params: List[str], chunk_size: int
+    ) -> Iterator[List[sqlite3.Row]]:
+        last_timestamp, last_id = since, 0
+        while True:
+            with self._conn() as conn:
+                rows = conn.execute(
+                    query, (last_timestamp, last_timestamp, last_id, until, *filter_params, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            yield rows
+            last_timestamp, last_id = rows[-1]["timestamp"], rows[-1]["id"]
+
+    def iter_logs(
+        self, since: Optional[str] = None, until: Optional[str] = None, chunk_size: int = 5000
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Time-ordered chunks of logs (see iter_rows), shaped like the simulator's log entries."""
+        for rows in self.iter_rows("logs", since=since, until=until, chunk_size=chunk_size):
+            chunk = []
+            for row in rows:
+                metrics = {
+                    name: row[name]
+                    for name in ("cpu_usage", "memory_usage", "response_time_ms")
+                    if row[name] is not None
+                }
+                chunk.append(
+                    {
+                        "timestamp": row["timestamp"],
+                        "service": row["service"],
+                        "level": row["level"],
+                        "event_type": row["event_type"],
+                        "message": row["message"],
+                        "trace_id": row["trace_id"],
+                        "source_ip": row["source_ip"],
+                        "metrics": metrics,
+                        "sample_weight": row["sample_weight"],
+                    }
+                )
+            yield chunk
+
+    def iter_alerts(
+        self, since: Optional[str] = None, until: Optional[str] = None, chunk_size: int = 5000
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Time-ordered chunks of stored alerts (see iter_rows)."""
+        for rows in self.iter_rows("alerts", since=since, until=until, chunk_size=chunk_size):
+            yield [self._alert_row(row) for row in rows]
+
+    @timed("storage.get_logs")
     def get_logs(self, limit: int = 200) -> List[Dict[str, Any]]:
+        """Newest logs first by id. ``sample_weight`` is how many events a row stands for (see sampling)."""
         limit = max(1, min(limit, 2000))
+        hot = self._hot_rows("log", limit)
+        if hot is not None:
+            return [json.loads(row) for row in hot]
         with self._conn() as conn:
+            # Newest first by insertion, the same order the hot tier serves.
             rows = conn.execute(
                 """
-                SELECT timestamp, service, level, event_type, message, trace_id, source_ip,
-                       cpu_usage, memory_usage, response_time_ms
+                SELECT id, timestamp, service, level, event_type, message, trace_id, source_ip,
+                       cpu_usage, memory_usage, response_time_ms, sample_weight
                 FROM logs
-                ORDER BY datetime(timestamp) DESC
+                ORDER BY id DESC
                 LIMIT ?
                 """,
                 (limit,),
             ).fetchall()
-        logs: List[Dict[str, Any]] = []
-        for row in rows:
-            logs.append(
-                {
-                    "timestamp": row["timestamp"],
-                    "service": row["service"],
-                    "level": row["level"],
-                    "event_type": row["event_type"],
-                    "message": row["message"],
-                    "trace_id": row["trace_id"],
-                    "source_ip": row["source_ip"],
-                    "metrics": {
-                        "cpu_usage": row["cpu_usage"],
-                        "memory_usage": row["memory_usage"],
-                        "response_time_ms": row["response_time_ms"],
-                    },
-                }
-            )
-        return logs
+        return [self._log_row(row) for row in rows]
+
+    def _hot_rows(self, kind: str, limit: int) -> Optional[List[bytes]]:
+        hot = self._hot(kind)
+        return hot.newest(kind, limit) if hot is not None else None
+
+    @timed("storage.recent_json")
+    def recent_json(self, kind: str, limit: int) -> bytes:
+        """
+        get_logs / get_alerts as a compact JSON array. From the hot tier this is
+        a join of pre-serialized rows, with no per-row dict or encode work.
+        """
+        limit = max(1, min(limit, 2000 if kind == "log" else 1000))
+        hot = self._hot_rows(kind, limit)
+        if hot is not None:
+            return b"[" + b",".join(hot) + b"]"
+        items = self.get_logs(limit) if kind == "log" else self.get_alerts(limit)
+        return json.dumps(items, separators=(",", ":")).encode()
 
+    @timed("storage.get_metrics_summary")
     def get_metrics_summary(self) -> Dict[str, Any]:
         with self._conn() as conn:
             total_alerts = conn.execute("SELECT COUNT(*) FROM alerts").fetchone()[0]
@@ -314,3 +993,52 @@ class Storage:
             return True
         except sqlite3.Error:
             return False
+
+
+class AsyncStorage:
+    """
+    Awaitable facade over Storage for async handlers.
+
+    Calls run on a small dedicated thread pool whose workers each hold their
+    own SQLite connection, so a slow query ties up one worker instead of the
+    event loop, and concurrent readers don't queue behind each other.
+    """
+
+    def __init__(self, storage: Storage, max_workers: int = 4):
+        self.storage = storage
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="storage-reader",
+            initializer=storage.open_thread_connection,
+        )
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def get_alerts(self, limit: int = 100) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.get_alerts, limit=limit)
+
+    async def get_alerts_since_id(self, after_id: int, limit: int = 200) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.get_alerts_since_id, after_id=after_id, limit=limit)
+
+    async def get_latest_alert_row_id(self) -> int:
+        return await self.run(self.storage.get_latest_alert_row_id)
+
+    async def get_logs(self, limit: int = 200) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.get_logs, limit=limit)
+
+    async def get_metrics_summary(self) -> Dict[str, Any]:
+        return await self.run(self.storage.get_metrics_summary)
+
+    async def update_alert_status(self, alert_id: str, status: str) -> Optional[Dict[str, Any]]:
+        return await self.run(self.storage.update_alert_status, alert_id=alert_id, status=status)
+
+    async def bulk_update_alert_status(self, status: str, **criteria: Any) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.bulk_update_alert_status, status, **criteria)
+
+    async def healthcheck(self) -> bool:
+        return await self.run(self.storage.healthcheck)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
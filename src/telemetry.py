@@ -0,0 +1,242 @@
+"""
+Lightweight in-process counters and latency histograms for the pipeline's own
+hot paths, rendered in the Prometheus text exposition format.
+
+Recording costs two perf_counter() calls and a bucket bisect per call. Set
+INTERNAL_METRICS=0 (or call set_enabled(False)) to turn every instrumented
+call into a plain pass-through.
+"""
+
+from __future__ import annotations
+
+import functools
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (
+    0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005,
+    0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0,
+)
+
+_enabled = os.getenv("INTERNAL_METRICS", "1").lower() not in {"0", "false", "no", "off"}
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+class Counter:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def samples(self, name: str, labels: str) -> List[str]:
+        return [f"{name}{labels} {_format_value(self.value)}"]
+
+
+class Gauge:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        with self._lock:
+            self.value = value
+
+    def samples(self, name: str, labels: str) -> List[str]:
+        return [f"{name}{labels} {_format_value(self.value)}"]
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def samples(self, name: str, labels: str) -> List[str]:
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        prefix = labels[:-1] + "," if labels else "{"
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'{name}_bucket{prefix}le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f'{name}_bucket{prefix}le="+Inf"}} {count}')
+        lines.append(f"{name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metric families keyed by name, each with one child per label set."""
+
+    def __init__(self):
+        self._families: Dict[str, Tuple[str, str, Dict[Tuple[Tuple[str, str], ...], object]]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, factory: Callable[[], object], name: str, help_text: str, labels: Dict[str, str]):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, (kind, help_text, {}))
+            if family[0] != kind:
+                raise ValueError(f"Metric {name} already registered as a {family[0]}")
+            children = family[2]
+            if key not in children:
+                children[key] = factory()
+            return children[key]
+
+    def counter(self, name: str, help_text: str, **labels: str) -> Counter:
+        return self._get("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, **labels: str) -> Gauge:
+        return self._get("gauge", Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, **labels: str) -> Histogram:
+        return self._get("histogram", Histogram, name, help_text, labels)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            families = sorted((name, kind, help_text, dict(children))
+                              for name, (kind, help_text, children) in self._families.items())
+        for name, kind, help_text, children in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in sorted(children.items()):
+                lines.extend(metric.samples(name, _format_labels(key)))
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            for _, _, children in self._families.values():
+                for key, metric in list(children.items()):
+                    children[key] = type(metric)()
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...]) -> str:
+    if not key:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in key) + "}"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+REGISTRY = MetricsRegistry()
+
+OPERATION_SECONDS = "observability_operation_duration_seconds"
+OPERATION_ERRORS = "observability_operation_errors_total"
+
+
+def timed(operation: str) -> Callable:
+    """Decorator recording call latency (and raised exceptions) under `operation`."""
+
+    def decorator(fn: Callable) -> Callable:
+        histogram = REGISTRY.histogram(
+            OPERATION_SECONDS, "Latency of instrumented pipeline operations.", operation=operation
+        )
+        errors = REGISTRY.counter(
+            OPERATION_ERRORS, "Instrumented pipeline operations that raised.", operation=operation
+        )
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                histogram.observe(perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    extra_routes: Dict[str, Callable[[Dict[str, str]], Tuple[str, bytes]]] = {}
+
+    def do_GET(self):
+        parsed = urlsplit(self.path)
+        if parsed.path in {"/metrics", "/metrics/internal"}:
+            content_type, body = CONTENT_TYPE, render_latest().encode()
+        elif parsed.path in self.extra_routes:
+            query = dict(parse_qsl(parsed.query))
+            try:
+                content_type, body = self.extra_routes[parsed.path](query)
+            except ValueError:
+                self.send_error(400)
+                return
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(
+    port: int,
+    host: str = "0.0.0.0",
+    extra_routes: Optional[Dict[str, Callable[[Dict[str, str]], Tuple[str, bytes]]]] = None,
+) -> ThreadingHTTPServer:
+    """
+    Serves the registry on /metrics from a daemon thread (used by the simulator).
+    `extra_routes` maps a path to a callable taking the query dict and returning
+    (content type, body).
+    """
+    handler = type("MetricsHandler", (_MetricsHandler,), {"extra_routes": dict(extra_routes or {})})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="internal-metrics", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,356 @@
+"""
+Version 2 of the `/ws/alerts` protocol: one change feed per API process, fanned
+out to every connected client.
+
+Frames (JSON, or MessagePack with `format=msgpack`):
+
+- `snapshot`: `items` (newest alerts) and the full `summary`. Sent on connect,
+  after a resume that can no longer be served, and instead of `events` when a
+  window changes more rows than is worth diffing.
+- `events`: `inserted` (new alerts), `updated` (status fields of alerts whose
+  `updated_at` moved, keyed by `id`) and `summary_diff` (only the summary keys
+  that changed; `alerts_over_time` lists just the changed or new buckets).
+
+Every frame carries the hub's `epoch` and a `seq`. A client that reconnects with
+both gets the frames it missed, coalesced into one, while they are still in the
+hub's history.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from src.http_cache import msgpack
+from src.storage import AsyncStorage
+
+PROTOCOL_VERSION = 2
+UPDATE_FIELDS = ("id", "alert_id", "status", "acknowledged_at", "suppressed_at", "updated_at")
+SUMMARY_BUCKETS = 20
+
+
+def summary_diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    diff = {key: value for key, value in new.items() if key != "alerts_over_time" and old.get(key) != value}
+    old_buckets = {bucket["timestamp"]: bucket["count"] for bucket in old.get("alerts_over_time", [])}
+    changed = [bucket for bucket in new.get("alerts_over_time", []) if old_buckets.get(bucket["timestamp"]) != bucket["count"]]
+    if changed:
+        diff["alerts_over_time"] = changed
+    return diff
+
+
+def apply_summary_diff(summary: Dict[str, Any], diff: Dict[str, Any]) -> Dict[str, Any]:
+    merged = {**summary, **{key: value for key, value in diff.items() if key != "alerts_over_time"}}
+    if "alerts_over_time" in diff:
+        buckets = {bucket["timestamp"]: bucket for bucket in summary.get("alerts_over_time", [])}
+        buckets.update((bucket["timestamp"], bucket) for bucket in diff["alerts_over_time"])
+        merged["alerts_over_time"] = [buckets[key] for key in sorted(buckets)][-SUMMARY_BUCKETS:]
+    return merged
+
+
+def merge_summary_diffs(first: Dict[str, Any], second: Dict[str, Any]) -> Dict[str, Any]:
+    merged = {**first, **second}
+    if "alerts_over_time" in first and "alerts_over_time" in second:
+        buckets = {bucket["timestamp"]: bucket for bucket in first["alerts_over_time"]}
+        buckets.update((bucket["timestamp"], bucket) for bucket in second["alerts_over_time"])
+        merged["alerts_over_time"] = [buckets[key] for key in sorted(buckets)]
+    return merged
+
+
+def coalesce(frames: List[Dict[str, Any]], snapshot_size: int = 100) -> Dict[str, Any]:
+    """Folds consecutive frames into one equivalent frame carrying the last seq."""
+    start = max((i for i, frame in enumerate(frames) if frame["type"] == "snapshot"), default=None)
+    if start is not None:
+        result = dict(frames[start])
+        items = {alert["id"]: alert for alert in result["items"]}
+        summary = result["summary"]
+        for frame in frames[start + 1:]:
+            items.update((alert["id"], alert) for alert in frame["inserted"])
+            for change in frame["updated"]:
+                if change["id"] in items:
+                    items[change["id"]] = {**items[change["id"]], **change}
+            summary = apply_summary_diff(summary, frame["summary_diff"])
+        result["items"] = sorted(items.values(), key=lambda alert: alert["id"], reverse=True)[:snapshot_size]
+        result["summary"] = summary
+    else:
+        result = dict(frames[0])
+        inserted = {alert["id"]: alert for alert in result["inserted"]}
+        updated = {change["id"]: change for change in result["updated"]}
+        summary = result["summary_diff"]
+        for frame in frames[1:]:
+            inserted.update((alert["id"], alert) for alert in frame["inserted"])
+            for change in frame["updated"]:
+                if change["id"] in inserted:
+                    inserted[change["id"]] = {**inserted[change["id"]], **change}
+                else:
+                    updated[change["id"]] = change
+            summary = merge_summary_diffs(summary, frame["summary_diff"])
+        result["inserted"] = sorted(inserted.values(), key=lambda alert: alert["id"])
+        result["updated"] = sorted(updated.values(), key=lambda change: change["id"])
+        result["summary_diff"] = summary
+    result["seq"] = frames[-1]["seq"]
+    return result
+
+
+def encode_frame(frame: Dict[str, Any], fmt: str) -> Tuple[bool, Any]:
+    """(is_binary, payload) for websocket.send_bytes / send_text."""
+    if fmt == "msgpack":
+        return True, msgpack.packb(frame, use_bin_type=True)
+    return False, json.dumps(frame, separators=(",", ":"))
+
+
+class _ChangeCursor:
+    """How far the hub has read: last inserted id, plus the updated_at high-water mark."""
+
+    def __init__(self, tag: str, last_id: int, watermark: str, seen: Dict[int, str], summary: Dict[str, Any]):
+        self.tag = tag
+        self.last_id = last_id
+        self.watermark = watermark
+        # Statuses already reported for rows at `watermark` (updated_at has 1s resolution).
+        self.seen = seen
+        self.summary = summary
+
+
+class AlertEventHub:
+    """
+    Polls SQLite for alert inserts and status changes once per `window`
+    seconds (only when the alerts data version moved), publishes one frame per
+    window to every subscriber and keeps the last `history` frames for resume.
+    """
+
+    def __init__(
+        self,
+        reader: AsyncStorage,
+        window: float = 0.25,
+        history: int = 1024,
+        idle_grace: float = 60.0,
+        snapshot_size: int = 100,
+        max_inserts: int = 200,
+        max_updates: int = 2000,
+        queue_size: int = 256,
+    ):
+        self.reader = reader
+        self.window = window
+        self.idle_grace = idle_grace
+        self.snapshot_size = snapshot_size
+        self.max_inserts = max_inserts
+        self.max_updates = max_updates
+        self.queue_size = queue_size
+        self.loop = asyncio.get_running_loop()
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.frames: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.polls = 0
+        self.resyncs = 0
+        self._cursor: Optional[_ChangeCursor] = None
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._encoded_seq = 0
+        self._encoded: Dict[str, Tuple[bool, Any]] = {}
+
+    # Runs in the reader pool.
+    def _read_snapshot(self) -> Tuple[_ChangeCursor, List[Dict[str, Any]]]:
+        storage = self.reader.storage
+        version = storage.get_data_version()["alerts"]
+        start = storage.get_latest_alert_row_id()
+        items = storage.get_alerts(limit=self.snapshot_size)
+        last_id = storage.alert_position(items, start)
+        watermark, seen = storage.get_alert_update_watermark()
+        cursor = _ChangeCursor(self._tag(version, last_id), last_id, watermark, seen, storage.get_metrics_summary())
+        return cursor, items
+
+    def _snapshot_result(self) -> Tuple[_ChangeCursor, Dict[str, Any]]:
+        cursor, items = self._read_snapshot()
+        return cursor, {"type": "snapshot", "items": items, "summary": cursor.summary}
+
+    @staticmethod
+    def _tag(version: Dict[str, Any], last_id: int) -> str:
+        # Recent alerts may come from the hot tier, which can trail SQLite by a
+        # feed message; an empty tag makes the next window look again.
+        return version["tag"] if last_id >= version["max_id"] else ""
+
+    # Runs in the reader pool.
+    def _read_changes(self, cursor: _ChangeCursor) -> Optional[Tuple[_ChangeCursor, Dict[str, Any]]]:
+        storage = self.reader.storage
+        version = storage.get_data_version()["alerts"]
+        if version["tag"] == cursor.tag:
+            return None
+        if version["max_id"] - cursor.last_id > self.max_inserts:
+            return self._snapshot_result()
+        inserted = storage.get_alerts_since_id(after_id=cursor.last_id, limit=self.max_inserts)
+        last_id = storage.alert_position(inserted, cursor.last_id)
+        changes = storage.get_alert_updates(cursor.watermark, max_id=cursor.last_id, limit=self.max_updates + 1)
+        if len(changes) > self.max_updates:
+            return self._snapshot_result()
+        updated = [
+            {field: change[field] for field in UPDATE_FIELDS}
+            for change in changes
+            if not (change["updated_at"] == cursor.watermark and cursor.seen.get(change["id"]) == change["status"])
+        ]
+
+        watermark, seen = cursor.watermark, dict(cursor.seen)
+        for row in inserted + updated:
+            if row["updated_at"] > watermark:
+                watermark, seen = row["updated_at"], {}
+            if row["updated_at"] == watermark:
+                seen[row["id"]] = row["status"]
+        summary = storage.get_metrics_summary()
+        frame = {
+            "type": "events",
+            "inserted": inserted,
+            "updated": updated,
+            "summary_diff": summary_diff(cursor.summary, summary),
+        }
+        return _ChangeCursor(self._tag(version, last_id), last_id, watermark, seen, summary), frame
+
+    async def subscribe(self, since_seq: Optional[int] = None, epoch: Optional[str] = None) -> Tuple[asyncio.Queue, Dict[str, Any]]:
+        """Registers a subscriber and returns its queue and first frame (replay or snapshot)."""
+        async with self._lock:
+            first = self._replay(since_seq, epoch) or await self._snapshot()
+            queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+            self.subscribers.add(queue)
+            if self._task is None:
+                self._task = self.loop.create_task(self._run())
+            return queue, first
+
+    async def snapshot(self) -> Dict[str, Any]:
+        async with self._lock:
+            return await self._snapshot()
+
+    async def _snapshot(self) -> Dict[str, Any]:
+        cursor, items = await self.reader.run(self._read_snapshot)
+        if self._cursor is None:
+            self._cursor = cursor
+        return self._frame({"type": "snapshot", "items": items, "summary": cursor.summary}, record=False)
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self.subscribers.discard(queue)
+
+    def wake(self) -> None:
+        """Polls now instead of at the end of the current window. Safe from any thread."""
+        try:
+            self.loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            pass  # The loop this hub ran on is closed.
+
+    def encode(self, frame: Dict[str, Any], fmt: str) -> Tuple[bool, Any]:
+        """encode_frame, shared across subscribers for the latest published frame."""
+        if not self.frames or frame is not self.frames[-1]:
+            return encode_frame(frame, fmt)
+        if self._encoded_seq != frame["seq"]:
+            self._encoded_seq, self._encoded = frame["seq"], {}
+        if fmt not in self._encoded:
+            self._encoded[fmt] = encode_frame(frame, fmt)
+        return self._encoded[fmt]
+
+    def _replay(self, since_seq: Optional[int], epoch: Optional[str]) -> Optional[Dict[str, Any]]:
+        if since_seq is None or epoch != self.epoch or since_seq > self.seq:
+            return None
+        missed = [frame for frame in self.frames if frame["seq"] > since_seq]
+        if since_seq < self.seq and (not missed or missed[0]["seq"] != since_seq + 1):
+            return None  # Fell out of the history.
+        if not missed:
+            return self._frame({"type": "events", "inserted": [], "updated": [], "summary_diff": {}}, record=False)
+        return coalesce(missed, self.snapshot_size)
+
+    def _frame(self, body: Dict[str, Any], record: bool = True) -> Dict[str, Any]:
+        if record:
+            self.seq += 1
+        frame = {"v": PROTOCOL_VERSION, "epoch": self.epoch, "seq": self.seq, **body}
+        if record:
+            self.frames.append(frame)
+        return frame
+
+    def _publish(self, frame: Dict[str, Any]) -> None:
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # A client this far behind gets a fresh snapshot instead of the backlog.
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+                self.resyncs += 1
+
+    async def poll(self) -> None:
+        async with self._lock:
+            if self._cursor is None:
+                return
+            self.polls += 1
+            result = await self.reader.run(self._read_changes, self._cursor)
+            if result is None:
+                return
+            cursor, body = result
+            self._cursor = cursor
+            self._publish(self._frame(body))
+
+    async def _run(self) -> None:
+        idle_since: Optional[float] = None
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.window)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                if self.subscribers:
+                    idle_since = None
+                    await self.poll()
+                    continue
+                # Keep polling for a while after the last client leaves so that
+                # reconnecting clients can still resume from their last seq.
+                idle_since = idle_since or self.loop.time()
+                if self.loop.time() - idle_since >= self.idle_grace:
+                    self._cursor = None
+                    self.frames.clear()
+                    self.epoch = uuid.uuid4().hex[:12]
+                    return
+                await self.poll()
+        finally:
+            self._task = None
+
+
+class WebSocketChannel:
+    """
+    Waits on a subscriber queue and the client's socket together, so a client
+    that disconnects while no frames are flowing is noticed straight away.
+    """
+
+    def __init__(self, websocket: WebSocket, queue: asyncio.Queue):
+        self.websocket = websocket
+        self.queue = queue
+        self._get: Optional[asyncio.Future] = None
+        self._receive: Optional[asyncio.Future] = None
+
+    async def next(self, timeout: Optional[float] = None) -> Tuple[bool, Any]:
+        """(True, item) for the next queued item, (False, None) on timeout."""
+        if self._get is None:
+            self._get = asyncio.ensure_future(self.queue.get())
+        if self._receive is None:
+            self._receive = asyncio.ensure_future(self.websocket.receive())
+        done, _ = await asyncio.wait({self._get, self._receive}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if self._receive in done:
+            message, self._receive = self._receive.result(), None
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+        if self._get in done:
+            item, self._get = self._get.result(), None
+            return True, item
+        return False, None
+
+    def drain(self) -> List[Any]:
+        items = []
+        while not self.queue.empty():
+            items.append(self.queue.get_nowait())
+        return items
+
+    def close(self) -> None:
+        for pending in (self._get, self._receive):
+            if pending is not None:
+                pending.cancel()
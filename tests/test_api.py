@@ -1,7 +1,18 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
 from fastapi import HTTPException
+from fastapi.testclient import TestClient
 
 import src.api as api
-from src.storage import Storage
+from src import profiling
+from src.hot_tier import HotTier
+from src.http_cache import ResponseCache
+from src.sketches import LatencySketch
+from src.storage import AsyncStorage, Storage
 
 
 def _temp_storage(tmp_path):
@@ -69,3 +80,365 @@ def test_acknowledge_missing_alert_raises_404(tmp_path, monkeypatch):
         assert exc.status_code == 404
     else:
         raise AssertionError("Expected HTTPException for missing alert")
+
+
+def test_internal_metrics_endpoint_exposes_storage_latency(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    monkeypatch.setattr(api, "storage", storage)
+    storage.get_alerts(limit=1)
+
+    response = api.get_internal_metrics()
+    body = response.body.decode()
+
+    assert response.media_type.startswith("text/plain")
+    assert 'observability_operation_duration_seconds_count{operation="storage.get_alerts"}' in body
+
+
+def test_stage_traces_endpoint_requires_profiling(monkeypatch):
+    monkeypatch.setattr(api, "profiling_enabled", False)
+    try:
+        api.get_stage_traces(limit=10, min_ms=0.0, slowest=False)
+    except HTTPException as exc:
+        assert exc.status_code == 404
+    else:
+        raise AssertionError("Expected HTTPException when profiling is disabled")
+
+    monkeypatch.setattr(api, "profiling_enabled", True)
+    assert "items" in api.get_stage_traces(limit=10, min_ms=0.0, slowest=True)
+
+
+def test_alerts_websocket_sends_snapshot_then_delta(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    async_storage = AsyncStorage(storage, max_workers=2)
+    monkeypatch.setattr(api, "storage", storage)
+    monkeypatch.setattr(api, "async_storage", async_storage)
+
+    try:
+        with TestClient(api.app).websocket_connect("/ws/alerts") as ws:
+            snapshot = ws.receive_json()
+            storage.insert_alert(
+                {
+                    "alert_id": "alert-ws-1",
+                    "timestamp": "2026-02-16T13:00:01",
+                    "alert_type": "High CPU Utilization",
+                    "severity": "CRITICAL",
+                    "description": "CPU spike",
+                    "source_service": "web-server",
+                }
+            )
+            delta = ws.receive_json()
+    finally:
+        async_storage.close()
+
+    assert snapshot["type"] == "snapshot"
+    assert delta["type"] == "delta"
+    assert delta["items"][0]["alert_id"] == "alert-ws-1"
+
+
+def test_latency_metrics_endpoint_reads_sketches(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    monkeypatch.setattr(api, "storage", storage)
+    sketch = LatencySketch()
+    for value in range(1, 101):
+        sketch.add(float(value))
+    bucket = datetime.now().replace(second=0, microsecond=0).isoformat()
+    storage.merge_latency_sketches([("web-server", bucket, sketch)])
+
+    payload = api.get_latency_metrics(service="web-server", quantiles="0.5,0.99", window_minutes=5)
+    empty = api.get_latency_metrics(service="database", quantiles="0.5", window_minutes=5)
+
+    assert payload["count"] == 100
+    assert abs(payload["quantiles_ms"]["0.5"] - 50) < 2
+    assert abs(payload["quantiles_ms"]["0.99"] - 99) < 3
+    assert empty["count"] == 0
+
+    try:
+        api.get_latency_metrics(service=None, quantiles="abc", window_minutes=5)
+    except HTTPException as exc:
+        assert exc.status_code == 422
+    else:
+        raise AssertionError("Expected HTTPException for invalid quantiles")
+
+
+def test_security_top_ips_endpoint_shape(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    monkeypatch.setattr(api, "storage", storage)
+
+    payload = api.get_top_source_ips(window_minutes=15, limit=5)
+
+    assert payload["window_minutes"] == 15
+    assert payload["distinct_ips"] == 0
+    assert payload["top_ips"] == []
+
+
+def test_trace_endpoint_returns_items_or_404(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    monkeypatch.setattr(api, "storage", storage)
+    storage.insert_log(
+        {
+            "timestamp": "2026-02-16T13:00:00",
+            "service": "database",
+            "level": "ERROR",
+            "event_type": "database_error",
+            "message": "Connection to primary database failed",
+            "trace_id": "trace-api",
+        }
+    )
+
+    payload = api.get_trace("trace-api", limit=10)
+    assert payload["trace_id"] == "trace-api"
+    assert payload["items"][0]["event_type"] == "database_error"
+
+    try:
+        api.get_trace("trace-missing", limit=10)
+    except HTTPException as exc:
+        assert exc.status_code == 404
+    else:
+        raise AssertionError("Expected HTTPException for unknown trace")
+
+
+def _cached_client(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    monkeypatch.setattr(api, "storage", storage)
+    monkeypatch.setattr(api, "response_cache", ResponseCache(ttl=60.0))
+    return storage, TestClient(api.app)
+
+
+def _cached_alert(alert_id: str):
+    return {
+        "alert_id": alert_id,
+        "timestamp": "2026-02-16T13:00:01",
+        "alert_type": "High CPU Utilization",
+        "severity": "CRITICAL",
+        "description": "CPU spike " * 40,
+        "source_service": "web-server",
+    }
+
+
+def test_cached_reads_answer_conditional_requests_with_304(tmp_path, monkeypatch):
+    storage, client = _cached_client(tmp_path, monkeypatch)
+    storage.insert_alert(_cached_alert("alert-etag-1"))
+
+    first = client.get("/alerts?limit=5", headers={"Origin": "http://localhost:5173"})
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+    assert first.json()["items"][0]["alert_id"] == "alert-etag-1"
+    assert first.headers["cache-control"] == "no-cache"
+    assert "last-modified" in first.headers
+
+    revalidated = client.get(
+        "/alerts?limit=5", headers={"If-None-Match": etag, "Origin": "http://localhost:5173"}
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["access-control-allow-origin"] == "http://localhost:5173"
+    assert client.get("/alerts?limit=5", headers={"If-Modified-Since": first.headers["last-modified"]}).status_code == 304
+
+    summary = client.get("/metrics/summary")
+    assert client.get("/metrics/summary", headers={"If-None-Match": summary.headers["etag"]}).status_code == 304
+    assert api.response_cache.stats()["not_modified"] == 3
+
+
+def test_request_timing_covers_cache_hits_and_304s(tmp_path, monkeypatch):
+    storage, client = _cached_client(tmp_path, monkeypatch)
+    storage.insert_alert(_cached_alert("alert-timed-1"))
+    monkeypatch.setattr(api, "profiling_enabled", True)
+    profiling.TRACES.clear()
+
+    etag = client.get("/alerts?limit=5").headers["etag"]
+    client.get("/alerts?limit=5")
+    client.get("/alerts?limit=5", headers={"If-None-Match": etag})
+
+    statuses = [trace["status"] for trace in profiling.TRACES.snapshot() if trace["path"] == "/alerts"]
+    assert statuses == [304, 200, 200]
+
+
+def test_cached_reads_are_invalidated_by_status_changes(tmp_path, monkeypatch):
+    storage, client = _cached_client(tmp_path, monkeypatch)
+    storage.insert_alert(_cached_alert("alert-etag-2"))
+    etag = client.get("/alerts").headers["etag"]
+    assert client.get("/alerts").status_code == 200
+    assert api.response_cache.stats()["hits"] == 1
+
+    assert client.post("/alerts/alert-etag-2/acknowledge").status_code == 200
+
+    after = client.get("/alerts", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.headers["etag"] != etag
+    assert after.json()["items"][0]["status"] == "ACKNOWLEDGED"
+
+
+def test_cached_reads_are_compressed_when_accepted(tmp_path, monkeypatch):
+    storage, client = _cached_client(tmp_path, monkeypatch)
+    for i in range(5):
+        storage.insert_alert(_cached_alert(f"alert-gzip-{i}"))
+
+    plain = client.get("/alerts", headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/alerts", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert int(compressed.headers["content-length"]) < len(plain.content) / 4
+    assert compressed.json() == plain.json()
+
+
+def test_storage_data_version_tracks_inserts_and_updates(tmp_path):
+    storage = _temp_storage(tmp_path)
+    empty = storage.get_data_version()
+    storage.insert_alert(_cached_alert("alert-version-1"))
+    inserted = storage.get_data_version()
+    storage.update_alert_status("alert-version-1", "ACKNOWLEDGED")
+    storage.update_alert_status("alert-version-1", "SUPPRESSED")
+    updated = storage.get_data_version()
+
+    assert empty["alerts"]["tag"] == "0.0" and empty["logs"]["tag"] == "0"
+    assert inserted["alerts"]["tag"] == "1.0"
+    assert updated["alerts"]["tag"] == "1.2"
+
+
+def test_cached_reads_can_negotiate_msgpack(tmp_path, monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+    storage, client = _cached_client(tmp_path, monkeypatch)
+    storage.insert_alert(_cached_alert("alert-msgpack-1"))
+
+    response = client.get("/alerts", headers={"Accept": "application/msgpack"})
+
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content)["items"][0]["alert_id"] == "alert-msgpack-1"
+    assert response.headers["etag"] != client.get("/alerts").headers["etag"]
+
+
+def test_export_logs_streams_ndjson_and_csv_with_filters(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    monkeypatch.setattr(api, "storage", storage)
+    for i in range(12):
+        storage.insert_log(
+            {
+                "timestamp": f"2026-02-16T12:00:{i:02d}",
+                "service": "database" if i % 2 else "web-server",
+                "level": "ERROR" if i % 3 == 0 else "INFO",
+                "event_type": "database_error",
+                "message": f"event {i}",
+                "metrics": {"response_time_ms": float(i)},
+            }
+        )
+    client = TestClient(api.app)
+
+    ndjson = client.get(
+        "/export/logs",
+        params={"since": "2026-02-16T12:00:02", "until": "2026-02-16T12:00:10", "service": "database"},
+    )
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert [record["message"] for record in records] == ["event 3", "event 5", "event 7", "event 9"]
+    assert records[0]["response_time_ms"] == 3.0
+
+    exported = client.get("/export/logs", params={"format": "csv", "fields": "timestamp,level", "level": "ERROR"})
+    rows = list(csv.reader(io.StringIO(exported.text)))
+    assert exported.headers["content-disposition"] == 'attachment; filename="logs-export.csv"'
+    assert rows[0] == ["timestamp", "level"]
+    assert [row[0][-2:] for row in rows[1:]] == ["00", "03", "06", "09"]
+
+    empty = client.get("/export/alerts", params={"format": "csv", "fields": "alert_id,status"})
+    assert empty.text == "alert_id,status\n"
+    assert client.get("/export/logs", params={"fields": "password"}).status_code == 422
+    assert client.get("/export/logs", params={"since": "yesterday"}).status_code == 422
+
+
+def test_bulk_triage_updates_alerts_and_pushes_one_websocket_delta(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    async_storage = AsyncStorage(storage, max_workers=2)
+    monkeypatch.setattr(api, "storage", storage)
+    monkeypatch.setattr(api, "async_storage", async_storage)
+    monkeypatch.setattr(api, "response_cache", ResponseCache(ttl=60.0))
+    for i in range(50):
+        alert = _cached_alert(f"alert-storm-{i}")
+        alert["source_service"] = "database" if i % 2 else "web-server"
+        storage.insert_alert(alert)
+    client = TestClient(api.app)
+
+    try:
+        with client.websocket_connect("/ws/alerts") as ws:
+            ws.receive_json()
+            acked = client.post("/alerts/acknowledge", json={"alert_ids": [f"alert-storm-{i}" for i in range(10)]})
+            delta = ws.receive_json()
+            suppressed = client.post("/alerts/suppress", json={"filter": {"source_service": ["database"]}})
+            second = ws.receive_json()
+        rejected = client.post("/alerts/suppress", json={})
+    finally:
+        async_storage.close()
+
+    assert acked.json()["updated"] == 10
+    assert delta["type"] == "delta"
+    assert len(delta["items"]) == 10 and delta["summary"]["acknowledged_alerts"] == 10
+    assert suppressed.json()["updated"] == 25
+    assert second["summary"]["suppressed_alerts"] == 25
+    assert rejected.status_code == 422
+
+
+def test_recent_reads_served_from_hot_tier(tmp_path, monkeypatch):
+    storage = Storage(db_path=str(tmp_path / "api-test.db"), hot_tier=HotTier())
+    monkeypatch.setattr(api, "storage", storage)
+    storage.insert_alert({"alert_id": "hot-1", "timestamp": "2026-02-16T12:00:00", "severity": "HIGH"})
+
+    response = api.get_alerts(limit=5)
+    assert json.loads(response.body) == {"items": storage.get_alerts(limit=5)}
+    assert json.loads(api.get_logs(limit=5).body) == {"items": []}
+    assert storage.hot_tier.stats()["misses"] == 0
+
+
+def test_alerts_websocket_v2_streams_status_changes_and_resumes(tmp_path, monkeypatch):
+    storage = _temp_storage(tmp_path)
+    async_storage = AsyncStorage(storage, max_workers=2)
+    monkeypatch.setattr(api, "storage", storage)
+    monkeypatch.setattr(api, "async_storage", async_storage)
+    monkeypatch.setattr(api, "event_hub", None)
+    storage.insert_alert(_cached_alert("alert-v2-1"))
+
+    with TestClient(api.app) as client:
+        with client.websocket_connect("/ws/alerts?v=2") as ws:
+            snapshot = ws.receive_json()
+            storage.insert_alert(_cached_alert("alert-v2-2"))
+            inserted = ws.receive_json()
+            # A status change made by another API process or operator.
+            storage.update_alert_status("alert-v2-1", "ACKNOWLEDGED")
+            changed = ws.receive_json()
+
+        storage.update_alert_status("alert-v2-2", "SUPPRESSED")
+        # The hub keeps polling after the last client leaves, so the change is in its history.
+        client.portal.call(api.event_hub.poll)
+        resume = f"/ws/alerts?v=2&since_seq={changed['seq']}&epoch={changed['epoch']}"
+        with client.websocket_connect(resume) as ws:
+            missed = ws.receive_json()
+        with client.websocket_connect("/ws/alerts?v=2&since_seq=1&epoch=stale") as ws:
+            fresh = ws.receive_json()
+
+    assert snapshot["v"] == 2 and snapshot["type"] == "snapshot"
+    assert [alert["alert_id"] for alert in snapshot["items"]] == ["alert-v2-1"]
+    assert [alert["alert_id"] for alert in inserted["inserted"]] == ["alert-v2-2"]
+    assert inserted["summary_diff"]["total_alerts"] == 2
+    assert "critical_alerts" in inserted["summary_diff"] and "suppressed_alerts" not in inserted["summary_diff"]
+    assert changed["type"] == "events" and changed["inserted"] == []
+    assert [(item["alert_id"], item["status"]) for item in changed["updated"]] == [("alert-v2-1", "ACKNOWLEDGED")]
+    assert changed["summary_diff"] == {"open_alerts": 1, "acknowledged_alerts": 1}
+    assert changed["seq"] == inserted["seq"] + 1
+    # Only what happened while disconnected; the whole summary is never resent.
+    assert missed["type"] == "events" and missed["seq"] > changed["seq"]
+    assert [(item["alert_id"], item["status"]) for item in missed["updated"]] == [("alert-v2-2", "SUPPRESSED")]
+    assert missed["summary_diff"] == {"open_alerts": 0, "suppressed_alerts": 1}
+    assert fresh["type"] == "snapshot"
+
+
+def test_alerts_websocket_v2_msgpack_frames(tmp_path, monkeypatch):
+    msgpack = pytest.importorskip("msgpack")
+    storage = _temp_storage(tmp_path)
+    async_storage = AsyncStorage(storage, max_workers=2)
+    monkeypatch.setattr(api, "storage", storage)
+    monkeypatch.setattr(api, "async_storage", async_storage)
+    monkeypatch.setattr(api, "event_hub", None)
+
+    with TestClient(api.app) as client:
+        with client.websocket_connect("/ws/alerts?v=2&format=msgpack") as ws:
+            snapshot = msgpack.unpackb(ws.receive_bytes())
+
+    assert snapshot["type"] == "snapshot" and snapshot["items"] == []
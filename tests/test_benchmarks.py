@@ -0,0 +1,39 @@
+from benchmarks.common import compare_to_baseline, profile_for, summarize_latencies, synthetic_stream
+
+
+def test_profile_for_applies_requested_anomaly_rate():
+    profile = profile_for(service_count=10, anomaly_rate=0.3)
+
+    assert profile.service_count == 10
+    assert abs(sum(profile.event_weights) - 1.0) < 1e-9
+    assert abs(sum(profile.event_weights[2:]) - 0.3) < 1e-9
+
+
+def test_synthetic_stream_is_seeded():
+    assert synthetic_stream(20, 4, 0.1, seed=1) == synthetic_stream(20, 4, 0.1, seed=1)
+
+
+def test_summarize_latencies_reports_throughput_and_percentiles():
+    stats = summarize_latencies([1_000_000] * 99 + [50_000_000], elapsed_s=0.5)
+
+    assert stats["events"] == 100
+    assert stats["events_per_sec"] == 200.0
+    assert stats["p50_ms"] == 1.0
+    assert stats["p99_ms"] > 1.0
+
+
+def test_compare_to_baseline_flags_only_regressions_beyond_threshold():
+    baseline = {
+        "process/a": {"events_per_sec": 1000.0, "p99_ms": 1.0},
+        "storage/a": {"events_per_sec": 1000.0, "p99_ms": 1.0},
+    }
+    results = {
+        "process/a": {"events_per_sec": 900.0, "p99_ms": 1.1},
+        "storage/a": {"events_per_sec": 500.0, "p99_ms": 3.0},
+        "alert/new": {"events_per_sec": 1.0, "p99_ms": 100.0},
+    }
+
+    regressions = compare_to_baseline(results, baseline, threshold=0.2)
+
+    assert len(regressions) == 2
+    assert all(line.startswith("storage/a") for line in regressions)
@@ -0,0 +1,94 @@
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from src.actions import ActionAutomator
+from src.alerts import AlertEngine
+from src.clock import VirtualClock
+from src.generator import BatchLogGenerator
+from src.main import RateLimitedStream
+from src.processor import LogProcessor
+from src.storage import Storage
+
+START = datetime(2026, 2, 16, 0, 0, 0)
+
+
+def test_virtual_clock_moves_only_when_slept_on():
+    clock = VirtualClock(START)
+    assert clock.now() == START and clock.monotonic() == 0.0
+
+    clock.sleep(90.5)
+    clock.sleep(-3)
+
+    assert clock.now().isoformat() == "2026-02-16T00:01:30.500000"
+    assert clock.time() == START.timestamp() + 90.5
+
+
+def test_rate_limited_stream_fast_forwards_and_stamps_virtual_time():
+    clock = VirtualClock(START)
+    stream = RateLimitedStream(BatchLogGenerator(seed=1, rate=50.0, start=clock.now()), 5000, clock=clock)
+
+    started = time.perf_counter()
+    for _ in range(30_000):  # Ten simulated minutes.
+        entry = next(stream)
+        assert abs((datetime.fromisoformat(entry["timestamp"]) - clock.now()).total_seconds()) < 1e-5
+
+    assert time.perf_counter() - started < 10
+    assert 599 < clock.monotonic() < 600
+
+
+def test_window_rules_and_alert_stamps_follow_the_virtual_clock():
+    clock = VirtualClock(START)
+    processor, engine, automator = LogProcessor(clock=clock), AlertEngine(clock=clock), ActionAutomator(clock=clock)
+
+    def auth_failures(count: int, gap: float):
+        alerts = []
+        for _ in range(count):
+            clock.sleep(gap)
+            entry = {
+                "timestamp": clock.now().isoformat(),
+                "service": "auth-service",
+                "level": "WARNING",
+                "event_type": "auth_failure",
+                "message": "Authentication failed: Invalid credentials",
+                "source_ip": "203.0.113.9",
+                "metrics": {"response_time_ms": 20.0},
+            }
+            alert = processor.process_log(entry)
+            if alert:
+                alerts.append(alert)
+        return alerts
+
+    # Five failures 16 simulated seconds apart never fall within one 60s window...
+    assert auth_failures(5, 16.0) == []
+    clock.sleep(120)
+    # ...five 12 seconds apart do, and the alert is stamped when the last one lands.
+    alerts = auth_failures(5, 12.0)
+    assert len(alerts) == 1 and alerts[0]["timestamp"] == clock.now().isoformat()
+
+    enriched = engine.trigger_alert(alerts[0])
+    before = clock.monotonic()
+    automator.execute_action(enriched)
+    assert enriched["alert_generated_at"] == alerts[0]["timestamp"]
+    assert clock.monotonic() - before == 0.5  # Blocking the IP takes half a simulated second.
+
+
+def test_simulator_fast_forward_mode(tmp_path):
+    db_path = tmp_path / "fast.db"
+    result = subprocess.run(
+        [
+            sys.executable, "-m", "src.main", "--fast-forward", "--start", "2026-02-16T00:00:00",
+            "--duration", "300", "--rate", "2", "--seed", "5", "--db-path", str(db_path),
+            "--no-hot-tier-feed", "--no-internal-metrics",
+        ],
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "Fast-forward: 300s of simulated traffic (until 2026-02-16T00:05:00)" in result.stdout
+    logs = [log for chunk in Storage(db_path=str(db_path)).iter_logs() for log in chunk]
+    assert 590 <= len(logs) <= 610
+    assert logs[0]["timestamp"].startswith("2026-02-16T00:00:00") and logs[-1]["timestamp"] < "2026-02-16T00:05:01"
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.generator import LOAD_PROFILES, BatchLogGenerator
+from src.processor import LogProcessor
+
+
+def test_batch_generator_is_deterministic_for_a_seed():
+    start = datetime(2026, 2, 13, 12, 0, 0)
+    first = BatchLogGenerator(seed=7, start=start).generate_batch(50)
+    second = BatchLogGenerator(seed=7, start=start).generate_batch(50)
+
+    assert first == second
+
+
+def test_batch_generator_records_match_single_log_shape():
+    generator = BatchLogGenerator(seed=1, rate=10.0, start=datetime(2026, 2, 13, 12, 0, 0))
+    records = generator.generate_batch(200)
+
+    assert len(records) == 200
+    assert records[0]["timestamp"] == "2026-02-13T12:00:00.000000"
+    assert records[1]["timestamp"] == "2026-02-13T12:00:00.100000"
+    for record in records:
+        assert set(record) == {
+            "timestamp", "service", "level", "event_type", "message",
+            "metrics", "trace_id", "source_ip",
+        }
+        assert "response_time_ms" in record["metrics"]
+        if record["event_type"] == "cpu_utilization_spike":
+            assert record["metrics"]["cpu_usage"] >= 85.0
+            assert "memory_usage" not in record["metrics"]
+
+    # Timestamps continue across batches.
+    next_batch = generator.generate_batch(1)
+    assert next_batch[0]["timestamp"] == "2026-02-13T12:00:20.000000"
+
+
+def test_brute_force_profile_concentrates_failures_and_triggers_alert():
+    generator = BatchLogGenerator(seed=3, profile="brute-force", rate=50.0)
+    processor = LogProcessor()
+
+    records = generator.generate_batch(100)
+    failure_ips = {r["source_ip"] for r in records if r["event_type"] == "auth_failure"}
+    alerts = [processor.process_log(r) for r in records]
+
+    assert failure_ips <= {"203.0.113.1", "203.0.113.2", "203.0.113.3"}
+    assert any(a and a["alert_type"] == "Potential Brute Force Attack" for a in alerts)
+
+
+def test_many_services_profile_and_unknown_profile():
+    columns = BatchLogGenerator(seed=5, profile="many-services").generate_columns(5000)
+    assert len(set(columns["service"].tolist())) > 500
+    assert set(LOAD_PROFILES) >= {"steady", "diurnal", "incident", "brute-force", "many-services"}
+
+    with pytest.raises(ValueError):
+        BatchLogGenerator(profile="does-not-exist")
+
+
+def test_incident_profile_bursts_errors_then_recovers():
+    generator = BatchLogGenerator(seed=11, profile="incident", rate=10.0)
+    columns = generator.generate_columns(3000)  # five minutes: one burst, then steady traffic
+    errors = np.isin(columns["event_type"], ["connection_timeout", "database_error"])
+    in_burst = columns["offset_s"] < 60.0
+
+    assert errors[in_burst].mean() > 0.3
+    assert errors[~in_burst].mean() < 0.15
@@ -0,0 +1,159 @@
+import json
+import time
+
+from src.hot_tier import HotRing, HotTier
+from src.storage import Storage
+
+
+def _log(i):
+    return {
+        "timestamp": f"2026-02-16T12:{i // 60:02d}:{i % 60:02d}",
+        "service": "web-server",
+        "level": "INFO",
+        "event_type": "normal_operation",
+        "message": f"request {i}",
+        "trace_id": f"trace-{i}",
+        "source_ip": "10.0.1.8",
+        "metrics": {"cpu_usage": 20, "memory_usage": 30.5, "response_time_ms": 120.0},
+    }
+
+
+def _alert(i):
+    return {
+        "alert_id": f"alert-{i}",
+        "timestamp": f"2026-02-16T12:{i // 60:02d}:{i % 60:02d}",
+        "alert_generated_at": f"2026-02-16T12:{i // 60:02d}:{i % 60:02d}",
+        "alert_type": "High Error Rate",
+        "severity": "CRITICAL",
+        "description": "Error rate exceeded",
+        "source_service": "web-server",
+        "source_trace_id": f"trace-{i}",
+        "details": {"error_rate": 0.5},
+    }
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_hot_ring_keeps_newest_rows_in_id_order():
+    ring = HotRing(capacity=3)
+    for row_id in (1, 2, 4, 3, 5):
+        ring.put(row_id, str(row_id).encode())
+    ring.put(1, b"too old")
+
+    assert ring.newest(10) == [b"5", b"4", b"3"]
+    assert ring.after(3, 10) == [b"4", b"5"]
+    ring.replace(2, b"evicted")
+    assert 2 not in ring
+
+
+def test_hot_tier_reads_match_sqlite(tmp_path):
+    db_path = str(tmp_path / "hot.db")
+    hot = Storage(db_path=db_path, hot_tier=HotTier(log_capacity=20, alert_capacity=10))
+    for i in range(15):
+        hot.insert_log(_log(i))
+        hot.insert_alert(_alert(i))
+    hot.update_alert_status("alert-12", "ACKNOWLEDGED")
+    hot.bulk_update_alert_status("SUPPRESSED", alert_ids=["alert-13", "alert-14"])
+    cold = Storage(db_path=db_path)
+
+    # Primed on first read, then kept current by this instance's own writes.
+    assert hot.get_logs(limit=10) == cold.get_logs(limit=10)
+    assert hot.get_alerts(limit=10) == cold.get_alerts(limit=10)
+    assert hot.get_alerts_since_id(after_id=7) == cold.get_alerts_since_id(after_id=7)
+    assert hot.get_latest_alert_row_id() == cold.get_latest_alert_row_id() == 15
+    assert json.loads(hot.recent_json("alert", 5)) == cold.get_alerts(limit=5)
+    stats = hot.hot_tier.stats()
+    assert stats["primes"] == 1 and stats["misses"] == 0
+
+    # Older than the ring holds: falls through to SQLite.
+    assert hot.get_alerts(limit=15) == cold.get_alerts(limit=15)
+    assert hot.get_alerts_since_id(after_id=2) == cold.get_alerts_since_id(after_id=2)
+    assert hot.hot_tier.stats()["misses"] == 2
+
+
+def test_feed_keeps_reader_current(tmp_path):
+    db_path = str(tmp_path / "feed.db")
+    reader = Storage(db_path=db_path, hot_tier=HotTier(), feed=True)
+    writer = Storage(db_path=db_path, feed=True)
+    try:
+        assert reader.get_alerts(limit=10) == []
+        writer.insert_alert(_alert(1))
+        # A new sender's first message re-primes the reader.
+        assert _wait_for(lambda: reader.get_latest_alert_row_id() == 1 and reader.hot_tier.primes == 2)
+        primes = reader.hot_tier.primes
+
+        writer.insert_alert(_alert(2))
+        writer.insert_log(_log(2))
+        writer.update_alert_status("alert-1", "ACKNOWLEDGED")
+        assert _wait_for(lambda: reader.get_alerts(limit=10)[-1]["status"] == "ACKNOWLEDGED")
+        assert _wait_for(lambda: len(reader.get_logs(limit=10)) == 1)
+        assert reader.get_alerts(limit=10) == writer.get_alerts(limit=10)
+        assert reader.hot_tier.primes == primes
+        assert reader.feed.gaps == 1
+    finally:
+        writer.close()
+        reader.close()
+    assert reader.hot_tier is None
+    assert list((tmp_path / "hot-tier").glob("*.sock")) == []
+
+
+def test_reads_catch_up_on_rows_from_writers_that_dont_publish(tmp_path):
+    db_path = str(tmp_path / "silent.db")
+    reader = Storage(db_path=db_path, hot_tier=HotTier(log_capacity=20, alert_capacity=10, catch_up_interval=0))
+    writer = Storage(db_path=db_path)
+    assert reader.get_alerts(limit=10) == []
+    assert reader.get_logs(limit=10) == []
+
+    for i in range(3):
+        writer.insert_alert(_alert(i))
+        writer.insert_log(_log(i))
+
+    assert reader.get_alerts(limit=10) == writer.get_alerts(limit=10)
+    assert json.loads(reader.recent_json("log", 10)) == writer.get_logs(limit=10)
+    assert reader.get_latest_alert_row_id() == 3
+    stats = reader.hot_tier.stats()
+    assert stats["primes"] == 1 and stats["catch_ups"] == 2 and stats["misses"] == 0
+
+    # More unpublished rows than the ring holds: it keeps only the newest.
+    for i in range(3, 40):
+        writer.insert_log(_log(i))
+    assert reader.get_logs(limit=20) == writer.get_logs(limit=20)
+    assert reader.get_logs(limit=25) == writer.get_logs(limit=25)
+    assert reader.hot_tier.stats()["misses"] == 1
+
+
+def test_catch_up_runs_at_most_once_per_interval(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "silent.db")
+    reader = Storage(db_path=db_path, hot_tier=HotTier(catch_up_interval=5.0))
+    writer = Storage(db_path=db_path)
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    reader.get_alerts(limit=10)  # Primes the tier.
+
+    writer.insert_alert(_alert(0))
+    assert len(reader.get_alerts(limit=10)) == 1
+    writer.insert_alert(_alert(1))
+    assert len(reader.get_alerts(limit=10)) == 1  # Within the interval: served from memory alone.
+
+    now[0] += 5.0
+    assert len(reader.get_alerts(limit=10)) == 2
+    assert reader.hot_tier.stats()["catch_ups"] == 2
+
+
+def test_hot_and_sqlite_paths_order_logs_the_same(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "order.db"), hot_tier=HotTier(log_capacity=5))
+    for i in (3, 1, 4, 0, 2, 5):  # Timestamps out of insertion order.
+        storage.insert_log(_log(i))
+
+    hot = storage.get_logs(limit=5)
+    cold = storage.get_logs(limit=6)
+    assert storage.hot_tier.stats()["misses"] == 1
+    assert [log["trace_id"] for log in cold] == ["trace-5", "trace-2", "trace-0", "trace-4", "trace-1", "trace-3"]
+    assert hot == cold[:5]
@@ -0,0 +1,123 @@
+import sqlite3
+
+import pytest
+
+from src.log_schema import logs_layout, main, render_message, split_message
+from src.storage import Storage
+
+LEGACY_LOGS = """
+    CREATE TABLE logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        service TEXT NOT NULL,
+        level TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        message TEXT NOT NULL,
+        trace_id TEXT,
+        source_ip TEXT,
+        cpu_usage REAL,
+        memory_usage REAL,
+        response_time_ms REAL,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def _log(second: int, event_type: str, message: str, service: str = "web-server"):
+    return {
+        "timestamp": f"2026-02-16T12:00:{second:02d}",
+        "service": service,
+        "level": "ERROR" if event_type == "connection_timeout" else "INFO",
+        "event_type": event_type,
+        "message": message,
+        "trace_id": f"trace-{second}",
+        "source_ip": "10.0.1.7",
+        "metrics": {"cpu_usage": 20.0, "response_time_ms": 15.5},
+    }
+
+
+LOGS = [
+    _log(1, "normal_operation", "Processed request successfully"),
+    _log(2, "connection_timeout", "Upstream service request timed out after 5000ms", service="database"),
+    _log(3, "connection_timeout", "Upstream service request timed out after 7500ms"),
+    _log(4, "normal_operation", "Retry {} of 3 for 10.0.1.7"),
+]
+
+
+def test_messages_split_into_templates_and_round_trip():
+    assert split_message("Upstream service request timed out after 5000ms") == (
+        "Upstream service request timed out after {}ms",
+        '["5000"]',
+    )
+    assert split_message("Client 10.0.1.7 sent 007 requests") == ("Client {} sent {} requests", '["10.0.1.7","007"]')
+    assert split_message("Processed request successfully") == ("Processed request successfully", None)
+    for message in ("Retry {} of 3", "Client 10.0.1.7 sent 007 requests", "42", "after 5000ms"):
+        assert render_message(*split_message(message)) == message
+
+
+def test_new_databases_store_logs_dictionary_encoded(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "compact.db"))
+    for entry in LOGS:
+        storage.insert_log(dict(entry))
+
+    assert storage.compact_logs
+    assert [log["message"] for log in storage.get_logs()] == [entry["message"] for entry in reversed(LOGS)]
+    assert [log["service"] for log in next(storage.iter_logs())] == ["web-server", "database", "web-server", "web-server"]
+    assert storage.get_trace("trace-3")[0]["message"] == "Upstream service request timed out after 7500ms"
+    with storage._conn() as conn:
+        assert logs_layout(conn) == "view"
+        assert conn.execute("SELECT COUNT(*) FROM log_templates").fetchone()[0] == 3
+        assert conn.execute("SELECT COUNT(*) FROM log_services").fetchone()[0] == 2
+        row = conn.execute("SELECT service_id, message_params FROM log_rows WHERE id = 2").fetchone()
+    assert isinstance(row["service_id"], int) and row["message_params"] == '["5000"]'
+    assert [row["service"] for row in next(storage.iter_rows("logs", filters={"service": ["database"]}))] == ["database"]
+
+    # A second instance (e.g. the API next to the simulator) resolves the same ids.
+    Storage(db_path=str(tmp_path / "compact.db")).insert_log(_log(5, "normal_operation", "Retry 2 of 3"))
+    assert storage.get_logs(limit=1)[0]["message"] == "Retry 2 of 3"
+
+
+def test_insert_logs_is_one_transaction_even_when_it_adds_dictionary_entries(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "batch.db"))
+    broken = _log(3, "connection_timeout", "Upstream service request timed out after 5000ms", service="database")
+    broken["timestamp"] = None  # Violates NOT NULL after the earlier rows went in.
+
+    with pytest.raises(sqlite3.IntegrityError):
+        storage.insert_logs([LOGS[0], LOGS[1], broken])
+    assert storage.get_logs() == []
+
+    storage.insert_logs(LOGS)
+    assert [log["message"] for log in storage.get_logs()] == [entry["message"] for entry in reversed(LOGS)]
+
+
+def test_legacy_logs_table_keeps_working_and_converts_in_place(tmp_path, capsys):
+    db_path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute(LEGACY_LOGS)
+    conn.commit()
+    conn.close()
+
+    legacy = Storage(db_path=str(db_path))
+    assert not legacy.compact_logs
+    for entry in LOGS:
+        legacy.insert_log(dict(entry))
+    with legacy._conn() as conn:
+        conn.execute("DELETE FROM logs WHERE id = 4")
+        conn.commit()
+    before = (legacy.get_logs(), legacy.get_trace("trace-2"), [dict(row) for row in next(legacy.iter_rows("logs"))])
+
+    assert main(["--db-path", str(db_path), "--vacuum"]) == 0
+    assert "Converted 3 logs" in capsys.readouterr().out
+
+    storage = Storage(db_path=str(db_path))
+    assert storage.compact_logs
+    assert (storage.get_logs(), storage.get_trace("trace-2"), [dict(row) for row in next(storage.iter_rows("logs"))]) == before
+    storage.insert_log(_log(6, "normal_operation", "Processed request successfully"))
+    with storage._conn() as conn:
+        # Row ids carry on past the deleted row, and the indexes moved to log_rows.
+        assert [row[0] for row in conn.execute("SELECT id FROM logs ORDER BY id")] == [1, 2, 3, 5]
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE tbl_name = 'log_rows'")}
+    assert {"idx_logs_trace_id", "idx_logs_timestamp"} <= indexes
+
+    assert main(["--db-path", str(db_path)]) == 0
+    assert "already uses" in capsys.readouterr().out
@@ -0,0 +1,164 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from src import telemetry
+from src.clock import VirtualClock
+from src.generator import BatchLogGenerator
+from src.main import RateLimitedStream
+from src.overload import HIGH, LOW, MEDIUM, OverloadController, priority
+from src.processor import LogProcessor
+from src.storage import Storage
+
+START = datetime(2026, 2, 16, 12, 0, 0)
+
+
+def _log(second: float, event_type: str = "normal_operation", level: str = "INFO", service: str = "web-server"):
+    return {
+        "timestamp": (START + timedelta(seconds=second)).isoformat(),
+        "service": service,
+        "level": level,
+        "event_type": event_type,
+        "message": event_type,
+        "trace_id": f"trace-{second}",
+        "metrics": {"cpu_usage": 25.0, "memory_usage": 35.0, "response_time_ms": 120.0},
+    }
+
+
+def test_priorities_follow_level_and_event_type():
+    assert priority(_log(0, "auth_failure", "WARNING")) == HIGH
+    assert priority(_log(0, "cpu_utilization_spike", "WARNING")) == HIGH
+    assert priority(_log(0, "normal_operation", "ERROR")) == HIGH
+    assert priority(_log(0, "auth_success")) == MEDIUM
+    assert priority(_log(0, "normal_operation", "WARNING")) == MEDIUM
+    assert priority(_log(0)) == LOW
+
+
+def test_high_priority_jumps_the_queue_without_shedding_when_on_time():
+    clock = VirtualClock(START)
+    controller = OverloadController(clock=clock)
+    for entry in (_log(0), _log(0, "auth_success"), _log(0, "database_error", "ERROR")):
+        controller.offer(entry)
+
+    assert [controller.pop()["event_type"] for _ in range(3)] == ["database_error", "auth_success", "normal_operation"]
+    assert controller.pop() is None and not controller.degraded
+    assert controller.stats()["low"] == {"processed": 1, "degraded": 0, "shed": 0, "aggregated": 0, "max_lag": 0.0}
+
+
+def test_aggregate_merges_stale_routine_events_and_keeps_error_rate_counts():
+    clock = VirtualClock(START)
+    controller = OverloadController(policy="aggregate", lag_threshold=2.0, clock=clock)
+    routine = [_log(i / 100, service=f"svc-{i % 2}") for i in range(100)]
+    errors = [_log(0.5, "database_error", "ERROR") for _ in range(5)]
+    for entry in routine + errors:
+        controller.offer(entry)
+    clock.sleep(3.0)
+
+    processor = LogProcessor()
+    popped = []
+    while (entry := controller.pop()) is not None:
+        assert controller.degraded  # Everything is 2s+ late, so none of it is scored.
+        popped.append(entry)
+        processor.process_log(entry, score_anomalies=not controller.degraded)
+
+    merged = [entry for entry in popped if entry["event_type"] == "normal_operation"]
+    assert sorted((entry["service"], entry["sample_weight"]) for entry in merged) == [("svc-0", 50), ("svc-1", 50)]
+    assert [entry["timestamp"] for entry in merged] == [routine[-2]["timestamp"], routine[-1]["timestamp"]]
+    assert len(processor.total_window) == 105 and len(processor.error_window) == 5
+    assert len(processor.service_detectors) == 0
+    assert "sample_weight" not in routine[-1]
+
+    stats = controller.stats()
+    assert stats["low"]["aggregated"] == 98 and stats["low"]["degraded"] == 2
+    assert stats["high"]["degraded"] == 5 and stats["high"]["shed"] == 0
+    assert stats["high"]["max_lag"] == pytest.approx(2.5)
+
+
+def test_aggregated_entries_keep_their_priority():
+    clock = VirtualClock(START)
+    controller = OverloadController(policy="aggregate", lag_threshold=1.0, clock=clock)
+    for second in range(4):
+        controller.offer(_log(second / 10, service=f"svc-{second}"))
+    clock.sleep(2.0)
+    first = controller.pop()  # Sheds the stale routine logs into one entry per service.
+    for second in range(3):
+        controller.offer(_log(2.0, "auth_failure", "WARNING"))
+        controller.offer(_log(2.0, "auth_success"))
+
+    rest = []
+    while (entry := controller.pop()) is not None:
+        rest.append(entry)
+
+    assert first["event_type"] == "normal_operation" and first["sample_weight"] == 1
+    assert [entry["event_type"] for entry in rest] == ["auth_failure"] * 3 + ["auth_success"] * 3 + ["normal_operation"] * 3
+    assert controller.pending == 0
+
+
+def test_aggregated_entries_carry_every_response_time_in_their_minute():
+    clock = VirtualClock(START + timedelta(seconds=50))
+    controller = OverloadController(policy="aggregate", lag_threshold=2.0, clock=clock)
+    for second in range(20):
+        entry = _log(50 + second)  # Ten events in 12:00 and ten in 12:01.
+        entry["metrics"]["response_time_ms"] = 10.0 * (second + 1)
+        controller.offer(entry)
+    clock.sleep(30.0)
+
+    processor = LogProcessor()
+    popped = []
+    while (entry := controller.pop()) is not None:
+        popped.append(entry)
+        processor.process_log(entry, score_anomalies=False)
+
+    assert [entry["sample_weight"] for entry in popped] == [10, 10]
+    minutes = processor.latency_sketches["web-server"]
+    first, second = (minutes[START + timedelta(minutes=m)] for m in (0, 1))
+    assert (first.count, second.count) == (10, 10)
+    # Not the newest event's 100 ms or 200 ms counted ten times over.
+    assert first.quantile(0.5) == pytest.approx(55.0, rel=0.1)
+    assert second.quantile(0.5) == pytest.approx(155.0, rel=0.1)
+    assert sum(sketch.count for _, _, sketch in processor.drain_latency_sketches()) == 20
+
+
+def test_shed_drops_stale_low_and_medium_events_but_never_high(monkeypatch):
+    monkeypatch.setattr(telemetry, "_enabled", True)
+    clock = VirtualClock(START)
+    controller = OverloadController(policy="shed", lag_threshold=1.0, medium_lag_factor=4.0, clock=clock)
+    for second in range(10):
+        controller.offer(_log(second))
+        controller.offer(_log(second, "auth_success"))
+        controller.offer(_log(second, "auth_failure", "WARNING"))
+    clock.sleep(10.0)
+
+    popped = []
+    while (entry := controller.pop()) is not None:
+        popped.append(entry)
+
+    # Medium events newer than 4s and low events newer than 1s survive.
+    assert [entry["event_type"] for entry in popped] == ["auth_failure"] * 10 + ["auth_success"] * 4 + ["normal_operation"]
+    stats = controller.stats()
+    assert (stats["low"]["shed"], stats["medium"]["shed"], stats["high"]["shed"]) == (9, 6, 0)
+    assert stats["high"]["degraded"] == 9 and stats["high"]["processed"] == 1
+    rendered = telemetry.REGISTRY.render()
+    assert 'observability_overload_events_total{outcome="shed",priority="low"}' in rendered
+    assert "observability_overload_lag_seconds_bucket" in rendered
+
+    with pytest.raises(ValueError):
+        OverloadController(policy="drop-everything")
+
+
+def test_stream_hands_over_everything_due_in_one_batch(tmp_path):
+    clock = VirtualClock(START)
+    stream = RateLimitedStream(BatchLogGenerator(seed=1, rate=100.0, start=clock.now()), 50, clock=clock)
+
+    assert len(stream.due()) == 1
+    assert stream.due(wait=False) == []
+    clock.sleep(0.255)  # Pipeline busy for a quarter second: 25 more events came due.
+    arrived = stream.due(wait=False)
+    assert len(arrived) == 25 and stream.waited == 0.0
+    assert arrived[-1]["timestamp"] == (START + timedelta(seconds=0.25)).isoformat(timespec="microseconds")
+
+    storage = Storage(db_path=str(tmp_path / "batch.db"))
+    storage.insert_logs(arrived)
+    storage.insert_logs([])
+    stored = [log for chunk in storage.iter_logs() for log in chunk]
+    assert [log["trace_id"] for log in stored] == [entry["trace_id"] for entry in arrived]
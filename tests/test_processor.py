@@ -1,6 +1,9 @@
 from datetime import datetime, timedelta
+import random
+import subprocess
+import sys
 
-from src.processor import LogProcessor
+from src.processor import DetectorPool, LogProcessor, MLAnomalyDetector
 
 
 def _log(ts: datetime, event_type: str, service: str = "web-server"):
@@ -67,6 +70,22 @@ def test_error_rate_alert_uses_sliding_window_not_consecutive_errors():
     assert any(a["alert_type"] == "High Error Rate" for a in alerts)
 
 
+def test_sliding_windows_follow_event_time_when_events_arrive_late():
+    processor = LogProcessor()
+    base = datetime(2026, 2, 13, 12, 0, 0)
+    at = lambda seconds: base + timedelta(seconds=seconds)  # noqa: E731
+
+    processor.process_log(_log(at(100), "database_error"))
+    processor.process_log(_log(at(30), "database_error"))  # Older than the newest event's 60s window.
+    processor.process_log(_log(at(90), "normal_operation"))  # Late, but within it.
+    processor.process_log(_log(at(101), "normal_operation"))
+    assert list(processor.total_window) == [at(90), at(100), at(101)]
+    assert list(processor.error_window) == [at(100)]
+
+    processor.process_log(_log(at(155), "normal_operation"))
+    assert list(processor.total_window) == [at(100), at(101), at(155)]
+
+
 def test_error_rate_alert_does_not_fire_before_minimum_samples():
     processor = LogProcessor()
     base = datetime(2026, 2, 13, 12, 0, 0)
@@ -86,3 +105,165 @@ def test_error_rate_alert_does_not_fire_before_minimum_samples():
             alerts.append(maybe_alert)
 
     assert not any(a["alert_type"] == "High Error Rate" for a in alerts)
+
+
+def test_importing_processor_and_api_defers_heavy_dependencies():
+    script = (
+        "import sys, src.api, src.processor, src.main; "
+        "heavy = [m for m in ('sklearn', 'scipy', 'numpy') if m in sys.modules]; "
+        "assert not heavy, heavy; "
+        "assert src.api.storage is None"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def _latency_log(ts: datetime, response_time_ms: float, service: str = "web-server"):
+    return {
+        "timestamp": ts.isoformat(),
+        "service": service,
+        "event_type": "normal_operation",
+        "metrics": {"response_time_ms": response_time_ms},
+        "trace_id": "trace-1",
+    }
+
+
+def test_latency_slo_burn_rate_alert_fires_once_per_burn():
+    processor = LogProcessor()
+    base = datetime(2026, 2, 13, 12, 0, 0)
+
+    alerts = []
+    for second in range(0, 8 * 60, 2):
+        # 20% of requests breach the 1000ms threshold: burn rate 20x a 99% SLO.
+        slow = (second // 2) % 5 == 0
+        alert = processor.process_log(_latency_log(base + timedelta(seconds=second), 5000.0 if slow else 50.0))
+        if alert:
+            alerts.append(alert)
+
+    slo_alerts = [a for a in alerts if a["alert_type"] == "Latency SLO Burn Rate"]
+    assert len(slo_alerts) == 1
+    assert slo_alerts[0]["severity"] == "CRITICAL"
+    assert slo_alerts[0]["source_service"] == "web-server"
+
+
+def test_latency_slo_stays_quiet_within_budget_and_drains_sketches():
+    processor = LogProcessor()
+    base = datetime(2026, 2, 13, 12, 0, 0)
+
+    for second in range(0, 8 * 60, 2):
+        alert = processor.process_log(_latency_log(base + timedelta(seconds=second), 50.0))
+        assert alert is None
+
+    drained = processor.drain_latency_sketches()
+    assert len(drained) == 8
+    assert sum(sketch.count for _, _, sketch in drained) == 240
+    assert processor.drain_latency_sketches() == []
+
+
+def test_brute_force_alert_reports_top_offenders_and_distinct_ips():
+    processor = LogProcessor()
+    base = datetime(2026, 2, 13, 12, 0, 0)
+    ips = ["203.0.113.9", "203.0.113.9", "203.0.113.7", "203.0.113.9", "203.0.113.5"]
+
+    alert = None
+    for i, ip in enumerate(ips):
+        entry = _log(base + timedelta(seconds=i), "auth_failure")
+        entry["source_ip"] = ip
+        alert = processor.process_log(entry)
+
+    assert alert["offending_ip"] == "203.0.113.9"
+    assert alert["details"]["distinct_ips"] == 3
+    assert alert["details"]["top_offenders"][0] == {"ip": "203.0.113.9", "count": 3, "error": 0}
+
+    windows = processor.drain_security_windows()
+    assert len(windows) == 1
+    assert windows[0]["window_start"] == "2026-02-13T12:00:00"
+    assert windows[0]["auth_failures"] == 5
+    assert processor.drain_security_windows() == []
+
+
+def test_late_auth_failure_for_a_swept_window_is_still_drained():
+    processor = LogProcessor()
+    base = datetime(2026, 2, 13, 12, 0, 0)
+    for minute in range(3):
+        processor.process_log(_log(base + timedelta(minutes=minute), "auth_failure"))
+    assert datetime(2026, 2, 13, 12, 0, 0) not in processor.security_windows
+    processor.drain_security_windows()
+
+    # Arrives after its window was swept (e.g. delayed behind newer events).
+    processor.process_log(_log(base + timedelta(seconds=30), "auth_failure"))
+
+    windows = processor.drain_security_windows()
+    assert [(w["window_start"], w["auth_failures"]) for w in windows] == [("2026-02-13T12:00:00", 1)]
+    assert sorted(processor.security_windows) == [base + timedelta(minutes=1), base + timedelta(minutes=2)]
+
+
+def test_detector_replay_matches_per_sample_checks():
+    rng = random.Random(7)
+    samples = [(rng.uniform(10, 40), rng.uniform(20, 50)) for _ in range(110)]
+    samples[75] = (99.0, 98.0)
+    samples[95] = (97.0, 5.0)
+
+    sequential = MLAnomalyDetector()
+    expected = [sequential.track_and_check(cpu, mem) for cpu, mem in samples]
+    batched = MLAnomalyDetector()
+    replayed = batched.replay(samples[:60]) + batched.replay(samples[60:])
+
+    assert replayed == expected
+    assert expected[75] is not None
+    assert batched.sample_count == sequential.sample_count
+
+
+def _fitted_detector(seed: int) -> MLAnomalyDetector:
+    rng = random.Random(seed)
+    detector = MLAnomalyDetector()
+    for _ in range(50):
+        detector.track_and_check(rng.uniform(10, 40), rng.uniform(20, 50))
+    return detector
+
+
+def test_detector_pool_evicts_least_recently_used_within_budget():
+    pool = DetectorPool(max_bytes=5_000)
+    for service in ("a", "b", "c"):
+        assert pool.get(service) is None
+        pool[service] = MLAnomalyDetector()
+    assert pool.get("a") is not None  # "b" is now least recently used
+
+    for _ in range(20):
+        pool.get("c").data_buffer.append([20.0, 30.0])
+    pool.get("c")
+
+    assert "b" not in pool
+    assert "a" in pool and "c" in pool
+    assert pool.resident_bytes <= 5_000
+    assert pool.stats()["evictions"] == 1
+    assert pool.stats()["misses"] == 3
+
+
+def test_detector_pool_spills_evicted_models_and_reloads_them(tmp_path):
+    pool = DetectorPool(max_bytes=1, spill_dir=str(tmp_path))
+    pool["web-server"] = _fitted_detector(1)
+    pool["pod-7f9c"] = _fitted_detector(2)
+
+    assert len(pool) == 1
+    assert "web-server" in pool
+    assert len(list(tmp_path.iterdir())) == 1
+
+    reloaded = pool.get("web-server")
+
+    assert reloaded.is_fitted and reloaded.sample_count == 50
+    assert reloaded.track_and_check(25.0, 35.0) is None
+    assert pool.stats()["reloads"] == 1
+    assert "pod-7f9c" in pool and len(pool) == 1
+
+
+def test_processor_detector_memory_stays_within_budget_for_many_services():
+    processor = LogProcessor()
+    processor.service_detectors = DetectorPool(max_bytes=50_000)
+    ts = datetime(2026, 2, 13, 12, 0, 0)
+    for i in range(300):
+        processor.process_log(_log(ts + timedelta(seconds=i), "normal_operation", service=f"pod-{i}"))
+
+    stats = processor.service_detectors.stats()
+    assert stats["resident_bytes"] <= 50_000
+    assert stats["evictions"] == 300 - stats["resident"]
+    assert stats["misses"] == 300
@@ -0,0 +1,62 @@
+import json
+import threading
+import time
+
+from src.profiling import NullStageTimer, SamplingProfiler, StageTimer, TraceRingBuffer, render_traces
+
+
+def test_stage_timer_excludes_idle_time():
+    timer = StageTimer()
+    time.sleep(0.02)
+    timer.lap("generate", idle_seconds=0.02)
+    timer.lap("persist")
+
+    assert set(timer.stages) == {"generate", "persist"}
+    assert timer.stages["generate"] < 15.0
+    assert timer.total_ms < 15.0
+    NullStageTimer().lap("generate")
+
+
+def test_trace_ring_buffer_is_bounded_and_sorts_slowest():
+    buffer = TraceRingBuffer(capacity=3)
+    for i in range(5):
+        timer = StageTimer()
+        timer.stages["detect"] = float(i)
+        timer._last = timer.started + i / 1000.0
+        buffer.record(timer, trace_id=f"trace-{i}")
+
+    recent = buffer.snapshot()
+    slowest = buffer.snapshot(limit=1, slowest=True)
+
+    assert [item["trace_id"] for item in recent] == ["trace-4", "trace-3", "trace-2"]
+    assert slowest[0]["trace_id"] == "trace-4"
+    assert buffer.snapshot(min_total_ms=3.5)[0]["trace_id"] == "trace-4"
+
+
+def test_render_traces_returns_json():
+    content_type, body = render_traces({"limit": "5"})
+    assert content_type == "application/json"
+    assert "items" in json.loads(body)
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    output = tmp_path / "profile.collapsed"
+    stop = threading.Event()
+
+    def busy_worker():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=busy_worker, name="busy-worker")
+    worker.start()
+    profiler = SamplingProfiler(str(output), interval=0.001).start()
+    time.sleep(0.1)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    lines = output.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert any(line.startswith("busy-worker;") and "busy_worker" in line for line in lines)
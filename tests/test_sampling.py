@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta
+
+from src.clock import VirtualClock
+from src.processor import LogProcessor
+from src.sampling import IngestSampler
+from src.storage import Storage
+
+
+def _log(ts: datetime, event_type: str = "normal_operation", level: str = "INFO", trace_id: str = "trace-1"):
+    return {
+        "timestamp": ts.isoformat(),
+        "service": "web-server",
+        "level": level,
+        "event_type": event_type,
+        "message": event_type,
+        "trace_id": trace_id,
+        "metrics": {"cpu_usage": 25.0, "memory_usage": 35.0, "response_time_ms": 120.0},
+    }
+
+
+def test_sampler_adapts_to_load_and_keeps_every_important_event():
+    clock = VirtualClock()
+    sampler = IngestSampler(target_rate=100, max_weight=50, clock=clock)
+    ts = datetime(2026, 2, 16, 12, 0, 0)
+
+    kept = []
+    for i in range(10_000):
+        clock.elapsed = i / 1000  # 1,000 events/s, 10 times the target.
+        entry = _log(ts + timedelta(milliseconds=i), trace_id=f"trace-{i}")
+        if i % 10 == 0:
+            entry.update(level="ERROR", event_type="database_error")
+        elif i % 10 == 1:
+            entry.update(event_type="auth_failure")
+        row = sampler.sample(entry)
+        if row is not None:
+            kept.append(row)
+
+    important = [entry for entry in kept if not IngestSampler.is_routine(entry)]
+    routine = [entry for entry in kept if IngestSampler.is_routine(entry)]
+    assert len(important) == 2000
+    assert all("sample_weight" not in entry for entry in important)
+    assert sampler.weight == 8  # 800 routine events/s against a target of 100.
+    assert 0.8 < sum(entry.get("sample_weight", 1) for entry in routine) / 8000 < 1.2
+
+    volume = sampler.drain_volume()
+    assert sum(count for *_, count in volume) == 10_000
+    assert sampler.drain_volume() == []
+
+
+def test_sampled_weight_reaches_storage_but_not_the_processor():
+    # 5,000 events at 10% errors, sampled against a target far below the routine rate.
+    clock = VirtualClock()
+    sampler = IngestSampler(target_rate=100, max_weight=50, clock=clock)
+    processor = LogProcessor()
+    processor.ml_enabled = False
+    ts = datetime(2026, 2, 16, 12, 0, 0)
+
+    stored = []
+    for i in range(5000):
+        clock.elapsed = i / 1000
+        entry = _log(ts + timedelta(milliseconds=i), trace_id=f"trace-{i}")
+        if i % 10 == 0:
+            entry.update(level="ERROR", event_type="database_error")
+        row = sampler.sample(entry)
+        if row is not None:
+            stored.append(row)
+        processor.process_log(entry)
+        assert "sample_weight" not in entry
+
+    assert len(processor.total_window) == 5000
+    assert len(processor.error_window) == 500
+    assert any(row.get("sample_weight", 1) > 1 for row in stored)
+
+
+def test_sampler_without_target_stores_everything_and_still_counts():
+    sampler = IngestSampler()
+    entries = [_log(datetime(2026, 2, 16, 12, 0, second)) for second in range(30)]
+
+    assert all(sampler.sample(entry) for entry in entries)
+    assert all("sample_weight" not in entry for entry in entries)
+    assert sampler.drain_volume() == [("2026-02-16T12:00:00", "web-server", "INFO", "normal_operation", 30)]
+
+
+def test_log_volume_rollup_and_weighted_rows(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "sampling.db"))
+    storage.merge_log_volume([("2026-02-16T12:00:00", "web-server", "INFO", "normal_operation", 40)])
+    storage.merge_log_volume(
+        [
+            ("2026-02-16T12:00:00", "web-server", "INFO", "normal_operation", 10),
+            ("2026-02-16T12:01:00", "database", "ERROR", "database_error", 3),
+        ]
+    )
+    entry = _log(datetime(2026, 2, 16, 12, 0, 0))
+    entry["sample_weight"] = 5
+    storage.insert_log(entry)
+
+    volume = storage.get_log_volume(since="2026-02-16T12:00:00")
+    assert volume["total"] == 53
+    assert volume["by_level"] == {"INFO": 50, "ERROR": 3}
+    assert volume["series"] == [
+        {"timestamp": "2026-02-16T12:00:00", "count": 50},
+        {"timestamp": "2026-02-16T12:01:00", "count": 3},
+    ]
+    assert storage.get_log_volume(since="2026-02-16T12:00:00", service="database")["total"] == 3
+    assert storage.get_logs(limit=1)[0]["sample_weight"] == 5
+    assert next(storage.iter_logs())[0]["sample_weight"] == 5
+
+
+def test_processor_counts_sampled_rows_by_weight():
+    # 6 errors among 54 routine events stored 1-in-9: a 10% error rate, not 50%.
+    processor = LogProcessor()
+    ts = datetime(2026, 2, 16, 12, 0, 0)
+    alerts = []
+    for i in range(6):
+        routine = _log(ts + timedelta(seconds=i))
+        routine["sample_weight"] = 9
+        alerts.append(processor.process_log(routine))
+        alerts.append(processor.process_log(_log(ts + timedelta(seconds=i), "database_error", "ERROR")))
+
+    assert len(processor.total_window) == 60
+    assert not any(alert and alert["alert_type"] == "High Error Rate" for alert in alerts)
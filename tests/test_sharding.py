@@ -0,0 +1,158 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import src.api as api
+from src.sharding import ShardedStorage, ShardPosition, shard_index
+from src.sketches import HyperLogLog, SpaceSaving
+from src.storage import AsyncStorage
+
+# Two services per shard of a 2-shard store (crc32 routing).
+SERVICES = ["web-server", "auth-service", "database", "analytics-engine"]
+
+
+def _alert(alert_id: str, service: str, second: int):
+    return {
+        "alert_id": alert_id,
+        "timestamp": f"2026-02-16T12:00:{second:02d}",
+        "alert_type": "High Error Rate",
+        "severity": "CRITICAL" if second % 2 else "ERROR",
+        "description": alert_id,
+        "source_service": service,
+        "source_trace_id": f"trace-{second % 3}",
+    }
+
+
+def _log(service: str, second: int):
+    return {
+        "timestamp": f"2026-02-16T12:00:{second:02d}",
+        "service": service,
+        "level": "ERROR",
+        "event_type": "database_error",
+        "message": "Connection to primary database failed",
+        "trace_id": f"trace-{second % 3}",
+        "metrics": {"response_time_ms": 10.0 + second},
+    }
+
+
+@pytest.fixture
+def sharded(tmp_path):
+    storage = ShardedStorage(str(tmp_path / "observability.db"), shards=2)
+    yield storage
+    storage.close()
+
+
+def test_writes_route_by_service_and_reads_merge_by_id(sharded):
+    assert {shard_index(service, 2) for service in SERVICES} == {0, 1}
+    for second, service in enumerate(SERVICES * 3):
+        sharded.insert_log(_log(service, second))
+        sharded.insert_alert(_alert(f"alert-{second}", service, second))
+
+    for index, shard in enumerate(sharded.shards):
+        services = {log["service"] for log in shard.get_logs(limit=100)}
+        assert services and all(shard_index(service, 2) == index for service in services)
+    assert (sharded.db_path.parent / "observability.shard1" / "observability.db").exists()
+
+    # Newest first by global id, the order a single Storage uses.
+    everything = sharded.get_alerts(limit=100)
+    assert len({alert["id"] for alert in everything}) == 12
+    assert [alert["id"] for alert in everything] == sorted((alert["id"] for alert in everything), reverse=True)
+    assert sharded.get_alerts(limit=5) == everything[:5]
+    for index in range(2):
+        seconds = [int(alert["alert_id"][6:]) for alert in everything if alert["id"] % 2 == index]
+        assert seconds == sorted(seconds, reverse=True)
+    logs = sharded.get_logs(limit=100)
+    assert [log["id"] for log in logs] == sorted((log["id"] for log in logs), reverse=True)
+    assert [log["id"] for log in sharded.get_logs(limit=3)] == [log["id"] for log in logs[:3]]
+
+    summary = sharded.get_metrics_summary()
+    assert summary["total_alerts"] == 12 and summary["critical_alerts"] == 6
+    assert summary["top_service_by_alerts"]["count"] == 3
+    assert summary["alerts_over_time"] == [{"timestamp": "2026-02-16T12:00", "count": 12}]
+
+    trace = sharded.get_trace("trace-1")
+    assert [item["timestamp"][-2:] for item in trace] == ["01", "01", "04", "04", "07", "07", "10", "10"]
+    assert [item["kind"] for item in trace[:2]] == ["log", "alert"]
+
+    rows = [row for chunk in sharded.iter_rows("alerts", chunk_size=5) for row in chunk]
+    assert [row["alert_id"] for row in rows] == [f"alert-{second}" for second in range(12)]
+    assert [len(chunk) for chunk in sharded.iter_logs(chunk_size=5)] == [5, 5, 2]
+    sharded.insert_logs([_log(service, 40) for service in SERVICES])
+    assert sorted(log["service"] for log in sharded.get_logs(limit=4)) == sorted(SERVICES)
+    with pytest.raises(ValueError):
+        sharded.iter_rows("logs", filters={"nope": ["x"]})
+
+
+def test_status_changes_find_the_owning_shard(sharded):
+    for second, service in enumerate(SERVICES):
+        sharded.insert_alert(_alert(f"alert-{second}", service, second))
+    by_alert_id = {alert["alert_id"]: alert["id"] for alert in sharded.get_alerts()}
+
+    updated = sharded.update_alert_status("alert-2", "ACKNOWLEDGED")
+    assert updated["status"] == "ACKNOWLEDGED" and updated["id"] == by_alert_id["alert-2"]
+    assert sharded.update_alert_status("missing", "ACKNOWLEDGED") is None
+
+    suppressed = sharded.bulk_update_alert_status("SUPPRESSED", alert_ids=["alert-0", "alert-1", "alert-3"])
+    assert sorted(alert["alert_id"] for alert in suppressed) == ["alert-0", "alert-1", "alert-3"]
+    assert [alert["id"] for alert in suppressed] == sorted(by_alert_id[a["alert_id"]] for a in suppressed)
+    assert sharded.get_metrics_summary()["suppressed_alerts"] == 3
+
+
+def test_alert_cursor_does_not_skip_a_lagging_shard(sharded):
+    busy = next(service for service in SERVICES if shard_index(service, 2) == 0)
+    quiet = next(service for service in SERVICES if shard_index(service, 2) == 1)
+    for second in range(5):
+        sharded.insert_alert(_alert(f"busy-{second}", busy, second))
+    position = sharded.get_latest_alert_row_id()
+    assert position == ShardPosition((5, 0))
+
+    # The quiet shard's first row has a lower global id than everything already read.
+    sharded.insert_alert(_alert("quiet-0", quiet, 6))
+    latest = sharded.get_latest_alert_row_id()
+    assert latest > position and latest - position == 1 and not position >= latest
+
+    new = sharded.get_alerts_since_id(position)
+    assert [alert["alert_id"] for alert in new] == ["quiet-0"]
+    assert new[0]["id"] < max(alert["id"] for alert in sharded.get_alerts())
+    assert sharded.alert_position(new, position) == latest
+    assert sharded.get_alerts_since_id(latest) == []
+
+
+def test_websocket_streams_from_every_shard(sharded, monkeypatch):
+    monkeypatch.setattr(api, "storage", sharded)
+    monkeypatch.setattr(api, "async_storage", AsyncStorage(sharded, max_workers=2))
+    monkeypatch.setattr(api, "event_hub", None)
+    sharded.insert_alert(_alert("first", SERVICES[0], 1))
+
+    with TestClient(api.app) as client:
+        with client.websocket_connect("/ws/alerts?v=2") as ws:
+            snapshot = ws.receive_json()
+            for second, service in enumerate(SERVICES[1:], start=2):
+                sharded.insert_alert(_alert(f"later-{second}", service, second))
+            client.portal.call(api.event_hub.poll)
+            events = ws.receive_json()
+        with client.websocket_connect("/ws/alerts") as ws:
+            assert ws.receive_json()["type"] == "snapshot"
+            sharded.insert_alert(_alert("v1", SERVICES[0], 9))
+            delta = ws.receive_json()
+
+    assert [alert["alert_id"] for alert in snapshot["items"]] == ["first"]
+    assert sorted(alert["alert_id"] for alert in events["inserted"]) == ["later-2", "later-3", "later-4"]
+    assert events["summary_diff"]["total_alerts"] == 4
+    assert [alert["alert_id"] for alert in delta["items"]] == ["v1"]
+
+
+def test_security_windows_from_every_writer_add_up_in_shard_zero(sharded, tmp_path):
+    other_writer = ShardedStorage(str(tmp_path / "observability.db"), shards=2)
+    for writer, ips in ((sharded, ["1.1.1.1", "2.2.2.2"]), (other_writer, ["1.1.1.1"])):
+        top, distinct = SpaceSaving(), HyperLogLog()
+        for ip in ips:
+            top.add(ip)
+            distinct.add(ip)
+        window = {"window_start": "2026-02-16T12:00:00", "window_sec": 60, "auth_failures": len(ips)}
+        writer.upsert_security_windows([{**window, "top_ips": top, "distinct_ips": distinct}])
+    other_writer.close()
+
+    summary = sharded.get_top_source_ips(since="2026-02-16T12:00:00")
+    assert summary["auth_failures"] == 3 and summary["distinct_ips"] == 2
+    assert summary["top_ips"][0] == {"ip": "1.1.1.1", "count": 2, "error": 0}
+    assert sharded.shards[1].get_top_source_ips(since="2026-02-16T12:00:00")["windows"] == 0
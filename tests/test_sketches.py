@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from src.sketches import HyperLogLog, LatencySketch, SpaceSaving, parse_quantiles
+
+
+def test_latency_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+    sketch = LatencySketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    ordered = sorted(values)
+    for q in (0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.02)
+    assert len(sketch.bins) < 1000
+
+
+def test_latency_sketch_merge_and_round_trip():
+    left, right = LatencySketch(), LatencySketch()
+    for value in range(1, 101):
+        left.add(float(value))
+        right.add(float(value) * 100)
+
+    merged = LatencySketch.from_json(left.to_json()).merge(right)
+
+    assert merged.count == 200
+    assert merged.count_above(1000.0) == 90
+    assert merged.quantile(0.25) == pytest.approx(50, rel=0.03)
+
+
+def test_parse_quantiles_accepts_fractions_and_percentiles():
+    assert parse_quantiles("0.99, 50") == [0.5, 0.99]
+    with pytest.raises(ValueError):
+        parse_quantiles("150")
+
+
+def test_space_saving_keeps_heavy_hitters_under_unique_flood():
+    sketch = SpaceSaving(capacity=20)
+    for i in range(50000):
+        sketch.add(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}")
+        if i % 5 == 0:
+            sketch.add("203.0.113.66")
+
+    top = sketch.top(1)[0]
+    assert len(sketch.counters) == 20
+    assert top["item"] == "203.0.113.66"
+    assert top["count"] - top["error"] <= 10000 <= top["count"]
+
+
+def test_hyperloglog_estimates_distinct_count_in_fixed_memory():
+    left, right = HyperLogLog(), HyperLogLog()
+    for i in range(30000):
+        left.add(f"ip-{i}")
+        right.add(f"ip-{i + 15000}")
+
+    assert len(left.registers) == 4096
+    assert left.estimate() == pytest.approx(30000, rel=0.05)
+    merged = HyperLogLog.from_json(left.to_json()).merge(right)
+    assert merged.estimate() == pytest.approx(45000, rel=0.05)
+
+    small = HyperLogLog()
+    for ip in ("a", "b", "c", "a"):
+        small.add(ip)
+    assert small.estimate() == 3
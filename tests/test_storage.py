@@ -1,4 +1,10 @@
-from src.storage import Storage
+import asyncio
+import threading
+
+import pytest
+
+from src.sketches import HyperLogLog, LatencySketch, SpaceSaving
+from src.storage import AsyncStorage, Storage
 
 
 def test_storage_inserts_and_reads(tmp_path):
@@ -78,3 +84,255 @@ def test_storage_alert_lifecycle_transitions(tmp_path):
     assert summary["open_alerts"] == 0
     assert summary["acknowledged_alerts"] == 0
     assert summary["suppressed_alerts"] == 1
+
+
+def test_async_storage_slow_call_does_not_block_other_readers(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "test.db"))
+    async_storage = AsyncStorage(storage, max_workers=2)
+    release = threading.Event()
+
+    async def scenario():
+        slow = asyncio.ensure_future(async_storage.run(release.wait, 5))
+        latest_id = await asyncio.wait_for(async_storage.get_latest_alert_row_id(), timeout=2)
+        assert not slow.done()
+        release.set()
+        await slow
+        return latest_id
+
+    try:
+        assert asyncio.run(scenario()) == 0
+    finally:
+        release.set()
+        async_storage.close()
+
+
+def test_pinned_connection_rolls_back_a_failed_write(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "test.db"))
+    storage.open_thread_connection()
+
+    with pytest.raises(RuntimeError):
+        with storage._conn() as conn:
+            conn.execute(
+                "INSERT INTO alerts (timestamp, alert_type, severity, description, source_service) "
+                "VALUES ('2026-02-16T12:00:00', 'Test', 'INFO', 'half-done', 'web-server')"
+            )
+            raise RuntimeError("write failed midway")
+
+    assert not storage._local.conn.in_transaction
+    # Another connection can write straight away and sees nothing of the failed write.
+    other = Storage(db_path=storage.db_path)
+    other.insert_alert({"timestamp": "2026-02-16T12:00:01", "alert_type": "Test", "description": "ok"})
+    assert [alert["description"] for alert in other.get_alerts()] == ["ok"]
+
+
+def test_latency_sketches_merge_across_flushes(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "test.db"))
+    first, second = LatencySketch(), LatencySketch()
+    for value in (10.0, 20.0, 30.0):
+        first.add(value)
+    second.add(5000.0)
+
+    storage.merge_latency_sketches([("web-server", "2026-02-16T12:00:00", first)])
+    storage.merge_latency_sketches(
+        [("web-server", "2026-02-16T12:00:00", second), ("database", "2026-02-16T12:01:00", second)]
+    )
+
+    web = storage.get_latency_sketch(since="2026-02-16T12:00:00", service="web-server")
+    everything = storage.get_latency_sketch(since="2026-02-16T12:00:00")
+    later = storage.get_latency_sketch(since="2026-02-16T12:01:00")
+
+    assert web.count == 4
+    assert everything.count == 5
+    assert later.count == 1
+
+
+def test_concurrent_latency_sketch_merges_do_not_lose_increments(tmp_path):
+    db_path = str(tmp_path / "test.db")
+    writers = [Storage(db_path=db_path) for _ in range(4)]
+    increment = LatencySketch()
+    increment.add(20.0)
+
+    def flush(storage):
+        for _ in range(25):
+            storage.merge_latency_sketches([("web-server", "2026-02-16T12:00:00", increment)])
+
+    threads = [threading.Thread(target=flush, args=(storage,)) for storage in writers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert writers[0].get_latency_sketch(since="2026-02-16T12:00:00").count == 100
+
+
+def test_security_windows_round_trip_and_alert_details(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "test.db"))
+    windows = []
+    batches = (
+        ("2026-02-16T12:00:00", ["1.1.1.1", "1.1.1.1", "2.2.2.2"]),
+        ("2026-02-16T12:01:00", ["1.1.1.1", "3.3.3.3"]),
+    )
+    for start, ips in batches:
+        top, hll = SpaceSaving(), HyperLogLog()
+        for ip in ips:
+            top.add(ip)
+            hll.add(ip)
+        windows.append(
+            {"window_start": start, "window_sec": 60, "auth_failures": len(ips), "top_ips": top, "distinct_ips": hll}
+        )
+    storage.upsert_security_windows(windows)
+    # A second flush into the same window (e.g. from another simulator) adds to it.
+    storage.upsert_security_windows(windows[1:])
+
+    summary = storage.get_top_source_ips(since="2026-02-16T12:00:00", limit=2)
+    assert summary["windows"] == 2
+    assert summary["auth_failures"] == 7
+    assert summary["distinct_ips"] == 3
+    assert summary["top_ips"][0] == {"ip": "1.1.1.1", "count": 4, "error": 0}
+
+    storage.insert_alert(
+        {
+            "alert_id": "alert-bf",
+            "timestamp": "2026-02-16T12:01:00",
+            "alert_type": "Potential Brute Force Attack",
+            "severity": "CRITICAL",
+            "description": "5 failed login attempts",
+            "source_service": "auth-service",
+            "offending_ip": "1.1.1.1",
+            "details": {"distinct_ips": 3},
+        }
+    )
+    assert storage.get_alerts(limit=1)[0]["details"] == {"distinct_ips": 3}
+
+
+def test_get_trace_returns_logs_and_alerts_in_time_order_via_indexes(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "test.db"))
+    for second, trace_id in ((5, "trace-a"), (1, "trace-a"), (2, "trace-b")):
+        storage.insert_log(
+            {
+                "timestamp": f"2026-02-16T12:00:0{second}",
+                "service": "web-server",
+                "level": "ERROR",
+                "event_type": "connection_timeout",
+                "message": "timeout",
+                "trace_id": trace_id,
+                "metrics": {"response_time_ms": 6000.0},
+            }
+        )
+    storage.insert_alert(
+        {
+            "alert_id": "alert-trace",
+            "timestamp": "2026-02-16T12:00:03",
+            "alert_type": "High Error Rate",
+            "severity": "ERROR",
+            "description": "Error rate exceeded",
+            "source_service": "web-server",
+            "source_trace_id": "trace-a",
+        }
+    )
+
+    items = storage.get_trace("trace-a")
+
+    assert [(item["kind"], item["timestamp"]) for item in items] == [
+        ("log", "2026-02-16T12:00:01"),
+        ("alert", "2026-02-16T12:00:03"),
+        ("log", "2026-02-16T12:00:05"),
+    ]
+    assert items[0]["metrics"]["response_time_ms"] == 6000.0
+    assert items[1]["alert_id"] == "alert-trace"
+    assert storage.get_trace("trace-missing") == []
+
+    with storage._conn() as conn:
+        plan = " ".join(
+            row["detail"]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM logs WHERE trace_id = ? "
+                "UNION ALL SELECT id FROM alerts WHERE source_trace_id = ?",
+                ("trace-a", "trace-a"),
+            )
+        )
+    assert "idx_logs_trace_id" in plan
+    assert "idx_alerts_source_trace_id" in plan
+
+
+def test_iter_logs_streams_time_ordered_chunks_within_range(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "test.db"))
+    for second in (4, 1, 3, 1, 2, 5):
+        storage.insert_log(
+            {
+                "timestamp": f"2026-02-16T12:00:0{second}",
+                "service": "web-server",
+                "event_type": "normal_operation",
+                "message": str(second),
+                "metrics": {"response_time_ms": 20.0},
+            }
+        )
+
+    chunks = list(storage.iter_logs(since="2026-02-16T12:00:01", until="2026-02-16T12:00:05", chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert [log["message"] for chunk in chunks for log in chunk] == ["1", "1", "2", "3", "4"]
+    assert chunks[0][0]["metrics"] == {"response_time_ms": 20.0}
+
+
+def test_iter_rows_applies_field_filters_and_projection(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "test.db"))
+    for i, (service, level) in enumerate((("web", "INFO"), ("db", "ERROR"), ("web", "ERROR"), ("auth", "WARNING"))):
+        storage.insert_log(
+            {
+                "timestamp": f"2026-02-16T12:00:0{i}",
+                "service": service,
+                "level": level,
+                "event_type": "normal_operation",
+                "message": f"m{i}",
+            }
+        )
+
+    rows = [
+        row
+        for chunk in storage.iter_rows(
+            "logs", columns=["message"], filters={"level": ["ERROR", "WARNING"], "service": ["web", "auth"]}
+        )
+        for row in chunk
+    ]
+
+    assert [row["message"] for row in rows] == ["m2", "m3"]
+    with pytest.raises(ValueError):
+        storage.iter_rows("logs", columns=["password"])
+    with pytest.raises(ValueError):
+        storage.iter_rows("logs", filters={"message": ["m1"]})
+
+
+def test_bulk_update_alert_status_by_ids_and_filters(tmp_path):
+    storage = Storage(db_path=str(tmp_path / "test.db"))
+    for i in range(6):
+        storage.insert_alert(
+            {
+                "alert_id": f"alert-bulk-{i}",
+                "timestamp": f"2026-02-16T12:00:0{i}",
+                "alert_type": "High Error Rate" if i % 2 else "High CPU Utilization",
+                "severity": "ERROR",
+                "description": "storm",
+                "source_service": "database" if i < 3 else "web-server",
+            }
+        )
+
+    by_id = storage.bulk_update_alert_status("ACKNOWLEDGED", alert_ids=["alert-bulk-0", "alert-bulk-1", "missing"])
+    assert [alert["alert_id"] for alert in by_id] == ["alert-bulk-0", "alert-bulk-1"]
+    assert all(alert["status"] == "ACKNOWLEDGED" and alert["acknowledged_at"] for alert in by_id)
+
+    by_filter = storage.bulk_update_alert_status(
+        "acknowledged", filters={"source_service": ["database"]}, since="2026-02-16T12:00:01"
+    )
+    assert [alert["alert_id"] for alert in by_filter] == ["alert-bulk-2"]  # alert-bulk-1 was already acknowledged
+
+    suppressed = storage.bulk_update_alert_status(
+        "SUPPRESSED", filters={"alert_type": ["High Error Rate"], "status": ["OPEN", "ACKNOWLEDGED"]}
+    )
+    assert [alert["alert_id"] for alert in suppressed] == ["alert-bulk-1", "alert-bulk-3", "alert-bulk-5"]
+    assert storage.get_data_version()["alerts"]["tag"] == "6.6"
+
+    with pytest.raises(ValueError):
+        storage.bulk_update_alert_status("SUPPRESSED")
+    with pytest.raises(ValueError):
+        storage.bulk_update_alert_status("CLOSED", alert_ids=["alert-bulk-0"])
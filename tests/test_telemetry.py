@@ -0,0 +1,49 @@
+from src import telemetry
+from src.telemetry import MetricsRegistry, timed
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo latency.", operation="op")
+    histogram.observe(0.00002)
+    histogram.observe(0.002)
+    registry.counter("demo_total", "Demo counter.", kind='a"b').inc(3)
+    registry.gauge("demo_resident", "Demo gauge.").set(7)
+
+    text = registry.render()
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{operation="op",le="5e-05"} 1' in text
+    assert 'demo_seconds_bucket{operation="op",le="0.005"} 2' in text
+    assert 'demo_seconds_bucket{operation="op",le="+Inf"} 2' in text
+    assert 'demo_seconds_count{operation="op"} 2' in text
+    assert 'demo_total{kind="a\\"b"} 3' in text
+    assert "# TYPE demo_resident gauge" in text
+    assert "demo_resident 7" in text
+
+
+def test_timed_records_calls_and_errors_and_can_be_disabled():
+    @timed("test.operation")
+    def work(fail=False):
+        if fail:
+            raise RuntimeError("boom")
+        return 1
+
+    histogram = telemetry.REGISTRY.histogram(telemetry.OPERATION_SECONDS, "", operation="test.operation")
+    errors = telemetry.REGISTRY.counter(telemetry.OPERATION_ERRORS, "", operation="test.operation")
+    before = histogram.count
+
+    assert work() == 1
+    try:
+        work(fail=True)
+    except RuntimeError:
+        pass
+    assert histogram.count == before + 2
+    assert errors.value == 1
+
+    telemetry.set_enabled(False)
+    try:
+        work()
+        assert histogram.count == before + 2
+    finally:
+        telemetry.set_enabled(True)
@@ -0,0 +1,56 @@
+from src.ws_events import apply_summary_diff, coalesce, summary_diff
+
+
+def _summary(open_alerts, buckets):
+    return {
+        "total_alerts": 10,
+        "open_alerts": open_alerts,
+        "alerts_over_time": [{"timestamp": ts, "count": count} for ts, count in buckets],
+    }
+
+
+def test_summary_diff_round_trips_and_keeps_only_changed_buckets():
+    old = _summary(4, [("2026-02-16T12:00", 3), ("2026-02-16T12:01", 2)])
+    new = _summary(5, [("2026-02-16T12:00", 3), ("2026-02-16T12:01", 4), ("2026-02-16T12:02", 1)])
+
+    diff = summary_diff(old, new)
+
+    assert diff == {
+        "open_alerts": 5,
+        "alerts_over_time": [
+            {"timestamp": "2026-02-16T12:01", "count": 4},
+            {"timestamp": "2026-02-16T12:02", "count": 1},
+        ],
+    }
+    assert apply_summary_diff(old, diff) == new
+    assert summary_diff(new, new) == {}
+
+
+def test_coalesce_folds_events_into_one_frame():
+    alert = {"id": 7, "alert_id": "a-7", "status": "OPEN", "updated_at": "2026-02-16 12:00:00"}
+    frames = [
+        {"type": "events", "seq": 3, "inserted": [alert], "updated": [], "summary_diff": {"open_alerts": 5}},
+        {
+            "type": "events",
+            "seq": 4,
+            "inserted": [],
+            "updated": [
+                {"id": 7, "status": "ACKNOWLEDGED", "updated_at": "2026-02-16 12:00:01"},
+                {"id": 2, "status": "SUPPRESSED", "updated_at": "2026-02-16 12:00:01"},
+            ],
+            "summary_diff": {"open_alerts": 3, "suppressed_alerts": 1},
+        },
+    ]
+
+    merged = coalesce(frames)
+
+    assert merged["seq"] == 4
+    assert merged["inserted"] == [{**alert, "status": "ACKNOWLEDGED", "updated_at": "2026-02-16 12:00:01"}]
+    assert [change["id"] for change in merged["updated"]] == [2]
+    assert merged["summary_diff"] == {"open_alerts": 3, "suppressed_alerts": 1}
+
+    snapshot = {"type": "snapshot", "seq": 2, "items": [{"id": 2, "status": "OPEN"}], "summary": _summary(4, [])}
+    merged = coalesce([snapshot] + frames, snapshot_size=1)
+    assert merged["type"] == "snapshot" and merged["seq"] == 4
+    assert merged["items"] == [{**alert, "status": "ACKNOWLEDGED", "updated_at": "2026-02-16 12:00:01"}]
+    assert merged["summary"]["open_alerts"] == 3 and merged["summary"]["suppressed_alerts"] == 1